@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Company, User, EmployeeProfile, Attendance, TimeOff, LeaveAllocation
+from .models import Company, User, EmployeeProfile, Attendance, AttendancePunch, TimeOff, LeaveAllocation, DailyAttendanceRollup, NotificationOutbox, PayrollRun, Payslip
 from .document_models import EmployeeDocument
 
 
@@ -53,6 +53,23 @@ class AttendanceAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(AttendancePunch)
+class AttendancePunchAdmin(admin.ModelAdmin):
+    list_display = ['user', 'action', 'punched_at', 'idempotency_key', 'submitted_by', 'created_at']
+    search_fields = ['idempotency_key', 'user__email', 'user__employee_id']
+    list_filter = ['action', 'company']
+    date_hierarchy = 'punched_at'
+    readonly_fields = ['created_at']
+
+
+@admin.register(DailyAttendanceRollup)
+class DailyAttendanceRollupAdmin(admin.ModelAdmin):
+    list_display = ['company', 'date', 'present_count', 'absent_count', 'half_day_count', 'leave_count', 'total_work_hours']
+    list_filter = ['company', 'date']
+    date_hierarchy = 'date'
+    readonly_fields = ['updated_at']
+
+
 @admin.register(TimeOff)
 class TimeOffAdmin(admin.ModelAdmin):
     list_display = ['user', 'time_off_type', 'start_date', 'end_date', 'total_days', 'status']
@@ -69,6 +86,26 @@ class LeaveAllocationAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'channel', 'event', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['channel', 'status', 'event']
+    readonly_fields = ['claimed_by', 'claimed_at', 'created_at', 'sent_at']
+
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    list_display = ['company', 'year', 'month', 'status', 'generated_at', 'closed_at']
+    list_filter = ['status', 'year']
+
+
+@admin.register(Payslip)
+class PayslipAdmin(admin.ModelAdmin):
+    list_display = ['user', 'run', 'working_days', 'gross_salary', 'net_salary', 'is_dirty', 'computed_at']
+    search_fields = ['user__email', 'user__employee_id']
+    list_filter = ['is_dirty', 'run__year', 'run__month']
+
+
 @admin.register(EmployeeDocument)
 class EmployeeDocumentAdmin(admin.ModelAdmin):
     list_display = ['user', 'document_name', 'document_type', 'uploaded_at']
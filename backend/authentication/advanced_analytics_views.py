@@ -6,7 +6,7 @@ Includes: Predictive Analytics, Anomaly Detection, Performance Scoring, Trend Fo
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Avg, Sum, Q, F, FloatField
+from django.db.models import Count, Avg, Sum, Q, F, FloatField, IntegerField, OuterRef, Subquery
 from django.db.models.functions import TruncDate, TruncMonth, TruncWeek, ExtractWeekDay
 from datetime import datetime, timedelta
 from collections import defaultdict
@@ -14,6 +14,9 @@ import statistics
 
 from .models import User, EmployeeProfile, Attendance, TimeOff, LeaveAllocation
 from .permissions import IsAdminOrHR
+from .analytics_engine import PerformanceScoringEngine, AnomalyScanner
+from .rollups import rollup_trend
+from .analytics_cache import cached_analytics
 
 
 class PredictiveAnalyticsView(APIView):
@@ -253,214 +256,13 @@ class AnomalyDetectionView(APIView):
     """
     permission_classes = [IsAuthenticated, IsAdminOrHR]
     
+    @cached_analytics()
     def get(self, request):
         today = datetime.now().date()
         last_30_days = today - timedelta(days=30)
         
-        anomalies = {
-            "attendance_anomalies": [],
-            "leave_anomalies": [],
-            "productivity_anomalies": [],
-            "policy_violations": []
-        }
-        
-        # 1. ATTENDANCE ANOMALIES
-        employees = EmployeeProfile.objects.filter(user__is_active=True).select_related('user')
-        
-        for emp in employees:
-            recent_attendance = Attendance.objects.filter(
-                user=emp.user,
-                date__gte=last_30_days
-            ).order_by('date')
-            
-            # Pattern: Always checking in late
-            late_checkins = 0
-            very_early_checkins = 0
-            unusual_checkout_times = 0
-            same_time_checkins = defaultdict(int)
-            
-            for att in recent_attendance:
-                if not att.check_in:
-                    continue
-                checkin_time = att.check_in
-                
-                # Late check-ins (after 9:30 AM)
-                if checkin_time.hour > 9 or (checkin_time.hour == 9 and checkin_time.minute > 30):
-                    late_checkins += 1
-                
-                # Suspiciously early (before 6 AM)
-                if checkin_time.hour < 6:
-                    very_early_checkins += 1
-                
-                # Same time every day (within 2 minutes) - suspicious
-                time_key = f"{checkin_time.hour}:{checkin_time.minute // 2}"
-                same_time_checkins[time_key] += 1
-                
-                # Check-out anomalies
-                if att.check_out:
-                    checkout_time = att.check_out.time()
-                    # Leaving too early (before 4 PM) or too late (after 11 PM)
-                    if checkout_time.hour < 16 or checkout_time.hour >= 23:
-                        unusual_checkout_times += 1
-            
-            total_days = recent_attendance.count()
-            
-            # Detect patterns
-            if total_days > 0:
-                if late_checkins / total_days > 0.7:
-                    anomalies["attendance_anomalies"].append({
-                        "employee": f"{emp.user.first_name} {emp.user.last_name}",
-                        "email": emp.user.email,
-                        "anomaly_type": "Chronic Late Check-ins",
-                        "severity": "MEDIUM",
-                        "details": f"{late_checkins} out of {total_days} days",
-                        "recommendation": "Discuss flexible work hours or address punctuality"
-                    })
-                
-                if very_early_checkins > 5:
-                    anomalies["attendance_anomalies"].append({
-                        "employee": f"{emp.user.first_name} {emp.user.last_name}",
-                        "email": emp.user.email,
-                        "anomaly_type": "Unusual Early Check-ins",
-                        "severity": "LOW",
-                        "details": f"{very_early_checkins} check-ins before 6 AM",
-                        "recommendation": "Verify if legitimate or potential time fraud"
-                    })
-                
-                # Check if too many same-time check-ins (possible buddy punching)
-                for time_key, count in same_time_checkins.items():
-                    if count > 10 and count / total_days > 0.5:
-                        anomalies["attendance_anomalies"].append({
-                            "employee": f"{emp.user.first_name} {emp.user.last_name}",
-                            "email": emp.user.email,
-                            "anomaly_type": "Repetitive Check-in Time Pattern",
-                            "severity": "HIGH",
-                            "details": f"Same check-in time ({count} times)",
-                            "recommendation": "Investigate for buddy punching or automated check-ins"
-                        })
-                        break
-        
-        # 2. LEAVE ANOMALIES
-        for emp in employees:
-            # Check for suspicious leave patterns
-            recent_leaves = TimeOff.objects.filter(
-                user=emp.user,
-                start_date__gte=last_30_days
-            ).order_by('start_date')
-            
-            # Pattern: Always requesting leave on Mondays/Fridays
-            monday_friday_leaves = 0
-            for leave in recent_leaves:
-                if leave.start_date.weekday() in [0, 4]:  # Monday or Friday
-                    monday_friday_leaves += 1
-            
-            if monday_friday_leaves >= 3:
-                anomalies["leave_anomalies"].append({
-                    "employee": f"{emp.user.first_name} {emp.user.last_name}",
-                    "email": emp.user.email,
-                    "anomaly_type": "Weekend Extension Pattern",
-                    "severity": "MEDIUM",
-                    "details": f"{monday_friday_leaves} leaves on Mon/Fri in last 30 days",
-                    "recommendation": "Discuss leave planning and weekend extension policy"
-                })
-            
-            # Check for excessive sick leave
-            sick_leaves = recent_leaves.filter(leave_type='SICK').count()
-            if sick_leaves > 4:
-                anomalies["leave_anomalies"].append({
-                    "employee": f"{emp.user.first_name} {emp.user.last_name}",
-                    "email": emp.user.email,
-                    "anomaly_type": "Excessive Sick Leave",
-                    "severity": "HIGH",
-                    "details": f"{sick_leaves} sick leaves in 30 days",
-                    "recommendation": "Wellness check or medical certificate verification"
-                })
-        
-        # 3. PRODUCTIVITY ANOMALIES
-        for emp in employees:
-            # Calculate average work hours
-            recent_attendance = Attendance.objects.filter(
-                user=emp.user,
-                date__gte=last_30_days,
-                check_out__isnull=False
-            )
-            
-            if recent_attendance.exists():
-                total_hours = 0
-                for att in recent_attendance:
-                    if att.check_in and att.check_out:
-                        from datetime import datetime as dt, timedelta as td
-                        today_d = dt.now().date()
-                        ci_dt = dt.combine(today_d, att.check_in)
-                        co_dt = dt.combine(today_d, att.check_out)
-                        if co_dt < ci_dt:
-                            co_dt += td(days=1)
-                        duration = co_dt - ci_dt
-                        total_hours += duration.total_seconds() / 3600
-                
-                avg_hours = total_hours / recent_attendance.count() if recent_attendance.count() > 0 else 0
-                
-                # Very low working hours
-                if avg_hours < 6:
-                    anomalies["productivity_anomalies"].append({
-                        "employee": f"{emp.user.first_name} {emp.user.last_name}",
-                        "email": emp.user.email,
-                        "anomaly_type": "Low Working Hours",
-                        "severity": "HIGH",
-                        "details": f"Average {avg_hours:.1f} hours/day",
-                        "recommendation": "Investigate workload distribution or time management"
-                    })
-                
-                # Extremely high hours (potential burnout)
-                if avg_hours > 12:
-                    anomalies["productivity_anomalies"].append({
-                        "employee": f"{emp.user.first_name} {emp.user.last_name}",
-                        "email": emp.user.email,
-                        "anomaly_type": "Excessive Working Hours",
-                        "severity": "HIGH",
-                        "details": f"Average {avg_hours:.1f} hours/day",
-                        "recommendation": "Enforce work-life balance policies"
-                    })
-        
-        # 4. POLICY VIOLATIONS
-        # Check for unapproved absences
-        all_dates_last_30 = [last_30_days + timedelta(days=x) for x in range(30)]
-        for emp in employees:
-            attendance_dates = set(
-                Attendance.objects.filter(
-                    employee=emp,
-                    check_in__date__gte=last_30_days
-                ).values_list('check_in__date', flat=True)
-            )
-            
-            approved_leave_dates = set()
-            for leave in TimeOff.objects.filter(
-                employee=emp,
-                status='APPROVED',
-                start_date__lte=today,
-                end_date__gte=last_30_days
-            ):
-                current_date = max(leave.start_date, last_30_days)
-                while current_date <= min(leave.end_date, today):
-                    approved_leave_dates.add(current_date)
-                    current_date += timedelta(days=1)
-            
-            # Find missing days (not weekends)
-            missing_days = 0
-            for date in all_dates_last_30:
-                if date.weekday() < 5:  # Weekday
-                    if date not in attendance_dates and date not in approved_leave_dates and date <= today:
-                        missing_days += 1
-            
-            if missing_days > 3:
-                anomalies["policy_violations"].append({
-                    "employee": f"{emp.user.first_name} {emp.user.last_name}",
-                    "email": emp.user.email,
-                    "violation_type": "Unapproved Absences",
-                    "severity": "HIGH",
-                    "details": f"{missing_days} days without attendance or approved leave",
-                    "recommendation": "Immediate follow-up required"
-                })
+        # Vectorized scan: the 30-day window is loaded once for all detectors
+        anomalies = AnomalyScanner(request.user.company, last_30_days, today).scan()
         
         # Calculate summary statistics
         summary = {
@@ -501,16 +303,14 @@ class PerformanceScoreView(APIView):
     """
     permission_classes = [IsAuthenticated, IsAdminOrHR]
     
+    @cached_analytics()
     def get(self, request):
         today = datetime.now().date()
         last_90_days = today - timedelta(days=90)
         
-        performance_data = []
-        employees = EmployeeProfile.objects.filter(user__is_active=True).select_related('user')
-        
-        for emp in employees:
-            scores = self._calculate_employee_score(emp, last_90_days, today)
-            performance_data.append(scores)
+        # Batched engine: constant query count regardless of head count
+        engine = PerformanceScoringEngine(request.user.company, last_90_days, today)
+        performance_data = engine.score()
         
         # Sort by overall score
         performance_data.sort(key=lambda x: x['overall_score'], reverse=True)
@@ -542,121 +342,6 @@ class PerformanceScoreView(APIView):
             "top_performers": performance_data[:10],
             "needs_improvement": [emp for emp in performance_data if emp['overall_score'] < 60]
         })
-    
-    def _calculate_employee_score(self, emp, start_date, end_date):
-        # Calculate total expected working days
-        total_days = (end_date - start_date).days
-        expected_work_days = sum(1 for i in range(total_days) if (start_date + timedelta(days=i)).weekday() < 5)
-        
-        # Get attendance records
-        attendance_records = Attendance.objects.filter(
-            employee=emp,
-            check_in__date__gte=start_date,
-            check_in__date__lte=end_date
-        )
-        
-        actual_work_days = attendance_records.count()
-        
-        # Get approved leaves
-        approved_leave_days = 0
-        for leave in TimeOff.objects.filter(
-            employee=emp,
-            status='APPROVED',
-            start_date__lte=end_date,
-            end_date__gte=start_date
-        ):
-            leave_start = max(leave.start_date, start_date)
-            leave_end = min(leave.end_date, end_date)
-            leave_days = (leave_end - leave_start).days + 1
-            # Count only weekdays
-            approved_leave_days += sum(1 for i in range(leave_days) if (leave_start + timedelta(days=i)).weekday() < 5)
-        
-        # 1. ATTENDANCE SCORE (35%)
-        expected_present_days = expected_work_days - approved_leave_days
-        attendance_rate = (actual_work_days / expected_present_days * 100) if expected_present_days > 0 else 100
-        attendance_score = min(attendance_rate, 100) * 0.35
-        
-        # 2. PUNCTUALITY SCORE (25%)
-        on_time_checkins = 0
-        for att in attendance_records:
-            checkin_time = att.check_in.time()
-            # On time if before 9:15 AM
-            if checkin_time.hour < 9 or (checkin_time.hour == 9 and checkin_time.minute <= 15):
-                on_time_checkins += 1
-        
-        punctuality_rate = (on_time_checkins / actual_work_days * 100) if actual_work_days > 0 else 100
-        punctuality_score = min(punctuality_rate, 100) * 0.25
-        
-        # 3. WORK HOURS SCORE (25%)
-        total_hours = 0
-        complete_days = 0
-        for att in attendance_records.filter(check_out__isnull=False):
-            duration = att.check_out - att.check_in
-            hours = duration.total_seconds() / 3600
-            total_hours += hours
-            complete_days += 1
-        
-        avg_hours_per_day = total_hours / complete_days if complete_days > 0 else 0
-        # Ideal: 8-9 hours, Score calculation
-        if 7.5 <= avg_hours_per_day <= 9.5:
-            hours_score = 100 * 0.25
-        elif avg_hours_per_day > 9.5:
-            hours_score = max(80, 100 - (avg_hours_per_day - 9.5) * 5) * 0.25
-        else:
-            hours_score = (avg_hours_per_day / 8 * 100) * 0.25
-        
-        # 4. CONSISTENCY SCORE (15%)
-        # Check for attendance consistency (minimal gaps)
-        attendance_dates = sorted(attendance_records.values_list('check_in__date', flat=True))
-        gaps = 0
-        for i in range(1, len(attendance_dates)):
-            date_diff = (attendance_dates[i] - attendance_dates[i-1]).days
-            # Count gaps (excluding weekends and approved leaves)
-            if date_diff > 3:
-                gaps += 1
-        
-        consistency_rate = max(0, 100 - (gaps * 10))
-        consistency_score = consistency_rate * 0.15
-        
-        # OVERALL SCORE
-        overall_score = round(attendance_score + punctuality_score + hours_score + consistency_score, 1)
-        
-        return {
-            "employee_id": emp.user.id,
-            "employee_name": f"{emp.user.first_name} {emp.user.last_name}",
-            "email": emp.user.email,
-            "department": emp.department or "Not Set",
-            "role": emp.role,
-            "overall_score": overall_score,
-            "grade": self._get_grade(overall_score),
-            "breakdown": {
-                "attendance": round(attendance_score / 0.35, 1),
-                "punctuality": round(punctuality_score / 0.25, 1),
-                "work_hours": round(hours_score / 0.25, 1),
-                "consistency": round(consistency_score / 0.15, 1)
-            },
-            "metrics": {
-                "days_present": actual_work_days,
-                "expected_days": expected_present_days,
-                "attendance_rate": round(attendance_rate, 1),
-                "avg_hours_per_day": round(avg_hours_per_day, 1),
-                "on_time_percentage": round(punctuality_rate, 1)
-            }
-        }
-    
-    def _get_grade(self, score):
-        if score >= 90:
-            return "A+ (Excellent)"
-        elif score >= 80:
-            return "A (Very Good)"
-        elif score >= 70:
-            return "B+ (Good)"
-        elif score >= 60:
-            return "B (Satisfactory)"
-        elif score >= 50:
-            return "C (Needs Improvement)"
-        else:
-            return "D (Poor)"
 
 
 class GraphDataView(APIView):
@@ -678,7 +363,7 @@ class GraphDataView(APIView):
         data = {}
         
         if graph_type in ['all', 'timeseries']:
-            data['timeseries'] = self._get_timeseries_data(last_90_days, today)
+            data['timeseries'] = self._get_timeseries_data(request.user.company, last_90_days, today)
         
         if graph_type in ['all', 'heatmap']:
             data['heatmap'] = self._get_heatmap_data(last_90_days, today)
@@ -694,23 +379,34 @@ class GraphDataView(APIView):
         
         return Response(data)
     
-    def _get_timeseries_data(self, start_date, end_date):
+    def _get_timeseries_data(self, company, start_date, end_date):
         """Daily time-series data for attendance and leave trends"""
-        daily_data = []
-        current_date = start_date
+        attendance_by_date = {
+            item['date']: item['present'] + item['absent'] + item['half_day'] + item['leave']
+            for item in rollup_trend(company, start_date, end_date)
+        }
         
-        while current_date <= end_date:
-            attendance_count = Attendance.objects.filter(
-                date=current_date
-            ).count()
-            
-            leave_count = TimeOff.objects.filter(
-                start_date__lte=current_date,
-                end_date__gte=current_date,
-                status='APPROVED'
-            ).count()
-            
-            total_employees = EmployeeProfile.objects.filter(user__is_active=True).count()
+        # Expand approved leave overlapping the window into per-day counts
+        window = (end_date - start_date).days + 1
+        leave_delta = [0] * (window + 1)
+        approved_leaves = TimeOff.objects.filter(
+            company=company,
+            start_date__lte=end_date,
+            end_date__gte=start_date,
+            status='APPROVED'
+        ).values_list('start_date', 'end_date')
+        for leave_start, leave_end in approved_leaves:
+            leave_delta[(max(leave_start, start_date) - start_date).days] += 1
+            leave_delta[(min(leave_end, end_date) - start_date).days + 1] -= 1
+        
+        total_employees = EmployeeProfile.objects.filter(user__company=company, user__is_active=True).count()
+        
+        daily_data = []
+        leave_count = 0
+        for offset in range(window):
+            current_date = start_date + timedelta(days=offset)
+            attendance_count = attendance_by_date.get(current_date, 0)
+            leave_count += leave_delta[offset]
             
             daily_data.append({
                 "date": current_date.isoformat(),
@@ -719,8 +415,6 @@ class GraphDataView(APIView):
                 "absent": max(0, total_employees - attendance_count - leave_count),
                 "attendance_percentage": round((attendance_count / total_employees * 100) if total_employees > 0 else 0, 1)
             })
-            
-            current_date += timedelta(days=1)
         
         return {
             "daily_trends": daily_data,
@@ -854,28 +548,29 @@ class GraphDataView(APIView):
     
     def _get_correlation_data(self, start_date, end_date):
         """Correlation between different metrics"""
-        employees = EmployeeProfile.objects.filter(user__is_active=True)
+        employees = EmployeeProfile.objects.filter(user__is_active=True).select_related('user').annotate(
+            attendance_count=Subquery(
+                Attendance.objects.filter(user=OuterRef('user'), date__gte=start_date)
+                .values('user').annotate(count=Count('id')).values('count'),
+                output_field=IntegerField()
+            ),
+            leave_count=Subquery(
+                TimeOff.objects.filter(user=OuterRef('user'), start_date__gte=start_date, status='APPROVED')
+                .values('user').annotate(count=Count('id')).values('count'),
+                output_field=IntegerField()
+            )
+        )
         
-        correlation_data = []
-        for emp in employees:
-            attendance_count = Attendance.objects.filter(
-                user=emp.user,
-                date__gte=start_date
-            ).count()
-            
-            leave_count = TimeOff.objects.filter(
-                user=emp.user,
-                start_date__gte=start_date,
-                status='APPROVED'
-            ).count()
-            
-            correlation_data.append({
+        correlation_data = [
+            {
                 "employee_id": emp.user.id,
                 "salary": float(emp.monthly_wage) if emp.monthly_wage else 0,
-                "attendance_days": attendance_count,
-                "leave_days": leave_count,
+                "attendance_days": emp.attendance_count or 0,
+                "leave_days": emp.leave_count or 0,
                 "role": emp.user.role
-            })
+            }
+            for emp in employees
+        ]
         
         return {
             "scatter_data": correlation_data,
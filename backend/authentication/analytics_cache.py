@@ -0,0 +1,96 @@
+"""
+Analytics Response Cache
+Company-scoped caching for analytics endpoints with version-based invalidation
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+CACHE_ALIAS = 'analytics'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(company_id):
+    return f'analytics:version:{company_id}'
+
+
+def company_version(company_id):
+    """Current cache generation for a company, seeded on first use"""
+    cache = get_cache()
+    version = cache.get(_version_key(company_id))
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old generation
+        version = time.time_ns()
+        cache.add(_version_key(company_id), version, timeout=None)
+        version = cache.get(_version_key(company_id), version)
+    return version
+
+
+def invalidate_company(company_id):
+    """Drop every cached analytics response for a company in O(1)"""
+    if not company_id:
+        return
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(company_id))
+    except ValueError:
+        cache.set(_version_key(company_id), time.time_ns(), timeout=None)
+
+
+def normalize_params(query_params):
+    """Stable representation of query params: sorted keys, sorted multi-values"""
+    return '&'.join(
+        f'{key}={value}'
+        for key in sorted(query_params.keys())
+        for value in sorted(query_params.getlist(key))
+    )
+
+
+def cache_key(company_id, endpoint, query_params):
+    params_hash = hashlib.sha1(normalize_params(query_params).encode()).hexdigest()
+    version = company_version(company_id)
+    return f'analytics:{company_id}:{version}:{endpoint}:{params_hash}'
+
+
+def cached_analytics(endpoint=None, timeout=None):
+    """
+    Cache a company-scoped APIView.get response body.
+    Entries are keyed by company, endpoint and normalized query params and
+    expire by TTL, LRU eviction in the backend, or a company version bump.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            company_id = getattr(request.user, 'company_id', None)
+            if not company_id:
+                return view_method(self, request, *args, **kwargs)
+
+            name = endpoint or type(self).__name__
+            key = cache_key(company_id, name, request.query_params)
+            cache = get_cache()
+
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                if timeout is None:
+                    cache.set(key, response.data)
+                else:
+                    cache.set(key, response.data, timeout)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
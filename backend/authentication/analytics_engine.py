@@ -0,0 +1,652 @@
+"""
+Analytics Engines
+Batched, company-wide computations shared by the analytics and report views
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from django.db.models import Count, Q
+
+from .models import EmployeeProfile, Attendance, TimeOff
+
+
+# Rows fetched per round-trip when streaming attendance/leave
+STREAM_CHUNK_SIZE = 2000
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+def count_weekdays(start_date, end_date):
+    """Count Monday-Friday dates in the inclusive range [start_date, end_date]"""
+    if end_date < start_date:
+        return 0
+    total_days = (end_date - start_date).days + 1
+    full_weeks, remainder = divmod(total_days, 7)
+    weekdays = full_weeks * 5
+    first_weekday = start_date.weekday()
+    weekdays += sum(1 for i in range(remainder) if (first_weekday + i) % 7 < 5)
+    return weekdays
+
+
+def time_to_seconds(value):
+    """Seconds since midnight for a TimeField value"""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def shift_duration_hours(check_in, check_out):
+    """Hours between check-in and check-out, handling overnight shifts"""
+    seconds = time_to_seconds(check_out) - time_to_seconds(check_in)
+    if seconds < 0:
+        seconds += SECONDS_PER_DAY
+    return seconds / 3600
+
+
+def get_grade(score):
+    if score >= 90:
+        return "A+ (Excellent)"
+    elif score >= 80:
+        return "A (Very Good)"
+    elif score >= 70:
+        return "B+ (Good)"
+    elif score >= 60:
+        return "B (Satisfactory)"
+    elif score >= 50:
+        return "C (Needs Improvement)"
+    else:
+        return "D (Poor)"
+
+
+class PerformanceScoringEngine:
+    """
+    Single-pass performance scoring for every active employee of a company.
+    Issues a constant number of queries (profiles, attendance, approved leave)
+    regardless of head count and folds each user's rows in one pass.
+    """
+
+    def __init__(self, company, start_date, end_date):
+        self.company = company
+        self.start_date = start_date
+        self.end_date = end_date
+
+        # Expected working days are the same for everyone in the window
+        total_days = (end_date - start_date).days
+        self.expected_work_days = count_weekdays(start_date, start_date + timedelta(days=total_days - 1)) if total_days > 0 else 0
+
+    def score(self):
+        """Return the per-employee score dicts (unsorted, unranked)"""
+        employees = list(
+            EmployeeProfile.objects.filter(
+                user__company=self.company,
+                user__is_active=True
+            ).values_list(
+                'user_id', 'user__first_name', 'user__last_name',
+                'user__email', 'user__role', 'department'
+            )
+        )
+
+        attendance_by_user = self._load_attendance()
+        leave_days_by_user = self._load_leave_days()
+
+        return [
+            self._score_employee(
+                employee,
+                attendance_by_user.get(employee[0], []),
+                leave_days_by_user.get(employee[0], 0)
+            )
+            for employee in employees
+        ]
+
+    def _load_attendance(self):
+        """Stream the window's worked days (rows with a check-in) once and group (date, in, out) per user"""
+        # ABSENT and LEAVE rows have no check-in and must not count as days worked
+        rows = Attendance.objects.filter(
+            company=self.company,
+            user__is_active=True,
+            date__gte=self.start_date,
+            date__lte=self.end_date,
+            check_in__isnull=False
+        ).values_list(
+            'user_id', 'date', 'check_in', 'check_out'
+        ).order_by('user_id', 'date').iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+        grouped = defaultdict(list)
+        for user_id, day, check_in, check_out in rows:
+            grouped[user_id].append((day, check_in, check_out))
+        return grouped
+
+    def _load_leave_days(self):
+        """Stream approved leave once and sum weekday leave days per user"""
+        rows = TimeOff.objects.filter(
+            company=self.company,
+            user__is_active=True,
+            status='APPROVED',
+            start_date__lte=self.end_date,
+            end_date__gte=self.start_date
+        ).values_list(
+            'user_id', 'start_date', 'end_date'
+        ).iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+        leave_days = defaultdict(int)
+        for user_id, leave_start, leave_end in rows:
+            leave_days[user_id] += count_weekdays(
+                max(leave_start, self.start_date),
+                min(leave_end, self.end_date)
+            )
+        return leave_days
+
+    def _score_employee(self, employee, records, approved_leave_days):
+        user_id, first_name, last_name, email, role, department = employee
+
+        actual_work_days = len(records)
+        on_time_checkins = 0
+        total_hours = 0
+        complete_days = 0
+        gaps = 0
+        previous_date = None
+
+        # Records are worked days ordered by date, so every component folds in one pass
+        for day, check_in, check_out in records:
+            # On time if before 9:15 AM
+            if check_in.hour < 9 or (check_in.hour == 9 and check_in.minute <= 15):
+                on_time_checkins += 1
+            if check_out:
+                total_hours += shift_duration_hours(check_in, check_out)
+                complete_days += 1
+
+            # Count gaps (excluding weekends and approved leaves)
+            if previous_date is not None and (day - previous_date).days > 3:
+                gaps += 1
+            previous_date = day
+
+        # 1. ATTENDANCE SCORE (35%)
+        expected_present_days = self.expected_work_days - approved_leave_days
+        attendance_rate = (actual_work_days / expected_present_days * 100) if expected_present_days > 0 else 100
+        attendance_score = min(attendance_rate, 100) * 0.35
+
+        # 2. PUNCTUALITY SCORE (25%)
+        punctuality_rate = (on_time_checkins / actual_work_days * 100) if actual_work_days > 0 else 100
+        punctuality_score = min(punctuality_rate, 100) * 0.25
+
+        # 3. WORK HOURS SCORE (25%)
+        avg_hours_per_day = total_hours / complete_days if complete_days > 0 else 0
+        # Ideal: 8-9 hours, Score calculation
+        if 7.5 <= avg_hours_per_day <= 9.5:
+            hours_score = 100 * 0.25
+        elif avg_hours_per_day > 9.5:
+            hours_score = max(80, 100 - (avg_hours_per_day - 9.5) * 5) * 0.25
+        else:
+            hours_score = (avg_hours_per_day / 8 * 100) * 0.25
+
+        # 4. CONSISTENCY SCORE (15%)
+        consistency_rate = max(0, 100 - (gaps * 10))
+        consistency_score = consistency_rate * 0.15
+
+        # OVERALL SCORE
+        overall_score = round(attendance_score + punctuality_score + hours_score + consistency_score, 1)
+
+        return {
+            "employee_id": user_id,
+            "employee_name": f"{first_name} {last_name}",
+            "email": email,
+            "department": department or "Not Set",
+            "role": role,
+            "overall_score": overall_score,
+            "grade": get_grade(overall_score),
+            "breakdown": {
+                "attendance": round(attendance_score / 0.35, 1),
+                "punctuality": round(punctuality_score / 0.25, 1),
+                "work_hours": round(hours_score / 0.25, 1),
+                "consistency": round(consistency_score / 0.15, 1)
+            },
+            "metrics": {
+                "days_present": actual_work_days,
+                "expected_days": expected_present_days,
+                "attendance_rate": round(attendance_rate, 1),
+                "avg_hours_per_day": round(avg_hours_per_day, 1),
+                "on_time_percentage": round(punctuality_rate, 1)
+            }
+        }
+
+
+class AnomalyScanner:
+    """
+    Vectorized anomaly scan over a company's recent attendance and leave.
+    The window is loaded once into columnar NumPy arrays and every detector
+    family runs as masks and per-user group-bys over those columns.
+    """
+
+    # Detector thresholds, in seconds since midnight where applicable
+    LATE_AFTER = 9 * 3600 + 31 * 60        # after 9:30 AM
+    EARLY_BEFORE = 6 * 3600                # before 6 AM
+    SAME_TIME_BUCKET = 120                 # check-ins within 2 minutes
+    LOW_HOURS = 6
+    EXCESSIVE_HOURS = 12
+
+    STATUS_CODES = {code: idx for idx, (code, _) in enumerate(Attendance.STATUS_CHOICES)}
+
+    def __init__(self, company, start_date, end_date):
+        self.company = company
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def scan(self):
+        """Return the anomaly categories keyed like the AnomalyDetectionView payload"""
+        self._load_employees()
+        self._load_attendance()
+        self._load_leave()
+
+        return {
+            "attendance_anomalies": self._attendance_anomalies(),
+            "leave_anomalies": self._leave_anomalies(),
+            "productivity_anomalies": self._productivity_anomalies(),
+            "policy_violations": self._policy_violations()
+        }
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _load_employees(self):
+        self.employees = list(
+            EmployeeProfile.objects.filter(
+                user__company=self.company,
+                user__is_active=True
+            ).values_list('user_id', 'user__first_name', 'user__last_name', 'user__email')
+        )
+        self.size = len(self.employees)
+        user_ids = np.array([row[0] for row in self.employees], dtype=np.int64)
+        self._sort_order = np.argsort(user_ids)
+        self._sorted_ids = user_ids[self._sort_order]
+
+    def _user_index(self, user_ids):
+        """
+        Positions in self.employees of raw user ids, plus a mask of the ids that
+        have one. Rows are loaded by their denormalized company column, which can
+        disagree with the user's current company (moved users, rows written before
+        the backfill), and include inactive users or users without a profile.
+        """
+        if not self.size:
+            return np.zeros(len(user_ids), dtype=np.int64), np.zeros(len(user_ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(self._sorted_ids, user_ids), self.size - 1)
+        known = self._sorted_ids[positions] == user_ids
+        return self._sort_order[positions], known
+
+    def _load_attendance(self):
+        rows = Attendance.objects.filter(
+            company=self.company,
+            date__gte=self.start_date,
+            date__lte=self.end_date
+        ).values_list(
+            'user_id', 'date', 'check_in', 'check_out', 'status'
+        ).iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+        user_ids, check_ins, check_outs, ordinals, statuses = [], [], [], [], []
+        for user_id, day, check_in, check_out, record_status in rows:
+            user_ids.append(user_id)
+            check_ins.append(time_to_seconds(check_in) if check_in else -1)
+            check_outs.append(time_to_seconds(check_out) if check_out else -1)
+            ordinals.append(day.toordinal())
+            statuses.append(self.STATUS_CODES.get(record_status, -1))
+
+        index, known = self._user_index(np.array(user_ids, dtype=np.int64))
+        self.att_user = index[known]
+        self.att_check_in = np.array(check_ins, dtype=np.int64)[known]
+        self.att_check_out = np.array(check_outs, dtype=np.int64)[known]
+        self.att_day = np.array(ordinals, dtype=np.int64)[known] - self.start_date.toordinal()
+        self.att_status = np.array(statuses, dtype=np.int64)[known]
+
+    def _load_leave(self):
+        # Leave overlapping the window or starting after it: requests made ahead of
+        # time count towards the leave patterns, and only approved days in the
+        # window count as covered
+        rows = TimeOff.objects.filter(
+            company=self.company,
+            end_date__gte=self.start_date
+        ).values_list(
+            'user_id', 'start_date', 'end_date', 'time_off_type', 'status'
+        ).iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+        user_ids, starts, ends, sick, approved = [], [], [], [], []
+        for user_id, leave_start, leave_end, leave_type, leave_status in rows:
+            user_ids.append(user_id)
+            starts.append(leave_start.toordinal())
+            ends.append(leave_end.toordinal())
+            sick.append(leave_type == 'SICK')
+            approved.append(leave_status == 'APPROVED')
+
+        index, known = self._user_index(np.array(user_ids, dtype=np.int64))
+        self.leave_user = index[known]
+        self.leave_start = np.array(starts, dtype=np.int64)[known]
+        self.leave_end = np.array(ends, dtype=np.int64)[known]
+        self.leave_sick = np.array(sick, dtype=bool)[known]
+        self.leave_approved = np.array(approved, dtype=bool)[known]
+
+    # ------------------------------------------------------------------
+    # Detectors
+    # ------------------------------------------------------------------
+
+    def _count_by_user(self, user_index, mask=None):
+        if mask is not None:
+            user_index = user_index[mask]
+        return np.bincount(user_index, minlength=self.size)
+
+    def _entry(self, idx, **fields):
+        _, first_name, last_name, email = self.employees[idx]
+        return {
+            "employee": f"{first_name} {last_name}",
+            "email": email,
+            **fields
+        }
+
+    def _attendance_anomalies(self):
+        total_days = self._count_by_user(self.att_user)
+
+        has_check_in = self.att_check_in >= 0
+        late = self._count_by_user(self.att_user, has_check_in & (self.att_check_in >= self.LATE_AFTER))
+        early = self._count_by_user(self.att_user, has_check_in & (self.att_check_in < self.EARLY_BEFORE))
+
+        # Repetitive check-in time: group by (user, 2-minute bucket)
+        buckets_per_day = SECONDS_PER_DAY // self.SAME_TIME_BUCKET
+        keys = self.att_user[has_check_in] * buckets_per_day + self.att_check_in[has_check_in] // self.SAME_TIME_BUCKET
+        unique_keys, key_counts = np.unique(keys, return_counts=True)
+        key_users = unique_keys // buckets_per_day
+        repeated = (key_counts > 10) & (key_counts / np.maximum(total_days[key_users], 1) > 0.5)
+        same_time = np.zeros(self.size, dtype=np.int64)
+        same_time[key_users[repeated]] = key_counts[repeated]
+
+        anomalies = []
+        for idx in np.flatnonzero(total_days > 0):
+            if late[idx] / total_days[idx] > 0.7:
+                anomalies.append(self._entry(
+                    idx,
+                    anomaly_type="Chronic Late Check-ins",
+                    severity="MEDIUM",
+                    details=f"{late[idx]} out of {total_days[idx]} days",
+                    recommendation="Discuss flexible work hours or address punctuality"
+                ))
+
+            if early[idx] > 5:
+                anomalies.append(self._entry(
+                    idx,
+                    anomaly_type="Unusual Early Check-ins",
+                    severity="LOW",
+                    details=f"{early[idx]} check-ins before 6 AM",
+                    recommendation="Verify if legitimate or potential time fraud"
+                ))
+
+            # Too many same-time check-ins (possible buddy punching)
+            if same_time[idx]:
+                anomalies.append(self._entry(
+                    idx,
+                    anomaly_type="Repetitive Check-in Time Pattern",
+                    severity="HIGH",
+                    details=f"Same check-in time ({same_time[idx]} times)",
+                    recommendation="Investigate for buddy punching or automated check-ins"
+                ))
+        return anomalies
+
+    def _leave_anomalies(self):
+        # Leave starting in the window or later, whatever its approval state
+        in_window = self.leave_start >= self.start_date.toordinal()
+        # date.toordinal() % 7 == 0 is Sunday, so Monday is 1 and Friday is 5
+        weekday = self.leave_start % 7
+        monday_friday = self._count_by_user(self.leave_user, in_window & ((weekday == 1) | (weekday == 5)))
+        sick = self._count_by_user(self.leave_user, in_window & self.leave_sick)
+
+        anomalies = []
+        for idx in np.flatnonzero((monday_friday >= 3) | (sick > 4)):
+            # Pattern: Always requesting leave on Mondays/Fridays
+            if monday_friday[idx] >= 3:
+                anomalies.append(self._entry(
+                    idx,
+                    anomaly_type="Weekend Extension Pattern",
+                    severity="MEDIUM",
+                    details=f"{monday_friday[idx]} leaves on Mon/Fri in last 30 days",
+                    recommendation="Discuss leave planning and weekend extension policy"
+                ))
+
+            # Excessive sick leave
+            if sick[idx] > 4:
+                anomalies.append(self._entry(
+                    idx,
+                    anomaly_type="Excessive Sick Leave",
+                    severity="HIGH",
+                    details=f"{sick[idx]} sick leaves in 30 days",
+                    recommendation="Wellness check or medical certificate verification"
+                ))
+        return anomalies
+
+    def _productivity_anomalies(self):
+        complete = (self.att_check_in >= 0) & (self.att_check_out >= 0)
+        durations = self.att_check_out[complete] - self.att_check_in[complete]
+        # Handle overnight shifts
+        durations = np.where(durations < 0, durations + SECONDS_PER_DAY, durations) / 3600
+
+        users = self.att_user[complete]
+        days = np.bincount(users, minlength=self.size)
+        hours = np.bincount(users, weights=durations, minlength=self.size)
+        avg_hours = np.divide(hours, days, out=np.zeros(self.size), where=days > 0)
+
+        anomalies = []
+        flagged = (days > 0) & ((avg_hours < self.LOW_HOURS) | (avg_hours > self.EXCESSIVE_HOURS))
+        for idx in np.flatnonzero(flagged):
+            if avg_hours[idx] < self.LOW_HOURS:
+                anomalies.append(self._entry(
+                    idx,
+                    anomaly_type="Low Working Hours",
+                    severity="HIGH",
+                    details=f"Average {avg_hours[idx]:.1f} hours/day",
+                    recommendation="Investigate workload distribution or time management"
+                ))
+            else:
+                anomalies.append(self._entry(
+                    idx,
+                    anomaly_type="Excessive Working Hours",
+                    severity="HIGH",
+                    details=f"Average {avg_hours[idx]:.1f} hours/day",
+                    recommendation="Enforce work-life balance policies"
+                ))
+        return anomalies
+
+    def _policy_violations(self):
+        window = (self.end_date - self.start_date).days
+        covered = np.zeros((self.size, window + 1), dtype=bool)
+
+        # Days with a check-in or an attendance row already marked as leave
+        attended = ((self.att_check_in >= 0) | (self.att_status == self.STATUS_CODES['LEAVE'])) & (self.att_day < window)
+        covered[self.att_user[attended], self.att_day[attended]] = True
+
+        # Approved leave ranges, clipped to the window, via a difference array
+        origin = self.start_date.toordinal()
+        starts = np.clip(self.leave_start[self.leave_approved] - origin, 0, window)
+        ends = np.clip(self.leave_end[self.leave_approved] - origin, 0, window)
+        users = self.leave_user[self.leave_approved]
+        delta = np.zeros((self.size, window + 2), dtype=np.int64)
+        np.add.at(delta, (users, starts), 1)
+        np.add.at(delta, (users, ends + 1), -1)
+        covered |= np.cumsum(delta, axis=1)[:, :window + 1] > 0
+
+        # Only the 30 days starting at the window start, weekdays only
+        weekdays = np.array([
+            (self.start_date + timedelta(days=offset)).weekday() < 5
+            for offset in range(window)
+        ], dtype=bool)
+        missing_days = (~covered[:, :window] & weekdays).sum(axis=1)
+
+        return [
+            self._entry(
+                idx,
+                violation_type="Unapproved Absences",
+                severity="HIGH",
+                details=f"{missing_days[idx]} days without attendance or approved leave",
+                recommendation="Immediate follow-up required"
+            )
+            for idx in np.flatnonzero(missing_days > 3)
+        ]
+
+
+def to_minor_units(value):
+    """Exact integer hundredths for a 2-decimal-place DecimalField value"""
+    return int(Decimal(value or 0).scaleb(2).to_integral_value(ROUND_HALF_UP))
+
+
+def from_minor_units(value):
+    """Decimal amount for an integer count of hundredths"""
+    return Decimal(int(value)).scaleb(-2)
+
+
+def round_half_up_div(numerator, denominator):
+    """Element-wise numerator / denominator rounded half away from zero, in integers"""
+    magnitude = (2 * np.abs(numerator) + denominator) // (2 * denominator)
+    return np.sign(numerator) * magnitude
+
+
+class PayrollEngine:
+    """
+    Vectorized monthly payroll for every active employee of a company.
+    One grouped query loads the month's per-user status counts and one
+    values_list loads the salary columns; gross, deductions, PF and net are
+    then computed for everyone at once. Money is held as int64 hundredths and
+    working time as half-days, so every figure is exact and rounded half-up
+    to Decimal only at the edges. Pass user_ids to compute a subset (one
+    chunk of a payroll run, or only the dirty payslips).
+    """
+
+    # Standard working days per month that the monthly wage covers
+    STANDARD_WORKING_DAYS = 22
+
+    # Columns loaded per employee; the money columns are 2-decimal DecimalFields
+    EMPLOYEE_FIELDS = (
+        'user_id', 'user__employee_id', 'user__first_name', 'user__last_name', 'user__email',
+        'department', 'job_title'
+    )
+    MONEY_FIELDS = (
+        'monthly_wage', 'basic_salary', 'house_rent_allowance', 'standard_allowance',
+        'fixed_allowance', 'professional_tax', 'pf_employee_contribution'
+    )
+
+    def __init__(self, company, start_date, end_date, user_ids=None):
+        self.company = company
+        self.start_date = start_date
+        self.end_date = end_date
+        self.user_ids = user_ids
+
+    def compute(self):
+        """Load and compute the month; returns self for chaining"""
+        self._load_employees()
+        self._load_attendance()
+        self._compute()
+        return self
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _load_employees(self):
+        profiles = EmployeeProfile.objects.filter(user__company=self.company, user__is_active=True)
+        if self.user_ids is not None:
+            profiles = profiles.filter(user_id__in=self.user_ids)
+        rows = list(
+            profiles.order_by('user__employee_id', 'user_id').values_list(*self.EMPLOYEE_FIELDS, *self.MONEY_FIELDS)
+        )
+        width = len(self.EMPLOYEE_FIELDS)
+        self.employees = [row[:width] for row in rows]
+        self.size = len(rows)
+
+        self.money = {
+            field: np.fromiter(
+                (to_minor_units(row[width + offset]) for row in rows), dtype=np.int64, count=self.size
+            )
+            for offset, field in enumerate(self.MONEY_FIELDS)
+        }
+
+        user_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self._sort_order = np.argsort(user_ids)
+        self._sorted_ids = user_ids[self._sort_order]
+
+    def _load_attendance(self):
+        attendance = Attendance.objects.filter(
+            company=self.company,
+            date__gte=self.start_date,
+            date__lte=self.end_date
+        )
+        if self.user_ids is not None:
+            attendance = attendance.filter(user_id__in=self.user_ids)
+        rows = list(
+            attendance.values('user_id').annotate(
+                present=Count('id', filter=Q(status='PRESENT')),
+                half_day=Count('id', filter=Q(status='HALF_DAY')),
+                leave=Count('id', filter=Q(status='LEAVE'))
+            ).order_by().values_list('user_id', 'present', 'half_day', 'leave')
+        )
+        counts = np.array(rows, dtype=np.int64).reshape(-1, 4)
+
+        # Keep only rows for employees in the payroll (active, with a profile)
+        positions = np.searchsorted(self._sorted_ids, counts[:, 0])
+        positions = np.minimum(positions, max(self.size - 1, 0))
+        known = (self._sorted_ids[positions] == counts[:, 0]) if self.size else np.zeros(len(counts), dtype=bool)
+        index = self._sort_order[positions[known]]
+
+        self.present_days = np.zeros(self.size, dtype=np.int64)
+        self.half_days = np.zeros(self.size, dtype=np.int64)
+        self.leave_days = np.zeros(self.size, dtype=np.int64)
+        self.present_days[index] = counts[known, 1]
+        self.half_days[index] = counts[known, 2]
+        self.leave_days[index] = counts[known, 3]
+
+    # ------------------------------------------------------------------
+    # Computation
+    # ------------------------------------------------------------------
+
+    def _compute(self):
+        # Working time in half-days keeps the 0.5 weighting of half days integral
+        self.working_half_days = 2 * (self.present_days + self.leave_days) + self.half_days
+        self._denominator = 2 * self.STANDARD_WORKING_DAYS
+
+        self.gross = self._prorate(self.money['monthly_wage'])
+
+        self.pf_employee = self.money['pf_employee_contribution']
+        self.deductions = self.money['professional_tax'] + self.pf_employee
+        self.net = self.gross - self.deductions
+        self.allowances = self.money['standard_allowance'] + self.money['fixed_allowance']
+
+        # Components earned for the days worked
+        self.earned_basic = self._prorate(self.money['basic_salary'])
+        self.earned_hra = self._prorate(self.money['house_rent_allowance'])
+        self.earned_allowances = self._prorate(self.allowances)
+
+    def _prorate(self, amounts):
+        """Monthly amounts scaled to the days worked, each rounded once from the exact value"""
+        return round_half_up_div(amounts * self.working_half_days, self._denominator)
+
+    def rows(self):
+        """Per-employee payroll lines, in employee id order"""
+        for idx, (user_id, employee_id, first_name, last_name, email, department, job_title) in enumerate(self.employees):
+            yield {
+                'user_id': user_id,
+                'employee_id': employee_id,
+                'name': f"{first_name} {last_name}",
+                'email': email,
+                'department': department,
+                'job_title': job_title,
+                'present_days': int(self.present_days[idx]),
+                'half_days': int(self.half_days[idx]),
+                'leave_days': int(self.leave_days[idx]),
+                'working_days': (Decimal(int(self.working_half_days[idx])) / 2).quantize(Decimal('0.1')),
+                'monthly_wage': from_minor_units(self.money['monthly_wage'][idx]),
+                'gross_salary': from_minor_units(self.gross[idx]),
+                'basic_salary': from_minor_units(self.money['basic_salary'][idx]),
+                'hra': from_minor_units(self.money['house_rent_allowance'][idx]),
+                'allowances': from_minor_units(self.allowances[idx]),
+                'earned_basic': from_minor_units(self.earned_basic[idx]),
+                'earned_hra': from_minor_units(self.earned_hra[idx]),
+                'earned_allowances': from_minor_units(self.earned_allowances[idx]),
+                'professional_tax': from_minor_units(self.money['professional_tax'][idx]),
+                'pf_employee': from_minor_units(self.pf_employee[idx]),
+                'total_deductions': from_minor_units(self.deductions[idx]),
+                'net_salary': from_minor_units(self.net[idx])
+            }
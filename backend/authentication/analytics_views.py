@@ -11,14 +11,21 @@ from django.db.models import Count, Sum, Avg, Q, F, FloatField
 from django.db.models.functions import TruncDate, TruncMonth
 from datetime import date, datetime, timedelta
 from calendar import monthrange
-from .models import User, Attendance, TimeOff, LeaveAllocation, EmployeeProfile
+from .models import User, Attendance, TimeOff, LeaveAllocation, EmployeeProfile, PayrollRun
+from .rollups import rollup_trend, rollup_summary, rollup_departments
 from .permissions import IsAdmin
+from .analytics_cache import cached_analytics
+from .presence import presence_counts
+from .date_ranges import year_bounds
+from .payroll import refresh_run
 
 
 class AnalyticsDashboardView(APIView):
     """Comprehensive analytics dashboard for Admin/HR"""
     permission_classes = [IsAuthenticated, IsAdmin]
+    query_budget = 20
     
+    @cached_analytics()
     def get(self, request):
         company = request.user.company
         today = date.today()
@@ -26,6 +33,7 @@ class AnalyticsDashboardView(APIView):
         current_year = today.year
         
         # Date ranges
+        year_start, year_end = year_bounds(current_year)
         month_start = date(current_year, current_month, 1)
         last_day = monthrange(current_year, current_month)[1]
         month_end = date(current_year, current_month, last_day)
@@ -36,7 +44,9 @@ class AnalyticsDashboardView(APIView):
         # ============================================================
         # EMPLOYEE STATISTICS
         # ============================================================
-        total_employees = User.objects.filter(company=company, is_active=True).count()
+        # Headcount and today's attendance split come from the presence board
+        presence = presence_counts(company.id)
+        total_employees = presence['total']
         
         employees_by_role = User.objects.filter(
             company=company,
@@ -52,75 +62,41 @@ class AnalyticsDashboardView(APIView):
         # ATTENDANCE STATISTICS
         # ============================================================
         
-        # Today's attendance
-        today_attendance = Attendance.objects.filter(
-            user__company=company,
-            date=today
-        ).values('status').annotate(count=Count('id'))
-        
-        today_stats = {
-            'PRESENT': 0,
-            'ABSENT': 0,
-            'HALF_DAY': 0,
-            'LEAVE': 0
-        }
-        
-        for item in today_attendance:
-            today_stats[item['status']] = item['count']
-        
-        # Calculate absent (employees who haven't marked attendance)
-        marked_today = sum(today_stats.values())
-        today_stats['ABSENT'] = max(0, total_employees - marked_today)
+        # Today's attendance (presence board)
+        today_stats = {key: presence[key] for key in ('PRESENT', 'ABSENT', 'HALF_DAY', 'LEAVE')}
         
         # Current month attendance statistics
-        month_attendance = Attendance.objects.filter(
-            user__company=company,
-            date__gte=month_start,
-            date__lte=month_end
-        ).aggregate(
-            total_present=Count('id', filter=Q(status='PRESENT')),
-            total_absent=Count('id', filter=Q(status='ABSENT')),
-            total_half_day=Count('id', filter=Q(status='HALF_DAY')),
-            total_leave=Count('id', filter=Q(status='LEAVE')),
-            avg_work_hours=Avg('work_hours'),
-            total_overtime=Sum('extra_hours')
-        )
+        month_summary = rollup_summary(company, month_start, month_end)
+        month_attendance = {
+            'total_present': month_summary['present'],
+            'total_absent': month_summary['absent'],
+            'total_half_day': month_summary['half_day'],
+            'total_leave': month_summary['leave'],
+            'avg_work_hours': month_summary['avg_work_hours'],
+            'total_overtime': month_summary['extra_hours'] if month_summary['total'] else None
+        }
         
         # Attendance trend (last 30 days)
-        attendance_trend = Attendance.objects.filter(
-            user__company=company,
-            date__gte=days_30_ago,
-            date__lte=today
-        ).values('date').annotate(
-            present=Count('id', filter=Q(status='PRESENT')),
-            absent=Count('id', filter=Q(status='ABSENT')),
-            half_day=Count('id', filter=Q(status='HALF_DAY')),
-            leave=Count('id', filter=Q(status='LEAVE'))
-        ).order_by('date')
+        attendance_trend = rollup_trend(company, days_30_ago, today)
         
         # Top performers (highest attendance percentage)
         top_performers = []
-        employees = User.objects.filter(company=company, is_active=True)[:10]
+        month_attendance_filter = Q(attendance_records__date__gte=month_start, attendance_records__date__lte=month_end)
+        employees = User.objects.filter(company=company, is_active=True).select_related('profile').annotate(
+            total_days=Count('attendance_records', filter=month_attendance_filter),
+            present_days=Count('attendance_records', filter=month_attendance_filter & Q(attendance_records__status='PRESENT'))
+        )[:10]
         
         for emp in employees:
-            emp_attendance = Attendance.objects.filter(
-                user=emp,
-                date__gte=month_start,
-                date__lte=month_end
-            )
-            
-            total_days = emp_attendance.count()
-            present_days = emp_attendance.filter(status='PRESENT').count()
-            
-            if total_days > 0:
-                percentage = (present_days / total_days) * 100
+            if emp.total_days > 0:
+                percentage = (emp.present_days / emp.total_days) * 100
                 top_performers.append({
                     'employee_id': emp.employee_id,
                     'name': emp.get_full_name(),
                     'department': emp.profile.department if hasattr(emp, 'profile') else '',
                     'attendance_percentage': round(percentage, 2),
-                    'present_days': present_days,
-                    'total_days': total_days
+                    'present_days': emp.present_days,
+                    'total_days': emp.total_days
                 })
         
         top_performers = sorted(top_performers, key=lambda x: x['attendance_percentage'], reverse=True)[:5]
@@ -130,8 +106,9 @@ class AnalyticsDashboardView(APIView):
         # ============================================================
         
         leave_stats = TimeOff.objects.filter(
-            user__company=company,
-            start_date__year=current_year
+            company=company,
+            start_date__gte=year_start,
+            start_date__lte=year_end
         ).aggregate(
             total_requests=Count('id'),
             pending=Count('id', filter=Q(status='PENDING')),
@@ -141,8 +118,9 @@ class AnalyticsDashboardView(APIView):
         
         # Leave by type
         leave_by_type = TimeOff.objects.filter(
-            user__company=company,
-            start_date__year=current_year,
+            company=company,
+            start_date__gte=year_start,
+            start_date__lte=year_end,
             status='APPROVED'
         ).values('time_off_type').annotate(
             count=Count('id'),
@@ -151,8 +129,9 @@ class AnalyticsDashboardView(APIView):
         
         # Leave trend (monthly)
         leave_trend = TimeOff.objects.filter(
-            user__company=company,
-            start_date__year=current_year
+            company=company,
+            start_date__gte=year_start,
+            start_date__lte=year_end
         ).annotate(
             month=TruncMonth('start_date')
         ).values('month').annotate(
@@ -188,7 +167,7 @@ class AnalyticsDashboardView(APIView):
         # ============================================================
         
         recent_leaves = TimeOff.objects.filter(
-            user__company=company
+            company=company
         ).select_related('user').order_by('-created_at')[:5]
         
         recent_activities = []
@@ -261,6 +240,7 @@ class AttendanceTrendAnalyticsView(APIView):
     """Detailed attendance trend analytics"""
     permission_classes = [IsAuthenticated, IsAdmin]
     
+    @cached_analytics()
     def get(self, request):
         company = request.user.company
         days = int(request.query_params.get('days', 30))
@@ -268,40 +248,19 @@ class AttendanceTrendAnalyticsView(APIView):
         end_date = date.today()
         start_date = end_date - timedelta(days=days)
         
-        # Daily trend
-        daily_trend = Attendance.objects.filter(
-            user__company=company,
-            date__gte=start_date,
-            date__lte=end_date
-        ).values('date').annotate(
-            present=Count('id', filter=Q(status='PRESENT')),
-            absent=Count('id', filter=Q(status='ABSENT')),
-            half_day=Count('id', filter=Q(status='HALF_DAY')),
-            leave=Count('id', filter=Q(status='LEAVE')),
-            total_work_hours=Sum('work_hours'),
-            total_overtime=Sum('extra_hours')
-        ).order_by('date')
+        # Daily trend (one rollup row per day)
+        daily_trend = rollup_trend(company, start_date, end_date)
         
         # Department-wise attendance
-        dept_attendance = Attendance.objects.filter(
-            user__company=company,
-            date__gte=start_date,
-            date__lte=end_date,
-            user__profile__isnull=False
-        ).values('user__profile__department').annotate(
-            present_count=Count('id', filter=Q(status='PRESENT')),
-            total_records=Count('id')
-        ).exclude(user__profile__department='')
-        
         dept_stats = []
-        for item in dept_attendance:
-            if item['total_records'] > 0:
-                percentage = (item['present_count'] / item['total_records']) * 100
+        for department, counts in rollup_departments(company, start_date, end_date).items():
+            if department and counts['total'] > 0:
+                percentage = (counts['PRESENT'] / counts['total']) * 100
                 dept_stats.append({
-                    'department': item['user__profile__department'],
+                    'department': department,
                     'attendance_percentage': round(percentage, 2),
-                    'present_count': item['present_count'],
-                    'total_records': item['total_records']
+                    'present_count': counts['PRESENT'],
+                    'total_records': counts['total']
                 })
         
         return Response({
@@ -319,13 +278,15 @@ class LeaveAnalyticsView(APIView):
     """Detailed leave analytics"""
     permission_classes = [IsAuthenticated, IsAdmin]
     
+    @cached_analytics()
     def get(self, request):
         company = request.user.company
         year = int(request.query_params.get('year', date.today().year))
+        year_start, year_end = year_bounds(year)
         
         # Leave allocation summary
         allocation_summary = LeaveAllocation.objects.filter(
-            user__company=company,
+            company=company,
             year=year
         ).aggregate(
             total_paid_allocated=Sum('paid_leave_total'),
@@ -340,8 +301,9 @@ class LeaveAnalyticsView(APIView):
         
         # Leave requests by month
         monthly_requests = TimeOff.objects.filter(
-            user__company=company,
-            start_date__year=year
+            company=company,
+            start_date__gte=year_start,
+            start_date__lte=year_end
         ).annotate(
             month=TruncMonth('start_date')
         ).values('month', 'status').annotate(
@@ -354,9 +316,13 @@ class LeaveAnalyticsView(APIView):
             user__is_active=True
         ).exclude(department='').values('department').annotate(
             employees=Count('user'),
-            total_requests=Count('user__time_off_requests', filter=Q(user__time_off_requests__start_date__year=year)),
+            total_requests=Count('user__time_off_requests', filter=Q(
+                user__time_off_requests__start_date__gte=year_start,
+                user__time_off_requests__start_date__lte=year_end
+            )),
             approved_requests=Count('user__time_off_requests', filter=Q(
-                user__time_off_requests__start_date__year=year,
+                user__time_off_requests__start_date__gte=year_start,
+                user__time_off_requests__start_date__lte=year_end,
                 user__time_off_requests__status='APPROVED'
             ))
         )
@@ -384,6 +350,7 @@ class PayrollAnalyticsView(APIView):
     """Payroll analytics and insights"""
     permission_classes = [IsAuthenticated, IsAdmin]
     
+    @cached_analytics()
     def get(self, request):
         company = request.user.company
         
@@ -447,6 +414,16 @@ class PayrollAnalyticsView(APIView):
             total_payroll=Sum('monthly_wage')
         )
         
+        # Actual payouts of recent months, read from the payroll run snapshots
+        # after bringing open runs' dirty payslips up to date
+        for run in PayrollRun.objects.filter(company=company, status='OPEN').order_by('-year', '-month')[:6]:
+            refresh_run(run)
+        recent_runs = PayrollRun.objects.filter(company=company).annotate(
+            employee_count=Count('payslips'),
+            total_gross=Sum('payslips__gross_salary'),
+            total_net=Sum('payslips__net_salary')
+        ).order_by('-year', '-month')[:6]
+        
         return Response({
             'overall_statistics': {
                 'total_employees': payroll_stats['total_employees'] or 0,
@@ -474,5 +451,15 @@ class PayrollAnalyticsView(APIView):
                     'avg_salary': float(item['avg_salary']),
                     'total_payroll': float(item['total_payroll'])
                 } for item in role_salary
+            ],
+            'payroll_runs': [
+                {
+                    'year': run.year,
+                    'month': run.month,
+                    'status': run.status,
+                    'employee_count': run.employee_count,
+                    'total_gross': float(run.total_gross or 0),
+                    'total_net': float(run.total_net or 0)
+                } for run in recent_runs
             ]
         })
@@ -0,0 +1,265 @@
+"""
+Bulk Attendance Ingestion
+Merges batches of buffered check-in/check-out punches (biometric terminals,
+offline mobile apps) into Attendance rows: one lookup each for idempotency
+keys, users and existing rows, work hours computed for the whole batch with
+numpy, one upsert, then the derived data bulk writes skip (rollups, payslips,
+presence board, analytics cache, live dashboards)
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .analytics_cache import invalidate_company
+from .models import User, Attendance, AttendancePunch
+from .payroll import mark_dirty_many
+from .presence import refresh_users
+from .realtime import publish_attendance_day
+from .rollups import refresh_day
+
+
+MAX_BATCH_SIZE = 1000
+MAX_KEY_LENGTH = 128
+
+# Punches further ahead than this are clock errors, not buffered punches
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+ACTIONS = {action for action, _ in AttendancePunch.ACTION_CHOICES}
+
+# Columns a punch may set on the merged row
+LOCATION_FIELDS = {
+    'check_in': ('check_in_latitude', 'check_in_longitude', 'check_in_location'),
+    'check_out': ('check_out_latitude', 'check_out_longitude', 'check_out_location'),
+}
+
+UPSERT_FIELDS = [
+    'company', 'check_in', 'check_out', *LOCATION_FIELDS['check_in'], *LOCATION_FIELDS['check_out'],
+    'work_hours', 'extra_hours', 'status', 'updated_at'
+]
+
+HUNDREDTH = Decimal('0.01')
+COORDINATE = Decimal('0.000001')
+
+
+class IngestError(Exception):
+    """Request-level problem with a punch batch"""
+
+
+# ============================================================================
+# WORK HOURS
+# ============================================================================
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+
+
+def work_hours(check_ins, check_outs):
+    """
+    Attendance.calculate_work_hours over arrays of check-in/check-out times:
+    (work_hours, extra_hours, worked) with overnight shifts wrapping past midnight
+    """
+    check_in = np.array([_seconds(value) for value in check_ins], dtype=np.float64)
+    check_out = np.array([_seconds(value) for value in check_outs], dtype=np.float64)
+    check_out = np.where(check_out < check_in, check_out + 86400, check_out)
+
+    hours = (check_out - check_in) / 3600
+    standard = Attendance.STANDARD_WORK_HOURS
+    return np.minimum(hours, standard), np.maximum(0, hours - standard), hours > 0
+
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+
+def _parse_punch(item, now):
+    """(key, action, employee_id, punched_at, location) from one batch item; ValueError when invalid"""
+    if not isinstance(item, dict):
+        raise ValueError('Each punch must be an object')
+
+    key = item.get('idempotency_key')
+    if not isinstance(key, str) or not key.strip():
+        raise ValueError('idempotency_key is required')
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f'idempotency_key must be at most {MAX_KEY_LENGTH} characters')
+
+    action = item.get('action')
+    if action not in ACTIONS:
+        raise ValueError('action must be "check_in" or "check_out"')
+
+    punched_at = parse_datetime(str(item.get('timestamp') or ''))
+    if punched_at is None:
+        raise ValueError('timestamp must be an ISO 8601 date-time')
+    # Naive timestamps are the terminal's wall clock; aware ones are shown in local time
+    if timezone.is_naive(punched_at):
+        punched_at = timezone.make_aware(punched_at)
+    if punched_at > now + MAX_CLOCK_SKEW:
+        raise ValueError('timestamp is in the future')
+
+    latitude, longitude = item.get('latitude'), item.get('longitude')
+    location = None
+    if latitude and longitude:
+        try:
+            latitude, longitude = Decimal(str(latitude)).quantize(COORDINATE), Decimal(str(longitude)).quantize(COORDINATE)
+        except ArithmeticError:
+            raise ValueError('latitude and longitude must be numbers')
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError('latitude or longitude out of range')
+        location = (latitude, longitude, str(item.get('location', ''))[:500])
+
+    employee_id = item.get('employee_id')
+    return key.strip(), action, str(employee_id) if employee_id else None, punched_at, location
+
+
+# ============================================================================
+# INGESTION
+# ============================================================================
+
+def ingest_punches(actor, items):
+    """
+    Apply a batch of punches for employees of the actor's company (Admin/HR),
+    or for the actor alone. A day keeps its earliest check-in and latest
+    check-out, so replays and out-of-order batches converge on the same row.
+    Returns one result per item, in order: {'index', 'idempotency_key',
+    'status': 'applied' | 'duplicate' | 'rejected', 'error'?, 'employee_id'?, 'date'?}.
+    """
+    if not isinstance(items, list) or not items:
+        raise IngestError('punches must be a non-empty list')
+    if len(items) > MAX_BATCH_SIZE:
+        raise IngestError(f'At most {MAX_BATCH_SIZE} punches per batch')
+
+    company_id = actor.company_id
+    can_submit_for_others = actor.role in ('ADMIN', 'HR')
+    now = timezone.now()
+
+    results = [{'index': index, 'idempotency_key': None} for index in range(len(items))]
+    punches = {}
+    for index, item in enumerate(items):
+        try:
+            key, action, employee_id, punched_at, location = _parse_punch(item, now)
+        except ValueError as e:
+            results[index].update(status='rejected', error=str(e))
+            if isinstance(item, dict) and isinstance(item.get('idempotency_key'), str):
+                results[index]['idempotency_key'] = item['idempotency_key'][:MAX_KEY_LENGTH]
+            continue
+        results[index]['idempotency_key'] = key
+        if key in punches:
+            results[index]['status'] = 'duplicate'
+            continue
+        employee_id = employee_id or actor.employee_id
+        if employee_id != actor.employee_id and not can_submit_for_others:
+            results[index].update(status='rejected', error='You can only submit your own punches')
+            continue
+        punches[key] = (index, action, employee_id, punched_at, location)
+
+    # Keys already applied by an earlier batch
+    seen = set(
+        AttendancePunch.objects.filter(company_id=company_id, idempotency_key__in=list(punches))
+        .values_list('idempotency_key', flat=True)
+    )
+    for key in seen:
+        results[punches.pop(key)[0]]['status'] = 'duplicate'
+
+    # One lookup for every employee in the batch
+    users = {
+        employee_id: (user_id, is_active)
+        for employee_id, user_id, is_active in User.objects.filter(
+            company_id=company_id, employee_id__in={punch[2] for punch in punches.values()}
+        ).values_list('employee_id', 'id', 'is_active')
+    }
+
+    days = defaultdict(list)
+    accepted = []
+    for key, (index, action, employee_id, punched_at, location) in punches.items():
+        user = users.get(employee_id)
+        if user is None or not user[1]:
+            results[index].update(status='rejected', error=f'Unknown or inactive employee: {employee_id}')
+            continue
+        local = timezone.localtime(punched_at)
+        days[(user[0], local.date())].append((action, local.time().replace(tzinfo=None), location))
+        accepted.append(AttendancePunch(
+            company_id=company_id, idempotency_key=key, user_id=user[0], action=action,
+            punched_at=punched_at, submitted_by_id=actor.pk
+        ))
+        results[index].update(status='applied', employee_id=employee_id, date=local.date().isoformat())
+
+    if days:
+        with transaction.atomic():
+            _merge(company_id, days)
+            AttendancePunch.objects.bulk_create(accepted, ignore_conflicts=True)
+            _refresh_derived(company_id, days)
+
+    return results
+
+
+def _merge(company_id, days):
+    """
+    Fold each (user, day)'s punches into its Attendance row and upsert the rows.
+    Runs inside the caller's transaction: missing rows are inserted first so that
+    every row can be locked, and a concurrent batch or check-in touching the same
+    day waits instead of having its punches overwritten.
+    """
+    Attendance.objects.bulk_create(
+        [Attendance(user_id=user_id, date=day, company_id=company_id) for user_id, day in days],
+        ignore_conflicts=True
+    )
+    # Users x dates is a superset of the (user, day) pairs; extra rows are ignored
+    existing = {
+        (record.user_id, record.date): record
+        for record in Attendance.objects.select_for_update().filter(
+            user_id__in={user_id for user_id, _ in days}, date__in={day for _, day in days}
+        )
+    }
+
+    rows = []
+    for (user_id, day), day_punches in days.items():
+        row = existing[(user_id, day)]
+        row.company_id = company_id
+        for action, punched, location in sorted(day_punches, key=lambda punch: punch[1]):
+            current = getattr(row, action)
+            # Earliest check-in and latest check-out win
+            if current is None or (punched < current if action == 'check_in' else punched > current):
+                setattr(row, action, punched)
+                if location:
+                    for field, value in zip(LOCATION_FIELDS[action], location):
+                        setattr(row, field, value)
+        if row.check_in:
+            row.status = 'PRESENT'
+        rows.append(row)
+
+    # Work hours for every row with both punches, in one pass
+    complete = [row for row in rows if row.check_in and row.check_out]
+    if complete:
+        hours, extra, worked = work_hours([row.check_in for row in complete], [row.check_out for row in complete])
+        for row, row_hours, row_extra, row_worked in zip(complete, hours, extra, worked):
+            row.work_hours = Decimal(float(row_hours)).quantize(HUNDREDTH)
+            row.extra_hours = Decimal(float(row_extra)).quantize(HUNDREDTH)
+            if row_worked:
+                row.status = 'PRESENT'
+
+    # bulk_create skips the pre_save signal, so the company column is set above
+    Attendance.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user', 'date'],
+        update_fields=UPSERT_FIELDS
+    )
+
+
+def _refresh_derived(company_id, days):
+    """What the Attendance signals would have done for each saved row, batched"""
+    dates = sorted({day for _, day in days})
+    # Only the touched days: a batch spanning months must not rebuild every day in between
+    for day in dates:
+        refresh_day(company_id, day)
+    mark_dirty_many(days)
+    invalidate_company(company_id)
+    today = date.today()
+    refresh_users(company_id, today, [user_id for user_id, day in days if day == today])
+    for day in dates:
+        publish_attendance_day(company_id, day)
@@ -15,6 +15,19 @@ from .profile_serializers import (
     NotificationSerializer
 )
 from .permissions import IsAdmin
+from .date_ranges import month_bounds, month_from_params
+from .directory import (
+    DirectoryQueryError,
+    directory_queryset,
+    directory_page,
+    parse_bool,
+    parse_fields,
+    parse_limit
+)
+from .attendance_ingest import IngestError, ingest_punches
+from .employee_cards import IN_STATUSES, card_grid, card_queryset, parse_page, parse_page_size, parse_statuses
+from .presence import BOARD_STATUSES, presence_counts, presence_members
+from .search import search_employees
 
 
 class MyProfileView(APIView):
@@ -65,10 +78,11 @@ class EmployeeDashboardView(APIView):
         current_year = today.year
         
         # Attendance count for current month
+        month_start, month_end = month_bounds(current_year, current_month)
         attendance_count = Attendance.objects.filter(
             user=user,
-            date__month=current_month,
-            date__year=current_year,
+            date__gte=month_start,
+            date__lte=month_end,
             status='PRESENT'
         ).count()
         
@@ -130,7 +144,12 @@ class EmployeeDashboardView(APIView):
 
 
 class AdminDashboardView(APIView):
-    """Dashboard summary for admin/HR"""
+    """
+    Dashboard summary for admin/HR
+    
+    Query params:
+    - page, page_size: employee card page (default 1, 10 cards; max 500)
+    """
     permission_classes = [IsAuthenticated, IsAdmin]
     
     def get(self, request):
@@ -139,8 +158,10 @@ class AdminDashboardView(APIView):
         current_month = today.month
         current_year = today.year
         
-        # Total employees
-        total_employees = User.objects.filter(company=company, is_active=True).count()
+        # Today's attendance split and headcount from the presence board
+        presence = presence_counts(company.id)
+        total_employees = presence['total']
+        attendance_summary = {key: presence[key] for key in ('PRESENT', 'HALF_DAY', 'LEAVE', 'ABSENT')}
         
         # Employees by role
         employees_by_role = User.objects.filter(
@@ -150,59 +171,31 @@ class AdminDashboardView(APIView):
         
         # Pending leave requests
         pending_leaves = TimeOff.objects.filter(
-            user__company=company,
+            company=company,
             status='PENDING'
         ).count()
         
-        # Today's attendance overview
-        today_attendance = Attendance.objects.filter(
-            user__company=company,
-            date=today
-        ).values('status').annotate(count=Count('id'))
-        
-        attendance_summary = {
-            'PRESENT': 0,
-            'ABSENT': 0,
-            'LEAVE': 0
-        }
-        for item in today_attendance:
-            attendance_summary[item['status']] = item['count']
-        
-        # Calculate absent employees
-        attendance_summary['ABSENT'] = total_employees - (
-            attendance_summary['PRESENT'] + attendance_summary['LEAVE']
-        )
-        
         # Monthly attendance stats
+        month_start, month_end = month_bounds(current_year, current_month)
         monthly_attendance = Attendance.objects.filter(
-            user__company=company,
-            date__month=current_month,
-            date__year=current_year,
+            company=company,
+            date__gte=month_start,
+            date__lte=month_end,
             status='PRESENT'
         ).count()
         
-        # Recent employee list for cards
-        employees = User.objects.filter(
-            company=company,
-            is_active=True
-        ).select_related('profile')[:10]
-        
-        employee_cards = []
-        for emp in employees:
-            try:
-                today_att = Attendance.objects.get(user=emp, date=today)
-                emp_status = today_att.status
-            except Attendance.DoesNotExist:
-                emp_status = 'ABSENT'
-            
-            employee_cards.append({
-                'employee_id': emp.employee_id,
-                'name': emp.get_full_name(),
-                'email': emp.email,
-                'job_title': emp.profile.job_title if hasattr(emp, 'profile') else '',
-                'avatar': request.build_absolute_uri(emp.profile.avatar.url) if hasattr(emp, 'profile') and emp.profile.avatar else None,
-                'status': emp_status
-            })
+        # Most recent employees as cards, with today's status (one query; total is counted above)
+        params = request.query_params
+        try:
+            employee_cards = card_grid(
+                card_queryset(company.id, day=today),
+                request,
+                page=parse_page(params.get('page')),
+                page_size=parse_page_size(params.get('page_size'), default=10),
+                total=total_employees
+            )
+        except DirectoryQueryError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'summary': {
@@ -212,10 +205,72 @@ class AdminDashboardView(APIView):
             },
             'employees_by_role': list(employees_by_role),
             'attendance_today': attendance_summary,
-            'employee_cards': employee_cards
+            'employee_cards': employee_cards['results'],
+            'employee_cards_page': {
+                key: employee_cards[key] for key in ('page', 'page_size', 'total', 'pages')
+            }
         })
 
 
+class EmployeeCardsView(APIView):
+    """
+    Employee card grid with today's attendance status (Admin only)
+    
+    Query params:
+    - status: comma-separated attendance statuses to show (ABSENT = no record)
+    - department: filter
+    - page, page_size: grid page (default 1, 50 cards; max 500)
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+    query_budget = 2
+    
+    def get(self, request):
+        params = request.query_params
+        try:
+            grid = card_grid(
+                card_queryset(
+                    request.user.company_id,
+                    statuses=parse_statuses(params.get('status')),
+                    department=params.get('department')
+                ),
+                request,
+                page=parse_page(params.get('page')),
+                page_size=parse_page_size(params.get('page_size'))
+            )
+        except DirectoryQueryError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(grid)
+
+
+class WhosInTodayView(APIView):
+    """
+    "Who's in today" board: cards of employees present (or on a half day) today
+    
+    Query params:
+    - department: filter
+    - page, page_size: board page (default 1, 50 cards; max 500)
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 2
+    
+    def get(self, request):
+        params = request.query_params
+        try:
+            grid = card_grid(
+                card_queryset(
+                    request.user.company_id,
+                    statuses=IN_STATUSES,
+                    department=params.get('department')
+                ),
+                request,
+                page=parse_page(params.get('page')),
+                page_size=parse_page_size(params.get('page_size'))
+            )
+        except DirectoryQueryError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(grid)
+
+
 class CheckInOutView(APIView):
     """Check-in and check-out for employees"""
     permission_classes = [IsAuthenticated]
@@ -299,18 +354,76 @@ class CheckInOutView(APIView):
         )
 
 
+class BulkAttendanceView(APIView):
+    """
+    Bulk / offline-sync punch ingestion for terminals and mobile apps
+    
+    Body: {"punches": [{"idempotency_key", "action": "check_in" | "check_out",
+    "timestamp": ISO 8601, "employee_id" (Admin/HR; default: yourself),
+    "latitude", "longitude", "location"}]} with up to 1000 punches.
+    Resending a batch is safe: keys already applied come back as "duplicate".
+    """
+    permission_classes = [IsAuthenticated]
+    # Key, user and row lookups, the upsert (split into several INSERTs on SQLite's
+    # parameter limit), and batched rollup/payslip/presence refreshes
+    query_budget = 30
+    
+    def post(self, request):
+        punches = request.data.get('punches') if hasattr(request.data, 'get') else request.data
+        try:
+            results = ingest_punches(request.user, punches)
+        except IngestError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        summary = {'applied': 0, 'duplicate': 0, 'rejected': 0}
+        for result in results:
+            summary[result['status']] += 1
+        return Response({'summary': summary, 'results': results})
+
+
+class PresenceBoardView(APIView):
+    """
+    Today's attendance split for the company, served from the presence board
+    
+    Query params:
+    - members: comma-separated statuses (PRESENT, HALF_DAY, LEAVE) whose user ids to include (Admin/HR only)
+    """
+    permission_classes = [IsAuthenticated]
+    # Nothing on a warm board; users, attendance and leave when it is rebuilt
+    query_budget = 3
+    
+    def get(self, request):
+        board = presence_counts(request.user.company_id)
+        
+        members = [value.strip().upper() for value in request.query_params.get('members', '').split(',') if value.strip()]
+        if members:
+            if request.user.role not in ('ADMIN', 'HR'):
+                return Response({'error': 'Only Admin/HR can list members'}, status=status.HTTP_403_FORBIDDEN)
+            unknown = [value for value in members if value not in BOARD_STATUSES]
+            if unknown:
+                return Response(
+                    {'error': f'members must be among: {", ".join(BOARD_STATUSES)}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            board['members'] = {value: presence_members(request.user.company_id, value) for value in members}
+        return Response(board)
+
+
 class MyAttendanceView(APIView):
     """View own attendance records"""
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        month = request.query_params.get('month', date.today().month)
-        year = request.query_params.get('year', date.today().year)
+        try:
+            year, month = month_from_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
+        month_start, month_end = month_bounds(year, month)
         attendance_records = Attendance.objects.filter(
             user=request.user,
-            date__month=month,
-            date__year=year
+            date__gte=month_start,
+            date__lte=month_end
         ).order_by('date')
         
         serializer = AttendanceSerializer(attendance_records, many=True)
@@ -326,20 +439,23 @@ class AllAttendanceView(APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
     
     def get(self, request):
-        month = request.query_params.get('month', date.today().month)
-        year = request.query_params.get('year', date.today().year)
-        status = request.query_params.get('status')  # Optional filter
+        try:
+            year, month = month_from_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        status_filter = request.query_params.get('status')  # Optional filter
         employee_id = request.query_params.get('employee_id')  # Optional filter
         
         # Base query
+        month_start, month_end = month_bounds(year, month)
         attendance_records = Attendance.objects.filter(
-            date__month=month,
-            date__year=year
+            date__gte=month_start,
+            date__lte=month_end
         ).select_related('user').order_by('-date', 'user__employee_id')
         
         # Apply optional filters
-        if status:
-            attendance_records = attendance_records.filter(status=status)
+        if status_filter:
+            attendance_records = attendance_records.filter(status=status_filter)
         if employee_id:
             attendance_records = attendance_records.filter(user__employee_id=employee_id)
         
@@ -353,8 +469,8 @@ class AllAttendanceView(APIView):
         leave_count = attendance_records.filter(status='LEAVE').count()
         
         return Response({
-            'month': int(month),
-            'year': int(year),
+            'month': month,
+            'year': year,
             'summary': {
                 'total': total_records,
                 'present': present_count,
@@ -392,18 +508,15 @@ class TimeOffRequestView(APIView):
             time_off = serializer.save(user=request.user)
             
             # Send notifications
-            from .notifications import (
-                EmailNotificationService,
-                WhatsAppNotificationService,
-                InAppNotificationService
-            )
+            from .notifications import InAppNotificationService
+            from .notification_queue import enqueue_leave_notification
             
             # In-app notification for employee
             InAppNotificationService.notify_leave_request_submitted(time_off)
             
-            # Notify admins/HR about new leave request
+            # Notify admins/HR about new leave request (email is delivered by the worker)
             InAppNotificationService.notify_admin_new_leave_request(time_off)
-            EmailNotificationService.send_leave_request_to_admin(time_off)
+            enqueue_leave_notification('leave_request_to_admin', time_off)
             
             return Response({
                 'message': 'Time-off request submitted successfully. Admin has been notified.',
@@ -418,7 +531,7 @@ class TimeOffManagementView(APIView):
     
     def get(self, request):
         # Get all time-off requests for company
-        time_off_requests = TimeOff.objects.filter(user__company=request.user.company)
+        time_off_requests = TimeOff.objects.filter(company=request.user.company)
         
         # Filter by status if provided
         status_filter = request.query_params.get('status')
@@ -429,7 +542,7 @@ class TimeOffManagementView(APIView):
         return Response(serializer.data)
     
     def patch(self, request, pk):
-        time_off = get_object_or_404(TimeOff, pk=pk, user__company=request.user.company)
+        time_off = get_object_or_404(TimeOff, pk=pk, company=request.user.company)
         action = request.data.get('action')  # 'approve' or 'reject'
         
         if action == 'approve':
@@ -452,21 +565,14 @@ class TimeOffManagementView(APIView):
             time_off.save()
             
             # Send notifications (Email + WhatsApp + In-app)
-            from .notifications import (
-                EmailNotificationService,
-                WhatsAppNotificationService,
-                InAppNotificationService
-            )
+            from .notifications import InAppNotificationService
+            from .notification_queue import enqueue_leave_notification
             
             # In-app notification
             InAppNotificationService.notify_leave_approved(time_off)
             
-            # Email notification
-            EmailNotificationService.send_leave_approval_email(time_off)
-            
-            # WhatsApp notification
-            whatsapp_service = WhatsAppNotificationService()
-            whatsapp_service.send_leave_approval_whatsapp(time_off)
+            # Email and WhatsApp are queued for the notification worker
+            enqueue_leave_notification('leave_approval', time_off, channels=('EMAIL', 'WHATSAPP'))
             
             return Response({
                 'message': 'Time-off request approved. Employee has been notified via email, WhatsApp, and in-app.',
@@ -478,22 +584,15 @@ class TimeOffManagementView(APIView):
             time_off.rejection_reason = request.data.get('reason', '')
             time_off.save()
             
-            # Send notifications
-            from .notifications import (
-                EmailNotificationService,
-                WhatsAppNotificationService,
-                InAppNotificationService
-            )
+            # Send notifications (Email + WhatsApp + In-app)
+            from .notifications import InAppNotificationService
+            from .notification_queue import enqueue_leave_notification
             
             # In-app notification
             InAppNotificationService.notify_leave_rejected(time_off)
             
-            # Email notification
-            EmailNotificationService.send_leave_rejection_email(time_off)
-            
-            # WhatsApp notification
-            whatsapp_service = WhatsAppNotificationService()
-            whatsapp_service.send_leave_rejection_whatsapp(time_off)
+            # Email and WhatsApp are queued for the notification worker
+            enqueue_leave_notification('leave_rejection', time_off, channels=('EMAIL', 'WHATSAPP'))
             
             return Response({
                 'message': 'Time-off request rejected. Employee has been notified via email, WhatsApp, and in-app.',
@@ -507,22 +606,71 @@ class TimeOffManagementView(APIView):
 
 
 class EmployeeListView(APIView):
-    """List all employees in the company (Admin only)"""
+    """
+    Company employee directory (Admin only), keyset-paginated by employee ID
+    
+    Query params:
+    - search: prefix match on name, email or employee ID (every term must match)
+    - department, role, is_active: filters
+    - fields: comma-separated columns to return (default: all)
+    - limit: page size (default 50, max 500)
+    - cursor: next_cursor from the previous page
+    """
     permission_classes = [IsAuthenticated, IsAdmin]
+    query_budget = 2
+    
+    def get(self, request):
+        params = request.query_params
+        try:
+            queryset = directory_queryset(
+                request.user.company_id,
+                search=params.get('search', ''),
+                department=params.get('department'),
+                role=params.get('role'),
+                is_active=parse_bool(params.get('is_active'), 'is_active')
+            )
+            page = directory_page(
+                queryset,
+                fields=parse_fields(params.get('fields')),
+                cursor=params.get('cursor'),
+                limit=parse_limit(params.get('limit'))
+            )
+        except DirectoryQueryError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(page)
+
 
+class EmployeeSearchView(APIView):
+    """
+    Ranked, typo-tolerant employee search within the company
+    
+    Query params:
+    - q: search text (names, email, employee ID, department, job title, skills, location)
+    - limit: max results (default 20, max 100)
+    - include_inactive: also match deactivated employees (Admin/HR only)
+    
+    A misspelt query that matches nothing is retried with corrected terms,
+    returned as corrected_query.
+    """
+    permission_classes = [IsAuthenticated]
+    # match, documents; a corrected retry adds a match and (once per process) the vocabulary
+    query_budget = 5
+    
     def get(self, request):
-        employees = User.objects.filter(company=request.user.company).order_by('employee_id')
-        data = []
-        for emp in employees:
-            data.append({
-                'id': emp.id,
-                'employee_id': emp.employee_id,
-                'full_name': emp.get_full_name(),
-                'email': emp.email,
-                'role': emp.role,
-                'department': emp.profile.department if hasattr(emp, 'profile') else 'N/A',
-                'job_title': emp.profile.job_title if hasattr(emp, 'profile') else 'N/A',
-                'phone': emp.phone,
-                'is_active': emp.is_active
-            })
-        return Response(data)
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 20))
+            include_inactive = bool(parse_bool(request.query_params.get('include_inactive'), 'include_inactive'))
+        except (ValueError, DirectoryQueryError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        include_inactive = include_inactive and request.user.role in ('ADMIN', 'HR')
+        found = search_employees(request.user.company_id, query, limit=limit, include_inactive=include_inactive)
+        return Response({
+            'query': query,
+            'corrected_query': found['corrected_query'],
+            'count': len(found['results']),
+            'results': found['results']
+        })
@@ -0,0 +1,36 @@
+"""
+Date Range Helpers
+Inclusive calendar bounds for index-friendly (sargable) date filters.
+Filtering on date__gte/date__lte lets the database seek an index on the raw
+column, whereas date__month extracts a value from every row.
+"""
+
+from calendar import monthrange
+from datetime import MAXYEAR, MINYEAR, date
+
+
+def month_bounds(year, month):
+    """First and last day of a calendar month"""
+    year, month = int(year), int(month)
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+def month_from_params(params):
+    """(year, month) from query params, defaulting to the current month; ValueError when not a valid month"""
+    today = date.today()
+    try:
+        year = int(params.get('year', today.year))
+        month = int(params.get('month', today.month))
+    except (TypeError, ValueError):
+        raise ValueError('month and year must be integers')
+    if not 1 <= month <= 12:
+        raise ValueError('month must be between 1 and 12')
+    if not MINYEAR <= year <= MAXYEAR:
+        raise ValueError(f'year must be between {MINYEAR} and {MAXYEAR}')
+    return year, month
+
+
+def year_bounds(year):
+    """First and last day of a calendar year"""
+    year = int(year)
+    return date(year, 1, 1), date(year, 12, 31)
@@ -0,0 +1,155 @@
+"""
+Employee Directory
+Keyset-paginated, filterable company directory built as a single joined
+.values() projection, with optional sparse fieldsets
+"""
+
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce, Concat
+
+from .models import User
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Directory column -> expression; plain names are User columns
+DIRECTORY_FIELDS = {
+    'id': 'id',
+    'employee_id': 'employee_id',
+    'full_name': Concat('first_name', Value(' '), 'last_name'),
+    'email': 'email',
+    'role': 'role',
+    'department': Coalesce('profile__department', Value('N/A')),
+    'job_title': Coalesce('profile__job_title', Value('N/A')),
+    'phone': 'phone',
+    'is_active': 'is_active',
+}
+
+SEARCH_COLUMNS = ('first_name', 'last_name', 'email', 'employee_id')
+
+ROLES = {role for role, _ in User.ROLE_CHOICES}
+
+
+class DirectoryQueryError(Exception):
+    """Invalid directory query parameter"""
+
+
+# ============================================================================
+# PARAMETERS
+# ============================================================================
+
+def parse_fields(raw):
+    """Requested columns from a comma-separated `fields` parameter (all when empty)"""
+    if not raw:
+        return list(DIRECTORY_FIELDS)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in DIRECTORY_FIELDS]
+    if unknown:
+        raise DirectoryQueryError(
+            f'Unknown field(s): {", ".join(unknown)}. Available: {", ".join(DIRECTORY_FIELDS)}'
+        )
+    return list(dict.fromkeys(fields))
+
+
+def parse_limit(raw):
+    if raw in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise DirectoryQueryError('limit must be an integer')
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise DirectoryQueryError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+
+def parse_bool(raw, name):
+    if raw in (None, ''):
+        return None
+    value = raw.strip().lower()
+    if value in ('true', '1', 'yes'):
+        return True
+    if value in ('false', '0', 'no'):
+        return False
+    raise DirectoryQueryError(f'{name} must be true or false')
+
+
+def encode_cursor(employee_id, pk):
+    return base64.urlsafe_b64encode(json.dumps([employee_id, pk]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(employee_id, pk) of the last row on the previous page"""
+    try:
+        employee_id, pk = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        raise DirectoryQueryError('Invalid cursor')
+    if not isinstance(pk, int) or not (employee_id is None or isinstance(employee_id, str)):
+        raise DirectoryQueryError('Invalid cursor')
+    return employee_id, pk
+
+
+# ============================================================================
+# QUERY
+# ============================================================================
+
+def _after(employee_id, pk):
+    """Rows after (employee_id, pk) in employee_id order, with employees lacking an ID last"""
+    if employee_id is None:
+        return Q(employee_id__isnull=True, id__gt=pk)
+    return (
+        Q(employee_id__gt=employee_id)
+        | Q(employee_id=employee_id, id__gt=pk)
+        | Q(employee_id__isnull=True)
+    )
+
+
+def directory_queryset(company_id, search='', department=None, role=None, is_active=None):
+    """Company users matching the filters; every search term must prefix-match a name, email or ID"""
+    queryset = User.objects.filter(company_id=company_id)
+    if department:
+        queryset = queryset.filter(profile__department=department)
+    if role:
+        if role not in ROLES:
+            raise DirectoryQueryError(f'role must be one of: {", ".join(sorted(ROLES))}')
+        queryset = queryset.filter(role=role)
+    if is_active is not None:
+        queryset = queryset.filter(is_active=is_active)
+    for term in search.split():
+        match = Q()
+        for column in SEARCH_COLUMNS:
+            match |= Q(**{f'{column}__istartswith': term})
+        queryset = queryset.filter(match)
+    return queryset
+
+
+def directory_page(queryset, fields=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of directory rows as dicts holding only `fields`.
+    Returns {'results', 'next_cursor', 'has_more'}.
+    """
+    fields = fields or list(DIRECTORY_FIELDS)
+    if cursor:
+        queryset = queryset.filter(_after(*decode_cursor(cursor)))
+
+    columns = [name for name in fields if isinstance(DIRECTORY_FIELDS[name], str)]
+    expressions = {name: DIRECTORY_FIELDS[name] for name in fields if name not in columns}
+    rows = list(
+        queryset
+        .order_by(F('employee_id').asc(nulls_last=True), 'id')
+        .values(*columns, _cursor_employee_id=F('employee_id'), _cursor_id=F('id'), **expressions)[:limit + 1]
+    )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]['_cursor_employee_id'], rows[-1]['_cursor_id']) if has_more else None
+    return {
+        'results': [{name: row[name] for name in fields} for row in rows],
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+    }
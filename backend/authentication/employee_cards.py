@@ -0,0 +1,138 @@
+"""
+Employee Cards
+Page-numbered grid of employee cards with today's attendance status, built
+as one .values() query (status and check-in as correlated subqueries on the
+(user, date) unique index) plus one count. Used by the admin dashboard and
+the "who's in today" board
+"""
+
+from datetime import date
+
+from django.core.files.storage import default_storage
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+
+from .directory import DirectoryQueryError
+from .models import User, Attendance
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+STATUSES = {status for status, _ in Attendance.STATUS_CHOICES}
+
+# Statuses shown on the "who's in today" board
+IN_STATUSES = ('PRESENT', 'HALF_DAY')
+
+CARD_ORDERING = ('-created_at', '-id')
+
+
+# ============================================================================
+# PARAMETERS
+# ============================================================================
+
+def _positive_int(raw, name, default, maximum=None):
+    if raw in (None, ''):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise DirectoryQueryError(f'{name} must be an integer')
+    if value < 1 or (maximum is not None and value > maximum):
+        bounds = f'between 1 and {maximum}' if maximum is not None else 'at least 1'
+        raise DirectoryQueryError(f'{name} must be {bounds}')
+    return value
+
+
+def parse_page(raw):
+    return _positive_int(raw, 'page', 1)
+
+
+def parse_page_size(raw, default=DEFAULT_PAGE_SIZE):
+    return _positive_int(raw, 'page_size', default, MAX_PAGE_SIZE)
+
+
+def parse_statuses(raw):
+    """Attendance statuses from a comma-separated `status` parameter (None when empty)"""
+    if not raw:
+        return None
+    statuses = [value.strip().upper() for value in raw.split(',') if value.strip()]
+    unknown = [value for value in statuses if value not in STATUSES]
+    if unknown:
+        raise DirectoryQueryError(
+            f'Unknown status(es): {", ".join(unknown)}. Available: {", ".join(sorted(STATUSES))}'
+        )
+    return statuses
+
+
+# ============================================================================
+# QUERY
+# ============================================================================
+
+def card_queryset(company_id, day=None, statuses=None, department=None):
+    """
+    Active company employees annotated with their attendance on `day`
+    (default today): day_status (ABSENT without a record) and check_in
+    """
+    day = day or date.today()
+    record = Attendance.objects.filter(user=OuterRef('pk'), date=day)
+    queryset = User.objects.filter(company_id=company_id, is_active=True).annotate(
+        day_status=Coalesce(Subquery(record.values('status')[:1]), Value('ABSENT')),
+        day_check_in=Subquery(record.values('check_in')[:1])
+    )
+    if department:
+        queryset = queryset.filter(profile__department=department)
+    if statuses:
+        queryset = queryset.filter(day_status__in=statuses)
+    return queryset
+
+
+def _avatar_url(request):
+    """Avatar file name -> URL; the request origin is resolved once per grid, not per card"""
+    origin = request.build_absolute_uri('/').rstrip('/') if request is not None else ''
+
+    def build(name):
+        if not name:
+            return None
+        url = default_storage.url(name)
+        return origin + url if url.startswith('/') else url
+    return build
+
+
+def card_grid(queryset, request=None, page=1, page_size=DEFAULT_PAGE_SIZE, total=None):
+    """
+    One page of cards from card_queryset(). Pass `total` when the caller
+    already counted the queryset to skip the count query.
+    Returns {'results', 'page', 'page_size', 'total', 'pages'}.
+    """
+    if total is None:
+        total = queryset.count()
+    offset = (page - 1) * page_size
+    rows = queryset.order_by(*CARD_ORDERING).values(
+        'employee_id', 'email', 'day_status', 'day_check_in',
+        full_name=Concat('first_name', Value(' '), 'last_name'),
+        job_title=Coalesce('profile__job_title', Value('')),
+        department=Coalesce('profile__department', Value('')),
+        avatar=F('profile__avatar')
+    )[offset:offset + page_size] if offset < total else []
+
+    avatar_url = _avatar_url(request)
+    return {
+        'results': [
+            {
+                'employee_id': row['employee_id'],
+                'name': row['full_name'].strip(),
+                'email': row['email'],
+                'job_title': row['job_title'],
+                'department': row['department'],
+                'avatar': avatar_url(row['avatar']),
+                'status': row['day_status'],
+                'check_in': row['day_check_in'],
+            }
+            for row in rows
+        ],
+        'page': page,
+        'page_size': page_size,
+        'total': total,
+        'pages': -(-total // page_size),
+    }
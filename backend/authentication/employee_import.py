@@ -0,0 +1,290 @@
+"""
+Bulk Employee Import
+Creates many employees from CSV or JSONL rows: one email lookup, one serial
+block per joining year and bulk inserts of users, profiles and leave
+allocations inside a single transaction. Imported users start without a
+usable password; the notification worker issues temporary passwords, hashed
+in a process pool, when it sends the welcome emails.
+
+Uploads through the API are validated, stored as an EmployeeImportJob and run
+by the notification worker; the import_employees command runs a file directly.
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import django
+from decouple import config
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .analytics_cache import invalidate_company
+from .models import User, EmployeeProfile, LeaveAllocation, EmployeeImportJob
+from .notification_queue import enqueue_welcome_emails
+from .presence import forget_company
+from .search import index_users
+from .serializers import EmployeeImportRowSerializer
+from .utils import format_employee_id, reserve_employee_serials
+
+logger = logging.getLogger(__name__)
+
+
+# Processes hashing the temporary passwords issued with welcome emails (0 = one per CPU, 1 = hash in-process)
+HASH_WORKERS = config('IMPORT_HASH_WORKERS', default=0, cast=int)
+
+# Rows per INSERT for each bulk-created table
+IMPORT_BATCH_SIZE = 500
+
+# Below this many rows a process pool costs more than it saves
+PROCESS_POOL_MIN_ROWS = 20
+
+FORMATS = ('csv', 'jsonl')
+
+# A PROCESSING job older than this is assumed orphaned by a dead worker; the
+# import is one transaction, so running it again is safe
+JOB_LEASE_SECONDS = 3600
+
+
+class EmployeeImportError(Exception):
+    """The import file could not be read"""
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def parse_rows(content, fmt):
+    """Rows of an import file as dicts; content is text or bytes"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    if fmt == 'csv':
+        # Blank cells are left out, as a missing key would be in JSONL, so optional
+        # columns fall back to their defaults instead of failing validation
+        reader = csv.DictReader(io.StringIO(content))
+        return [
+            {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+            for row in reader
+        ]
+
+    if fmt == 'jsonl':
+        rows = []
+        for number, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise EmployeeImportError(f'Line {number} is not valid JSON: {e}')
+            if not isinstance(row, dict):
+                raise EmployeeImportError(f'Line {number} is not a JSON object')
+            rows.append(row)
+        return rows
+
+    raise EmployeeImportError(f'Unsupported format "{fmt}", expected one of: {", ".join(FORMATS)}')
+
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+
+def validate_rows(rows):
+    """
+    Validate every row; returns (validated, errors). Emails are checked against
+    existing users with a single query and against each other within the file.
+    """
+    validated, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        serializer = EmployeeImportRowSerializer(data=row)
+        if serializer.is_valid():
+            validated.append((number, serializer.validated_data))
+        else:
+            errors.append({'row': number, 'errors': serializer.errors})
+
+    emails = [data['email'] for _, data in validated]
+    existing = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+    seen = set()
+    for number, data in validated:
+        if data['email'] in existing:
+            errors.append({'row': number, 'errors': {'email': ['User with this email already exists']}})
+        elif data['email'] in seen:
+            errors.append({'row': number, 'errors': {'email': ['Duplicate email in import file']}})
+        seen.add(data['email'])
+
+    errors.sort(key=lambda error: error['row'])
+    return [data for _, data in validated], errors
+
+
+# ============================================================================
+# PASSWORD HASHING
+# ============================================================================
+
+def _init_hash_worker():
+    # Spawned workers need the app registry for the configured PASSWORD_HASHERS
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash passwords with the configured hasher, spread over worker processes"""
+    workers = workers if workers is not None else HASH_WORKERS
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(passwords) < PROCESS_POOL_MIN_ROWS:
+        return [make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker) as executor:
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+def import_employees(rows, company):
+    """
+    Validate and create employees for a company. Nothing is written unless
+    every row is valid. Returns {'created': [...], 'errors': [...]}.
+    """
+    validated, errors = validate_rows(rows)
+    if errors or not validated:
+        return {'created': [], 'errors': errors}
+
+    company_code = company.get_company_code()
+    this_year = date.today().year
+
+    by_year = defaultdict(list)
+    for index, data in enumerate(validated):
+        by_year[data['year_of_joining']].append(index)
+
+    with transaction.atomic():
+        # One reserved serial block per joining year
+        employee_ids = [None] * len(validated)
+        for year, indexes in by_year.items():
+            first_serial = reserve_employee_serials(company, year, len(indexes))
+            for offset, index in enumerate(indexes):
+                data = validated[index]
+                employee_ids[index] = format_employee_id(
+                    company_code, data['first_name'], data['last_name'], year, first_serial + offset
+                )
+
+        users = User.objects.bulk_create(
+            [
+                User(
+                    company=company,
+                    employee_id=employee_id,
+                    first_name=data['first_name'],
+                    last_name=data['last_name'],
+                    email=data['email'],
+                    phone=data.get('phone', ''),
+                    role=data['role'],
+                    year_of_joining=data['year_of_joining'],
+                    password=make_password(None),
+                    is_first_login=True
+                )
+                for data, employee_id in zip(validated, employee_ids)
+            ],
+            batch_size=IMPORT_BATCH_SIZE
+        )
+
+        EmployeeProfile.objects.bulk_create(
+            [
+                EmployeeProfile(
+                    user=user,
+                    department=data.get('department', ''),
+                    job_title=data.get('job_title', '')
+                )
+                for user, data in zip(users, validated)
+            ],
+            batch_size=IMPORT_BATCH_SIZE
+        )
+
+        # bulk_create skips the pre_save signal, so the company column is set here
+        LeaveAllocation.objects.bulk_create(
+            [LeaveAllocation(user=user, company=company, year=this_year) for user in users],
+            batch_size=IMPORT_BATCH_SIZE
+        )
+
+        # bulk_create skips the signals that maintain search documents
+        index_users([user.pk for user in users])
+
+        enqueue_welcome_emails(users)
+
+    invalidate_company(company.id)
+    # New hires change the headcount on today's presence board
+    forget_company(company.id)
+    logger.info(f"Imported {len(users)} employee(s) into {company.name}")
+
+    return {
+        'created': [
+            {
+                'employee_id': user.employee_id,
+                'email': user.email,
+                'full_name': user.get_full_name(),
+                'role': user.role
+            }
+            for user in users
+        ],
+        'errors': []
+    }
+
+
+# ============================================================================
+# QUEUED IMPORTS
+# ============================================================================
+
+def queue_import(company, requested_by, content, fmt, row_count):
+    """Store an already validated import file for the worker; returns the job"""
+    job = EmployeeImportJob(company=company, requested_by=requested_by, format=fmt, row_count=row_count)
+    job.file.save(f'{company.pk}.{fmt}', ContentFile(content), save=False)
+    job.save()
+    return job
+
+
+def claim_import_job():
+    """Atomically claim the oldest due job, or None (race-free across workers like the outbox)"""
+    now = timezone.now()
+    due = Q(status='PENDING') | Q(status='PROCESSING', started_at__lt=now - timedelta(seconds=JOB_LEASE_SECONDS))
+    with transaction.atomic():
+        job_id = EmployeeImportJob.objects.select_for_update(skip_locked=True).filter(due).order_by(
+            'created_at', 'id'
+        ).values_list('id', flat=True).first()
+        if job_id is None or not EmployeeImportJob.objects.filter(due, pk=job_id).update(
+            status='PROCESSING', started_at=now
+        ):
+            return None
+    return EmployeeImportJob.objects.select_related('company').get(pk=job_id)
+
+
+def run_import_job(job):
+    """Import a claimed job's file and record the outcome"""
+    try:
+        with job.file.open('rb') as handle:
+            rows = parse_rows(handle.read(), job.format)
+        result = import_employees(rows, job.company)
+    except (EmployeeImportError, UnicodeDecodeError) as e:
+        result = {'created': [], 'errors': [{'row': None, 'errors': str(e)}]}
+
+    job.status = 'FAILED' if result['errors'] or not result['created'] else 'DONE'
+    job.created = result['created']
+    job.errors = result['errors']
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'created', 'errors', 'finished_at'])
+    return job
+
+
+def process_import_jobs():
+    """Run one due import job; returns the number handled (0 or 1)"""
+    job = claim_import_job()
+    if job is None:
+        return 0
+    run_import_job(job)
+    return 1
@@ -0,0 +1,20 @@
+"""
+Password Hashers
+Argon2 and PBKDF2 hashers whose cost is read from settings, so the work factor
+can be tuned per deployment (see PASSWORD_HASHER_PROFILE)
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with PBKDF2_ITERATIONS; shares the pbkdf2_sha256 algorithm name"""
+    iterations = settings.PBKDF2_ITERATIONS
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with ARGON2_TIME_COST / ARGON2_MEMORY_COST / ARGON2_PARALLELISM"""
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
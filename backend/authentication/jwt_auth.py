@@ -0,0 +1,103 @@
+"""
+Claims-Based JWT Authentication
+Access tokens carry the user's role, company and active flag, so authenticated
+requests build request.user from the token instead of selecting the user row.
+A per-process TTL cache of token versions catches revoked tokens without a query
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+
+def issue_tokens(user):
+    """Refresh token (and derived access token) carrying the user's claims"""
+    refresh = RefreshToken.for_user(user)
+    for field in User.TOKEN_CLAIM_FIELDS:
+        refresh[field] = getattr(user, field)
+    return refresh
+
+
+class TokenVersionCache:
+    """
+    Bounded, thread-safe map of user id -> (token_version, is_active) whose
+    entries expire after `ttl` seconds. Other processes see a revocation at
+    most `ttl` seconds late; this process sees it immediately via forget().
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, state = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            return state
+
+    def set(self, user_id, state):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, state)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_versions = TokenVersionCache(settings.JWT_CLAIMS_CACHE_TTL, settings.JWT_CLAIMS_CACHE_SIZE)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication whose user comes from the token claims. Tokens issued
+    before claims were embedded fall back to the regular user lookup.
+    """
+
+    def get_user(self, validated_token):
+        if any(field not in validated_token for field in User.TOKEN_CLAIM_FIELDS):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            return super().get_user(validated_token)
+
+        state = token_versions.get(user_id)
+        if state is None:
+            state = User.objects.filter(pk=user_id).values_list('token_version', 'is_active').first()
+            if state is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            token_versions.set(user_id, state)
+
+        current_version, is_active = state
+        if validated_token['token_version'] != current_version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        if not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return User.from_token_claims(user_id, validated_token)
@@ -0,0 +1,44 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.date_ranges import year_bounds
+from authentication.models import Attendance
+from authentication.partitioning import EXPORTERS, archive_year_to_file, archive_year_to_table
+
+
+class Command(BaseCommand):
+    help = (
+        'Move a closed year of raw attendance out of the live table, either into a '
+        'compressed CSV/Parquet file or into an attendance_archive_<year> table. '
+        'Daily rollups are rebuilt first and kept, so dashboards still cover the year.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, required=True, help='Closed calendar year to archive')
+        parser.add_argument('--format', choices=sorted(EXPORTERS), default='csv',
+                            help='Archive file format (csv is gzip-compressed; parquet needs pyarrow)')
+        parser.add_argument('--dir', default=None,
+                            help='Directory for archive files, defaults to ATTENDANCE_ARCHIVE_DIR')
+        parser.add_argument('--to-table', action='store_true',
+                            help='Move rows into an archive table instead of a file')
+    
+    def handle(self, *args, **options):
+        year = options['year']
+        if year >= date.today().year:
+            raise CommandError(f'{year} is not a closed year; only years before {date.today().year} can be archived')
+        start, end = year_bounds(year)
+        if not Attendance.objects.filter(date__gte=start, date__lte=end).exists():
+            raise CommandError(f'No attendance records for {year}')
+        
+        try:
+            if options['to_table']:
+                table, rows = archive_year_to_table(year)
+                self.stdout.write(self.style.SUCCESS(f'Moved {rows} row(s) to {table}'))
+            else:
+                directory = options['dir'] or settings.ATTENDANCE_ARCHIVE_DIR
+                path, rows = archive_year_to_file(year, directory, options['format'])
+                self.stdout.write(self.style.SUCCESS(f'Archived {rows} row(s) to {path}'))
+        except RuntimeError as e:
+            raise CommandError(str(e))
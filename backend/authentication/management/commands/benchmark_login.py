@@ -0,0 +1,108 @@
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from authentication.models import Company, User
+from authentication.serializers import LoginSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Login-storm benchmark: creates throwaway users, replays logins through LoginSerializer from '
+        'concurrent threads and reports p50/p99 latency, logins/sec and logins/sec per core. '
+        'The users are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Distinct accounts logging in')
+        parser.add_argument('--logins', type=int, default=200, help='Total login attempts')
+        parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1, help='Concurrent logins')
+        parser.add_argument('--profile', choices=sorted(settings.PASSWORD_HASHER_PROFILES),
+                            default=settings.PASSWORD_HASHER_PROFILE, help='Hasher profile to benchmark')
+        parser.add_argument('--legacy-profile', choices=sorted(settings.PASSWORD_HASHER_PROFILES),
+                            help='Seed passwords with this profile instead, to measure logins that trigger upgrades')
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['logins'], options['concurrency']) < 1:
+            raise CommandError('--users, --logins and --concurrency must be positive')
+
+        seed_profile = options['legacy_profile'] or options['profile']
+        password = 'Benchmark@123'
+        try:
+            with override_settings(PASSWORD_HASHERS=self._hashers(options['profile'])):
+                make_password(password)
+            with override_settings(PASSWORD_HASHERS=self._hashers(seed_profile)):
+                encoded = make_password(password)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        marker = uuid.uuid4().hex[:8]
+        company = Company.objects.create(name=f'Login benchmark {marker}')
+        try:
+            User.objects.bulk_create([
+                User(
+                    company=company,
+                    employee_id=f'BENCH{marker}{index:05d}',
+                    email=f'bench{index}-{marker}@loadtest.local',
+                    password=encoded
+                )
+                for index in range(options['users'])
+            ])
+            login_ids = [
+                f'BENCH{marker}{index % options["users"]:05d}' if index % 2
+                else f'bench{index % options["users"]}-{marker}@loadtest.local'
+                for index in range(options['logins'])
+            ]
+
+            with override_settings(PASSWORD_HASHERS=self._hashers(options['profile'])):
+                self._run(login_ids, password, options)
+        finally:
+            company.delete()
+
+    def _hashers(self, profile):
+        profiles = settings.PASSWORD_HASHER_PROFILES
+        return [profiles[profile], *[path for name, path in profiles.items() if name != profile]]
+
+    def _login(self, login_id, password):
+        started = time.perf_counter()
+        try:
+            serializer = LoginSerializer(data={'login_id': login_id, 'password': password})
+            ok = serializer.is_valid()
+        finally:
+            connection.close()
+        return (time.perf_counter() - started) * 1000, ok
+
+    def _run(self, login_ids, password, options):
+        concurrency = options['concurrency']
+        cpu_time_started = time.process_time()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda login_id: self._login(login_id, password), login_ids))
+        elapsed = time.perf_counter() - started
+        cpu_seconds = time.process_time() - cpu_time_started
+
+        latencies = sorted(latency for latency, _ in results)
+        failures = sum(1 for _, ok in results if not ok)
+        throughput = len(results) / elapsed
+        cores = min(concurrency, os.cpu_count() or 1)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Profile {options['profile']}"
+            + (f" (passwords seeded with {options['legacy_profile']})" if options['legacy_profile'] else '')
+        ))
+        self.stdout.write(f'    logins:          {len(results)} ({failures} failed) over {concurrency} thread(s)')
+        self.stdout.write(f'    p50 latency:     {statistics.median(latencies):.1f} ms')
+        self.stdout.write(f'    p99 latency:     {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]:.1f} ms')
+        self.stdout.write(f'    logins/sec:      {throughput:.1f}')
+        self.stdout.write(f'    logins/sec/core: {throughput / cores:.1f} ({cores} core(s))')
+        self.stdout.write(f'    CPU per login:   {cpu_seconds / len(results) * 1000:.1f} ms')
+        if failures:
+            raise CommandError(f'{failures} login(s) failed')
@@ -0,0 +1,118 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from authentication.models import Company, User, EmployeeProfile
+from authentication.search import get_backend, index_users, search_employees
+
+
+FIRST_NAMES = [
+    'Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Meera', 'Arjun', 'Kavya', 'Ishaan', 'Diya',
+    'John', 'Maria', 'David', 'Sarah', 'Michael', 'Laura', 'Daniel', 'Emma', 'James', 'Olivia',
+]
+LAST_NAMES = [
+    'Sharma', 'Patel', 'Iyer', 'Reddy', 'Nair', 'Gupta', 'Khan', 'Singh', 'Mehta', 'Joshi',
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Garcia', 'Miller', 'Davis', 'Wilson', 'Anderson', 'Taylor',
+]
+DEPARTMENTS = ['Engineering', 'Sales', 'Marketing', 'Finance', 'Operations', 'Human Resources', 'Support']
+TITLES = ['Engineer', 'Senior Engineer', 'Manager', 'Analyst', 'Designer', 'Consultant', 'Director']
+SKILLS = ['python', 'django', 'react', 'sql', 'kubernetes', 'excel', 'negotiation', 'tableau', 'figma', 'java']
+LOCATIONS = ['Mumbai', 'Bengaluru', 'Pune', 'Hyderabad', 'Chennai', 'Delhi', 'London', 'Remote']
+
+
+def misspell(word, rnd):
+    """Swap two adjacent letters"""
+    if len(word) < 4:
+        return word
+    index = rnd.randrange(1, len(word) - 2)
+    return word[:index] + word[index + 1] + word[index] + word[index + 2:]
+
+
+class Command(BaseCommand):
+    help = (
+        'Search benchmark: indexes a throwaway company of synthetic employees and reports p50/p99 '
+        'latency for prefix, multi-term, skill and misspelt queries. Everything runs in a '
+        'transaction that is rolled back.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=200, help='Queries per query kind')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=7)
+    
+    def handle(self, *args, **options):
+        if options['employees'] < 1 or options['queries'] < 1:
+            raise CommandError('--employees and --queries must be positive')
+        
+        rnd = random.Random(options['seed'])
+        with transaction.atomic():
+            company = self._populate(options['employees'], rnd)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{options['employees']} employees, backend {type(get_backend()).__name__}"
+            ))
+            kinds = {
+                'prefix (1 term)': lambda: rnd.choice(LAST_NAMES)[:rnd.randint(3, 5)],
+                'full name': lambda: f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}',
+                'skill + city': lambda: f'{rnd.choice(SKILLS)} {rnd.choice(LOCATIONS)}',
+                'misspelt name': lambda: misspell(rnd.choice(LAST_NAMES), rnd),
+                'employee id': lambda: f'BS{rnd.randrange(options["employees"]):06d}',
+            }
+            for kind, make_query in kinds.items():
+                self._measure(kind, company.pk, [make_query() for _ in range(options['queries'])], options['limit'])
+            transaction.set_rollback(True)
+    
+    def _populate(self, count, rnd):
+        started = time.perf_counter()
+        company = Company.objects.create(name=f'Search benchmark {uuid.uuid4().hex[:8]}')
+        users = User.objects.bulk_create(
+            [
+                User(
+                    company=company,
+                    employee_id=f'BS{index:06d}',
+                    first_name=rnd.choice(FIRST_NAMES),
+                    last_name=rnd.choice(LAST_NAMES),
+                    email=f'bench{index}@{company.pk}.search.local',
+                    password='!'
+                )
+                for index in range(count)
+            ],
+            batch_size=2000
+        )
+        EmployeeProfile.objects.bulk_create(
+            [
+                EmployeeProfile(
+                    user=user,
+                    department=rnd.choice(DEPARTMENTS),
+                    job_title=rnd.choice(TITLES),
+                    skills=rnd.sample(SKILLS, 3),
+                    location=rnd.choice(LOCATIONS)
+                )
+                for user in users
+            ],
+            batch_size=2000
+        )
+        seeded = time.perf_counter()
+        index_users(company_id=company.pk)
+        self.stdout.write(
+            f'    seeded in {seeded - started:.1f}s, indexed in {time.perf_counter() - seeded:.1f}s'
+        )
+        return company
+    
+    def _measure(self, kind, company_id, queries, limit):
+        latencies, hits = [], 0
+        for query in queries:
+            started = time.perf_counter()
+            results = search_employees(company_id, query, limit=limit)['results']
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += bool(results)
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'    {kind:<16} p50 {statistics.median(latencies):7.1f} ms   p99 {p99:7.1f} ms   '
+            f'hit rate {hits / len(queries):.0%}'
+        )
@@ -0,0 +1,32 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.partitioning import add_months, ensure_month_partitions, is_partitioned, month_start
+
+
+class Command(BaseCommand):
+    help = (
+        'Create monthly attendance partitions ahead of time (PostgreSQL). '
+        'Schedule it daily or monthly so inserts never land in the default partition.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Months after the current one to create partitions for')
+    
+    def handle(self, *args, **options):
+        if options['months_ahead'] < 0:
+            raise CommandError('--months-ahead must not be negative')
+        if not is_partitioned():
+            self.stdout.write(self.style.WARNING(
+                'The attendance table is not partitioned (PostgreSQL only); nothing to do. '
+                'Use archive_attendance --to-table to age out old years on this database.'
+            ))
+            return
+        
+        start = month_start(date.today())
+        created = ensure_month_partitions(start, add_months(start, options['months_ahead']))
+        for name in created:
+            self.stdout.write(f'Created {name}')
+        self.stdout.write(self.style.SUCCESS(f'{len(created)} partition(s) created'))
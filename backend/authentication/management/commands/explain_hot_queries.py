@@ -0,0 +1,126 @@
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from authentication.date_ranges import month_bounds, year_bounds
+from authentication.models import Company, User, Attendance, TimeOff, Notification
+
+
+# Indexes added for the hot query shapes; dropped temporarily for the "before" run
+HOT_INDEXES = [
+    'attendance_company_date_idx',
+    'timeoff_company_status_idx',
+    'attendance_date_status_idx',
+    'timeoff_status_start_idx',
+    'timeoff_user_start_idx',
+    'timeoff_pending_idx',
+    'notif_user_read_idx',
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Print EXPLAIN plans and timings for the hottest query shapes. '
+        'With --compare, also runs the legacy (user__company join, date__month/date__year) shapes with the '
+        'hot-query indexes dropped inside a rolled-back transaction. The DROP INDEX '
+        'locks the tables, so run --compare against a copy, not production.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Company id to benchmark, defaults to the largest')
+        parser.add_argument('--month', type=int, default=date.today().month)
+        parser.add_argument('--year', type=int, default=date.today().year)
+        parser.add_argument('--repeat', type=int, default=20, help='Timed executions per query')
+        parser.add_argument('--compare', action='store_true', help='Also show the plans before the indexes')
+    
+    def handle(self, *args, **options):
+        company = self._company(options['company'])
+        user = User.objects.filter(company=company).order_by('id').first()
+        if user is None:
+            raise CommandError(f'Company {company.pk} has no users')
+        
+        shapes = self._shapes(company, user, options['month'], options['year'])
+        
+        if options['compare']:
+            self.stdout.write(self.style.MIGRATE_HEADING('BEFORE (legacy lookups, no hot-query indexes)'))
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    for name in HOT_INDEXES:
+                        cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+                    self._report(shapes, 'before', options['repeat'])
+                    raise _Rollback()
+            except _Rollback:
+                pass
+            self.stdout.write(self.style.MIGRATE_HEADING('AFTER (range lookups, hot-query indexes)'))
+        
+        self._report(shapes, 'after', options['repeat'])
+    
+    def _company(self, company_id):
+        if company_id:
+            try:
+                return Company.objects.get(pk=company_id)
+            except Company.DoesNotExist:
+                raise CommandError(f'Company {company_id} does not exist')
+        company = Company.objects.annotate(size=Count('employees')).order_by('-size').first()
+        if company is None:
+            raise CommandError('No companies to benchmark')
+        return company
+    
+    def _shapes(self, company, user, month, year):
+        month_start, month_end = month_bounds(year, month)
+        year_start, year_end = year_bounds(year)
+        
+        return [
+            (
+                'Attendance: own month (MyAttendanceView)',
+                Attendance.objects.filter(user=user, date__month=month, date__year=year),
+                Attendance.objects.filter(user=user, date__gte=month_start, date__lte=month_end),
+            ),
+            (
+                'Attendance: company month, present (AdminDashboardView)',
+                Attendance.objects.filter(user__company=company, date__month=month, date__year=year, status='PRESENT'),
+                Attendance.objects.filter(company=company, date__gte=month_start, date__lte=month_end, status='PRESENT'),
+            ),
+            (
+                'Attendance: all employees month (AllAttendanceView)',
+                Attendance.objects.filter(date__month=month, date__year=year),
+                Attendance.objects.filter(date__gte=month_start, date__lte=month_end),
+            ),
+            (
+                'TimeOff: company year by status (LeaveAnalyticsView)',
+                TimeOff.objects.filter(user__company=company, status='APPROVED', start_date__year=year),
+                TimeOff.objects.filter(company=company, status='APPROVED', start_date__gte=year_start, start_date__lte=year_end),
+            ),
+            (
+                'TimeOff: pending approval queue',
+                TimeOff.objects.filter(user__company=company, status='PENDING').order_by('start_date'),
+                TimeOff.objects.filter(company=company, status='PENDING').order_by('start_date'),
+            ),
+            (
+                'Notification: unread for user',
+                Notification.objects.filter(user=user, is_read=False),
+                Notification.objects.filter(user=user, is_read=False),
+            ),
+        ]
+    
+    def _report(self, shapes, phase, repeat):
+        for label, legacy, current in shapes:
+            queryset = legacy if phase == 'before' else current
+            self.stdout.write(self.style.SUCCESS(label))
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f'    {line}')
+            
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.values_list('pk', flat=True))
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f'    median {statistics.median(timings):.2f} ms over {repeat} run(s)\n')
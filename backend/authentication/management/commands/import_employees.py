@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.employee_import import FORMATS, EmployeeImportError, parse_rows, import_employees
+from authentication.models import Company
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-import employees into a company from a CSV (header row) or JSONL file. '
+        'Columns: first_name, last_name, email, phone, role, year_of_joining, department, job_title. '
+        'Nothing is created unless every row is valid; welcome emails are queued for the notification worker.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument('--company', type=int, required=True, help='Company id to import into')
+        parser.add_argument('--format', choices=FORMATS, help='File format, defaults to the file extension')
+    
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'{path} does not exist')
+        
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f'Cannot infer the format of {path.name}; pass --format')
+        
+        try:
+            company = Company.objects.get(pk=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f'Company {options["company"]} does not exist')
+        
+        try:
+            rows = parse_rows(path.read_bytes(), fmt)
+        except (EmployeeImportError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+        if not rows:
+            raise CommandError(f'{path.name} contains no employees')
+        
+        result = import_employees(rows, company)
+        if result['errors']:
+            for error in result['errors']:
+                self.stderr.write(f"Row {error['row']}: {error['errors']}")
+            raise CommandError(f"{len(result['errors'])} invalid row(s); nothing was imported")
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(result['created'])} employee(s) into {company.name}; welcome emails queued"
+        ))
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.rollups import rebuild_range
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily attendance rollups from raw attendance records'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First date to rebuild (YYYY-MM-DD), defaults to all history')
+        parser.add_argument('--end', help='Last date to rebuild (YYYY-MM-DD), defaults to today and beyond')
+        parser.add_argument('--company', type=int, action='append', dest='companies',
+                            help='Company id to rebuild (repeatable), defaults to all companies')
+    
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['start'])
+        end_date = self._parse_date(options['end'])
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('--start must not be after --end')
+        
+        written = rebuild_range(start_date, end_date, options['companies'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} daily rollup row(s)'))
+    
+    def _parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from authentication.models import EmployeeSearchDocument
+from authentication.search import get_backend, index_users
+
+
+class Command(BaseCommand):
+    help = 'Rebuild employee search documents (all companies, or one with --company).'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only re-index this company id')
+    
+    def handle(self, *args, **options):
+        company_id = options['company']
+        stale = EmployeeSearchDocument.objects.exclude(user__company_id__isnull=False)
+        if company_id is not None:
+            stale = EmployeeSearchDocument.objects.filter(company_id=company_id).exclude(user__company_id=company_id)
+        removed, _ = stale.delete()
+        
+        indexed = index_users(company_id=company_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} employee(s), removed {removed} stale document(s) '
+            f'[{type(get_backend()).__name__}]'
+        ))
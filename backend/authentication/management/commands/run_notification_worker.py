@@ -0,0 +1,96 @@
+import logging
+import threading
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from authentication.employee_import import process_import_jobs
+from authentication.notification_queue import process_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Deliver queued email and WhatsApp notifications from the outbox and run '
+        'queued employee imports. Runs a pool of worker threads per channel; several '
+        'worker processes may run side by side since claims are race-free.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--email-workers', type=int, default=1,
+                            help='Concurrent email senders (each batch shares one SMTP connection)')
+        parser.add_argument('--whatsapp-workers', type=int, default=2,
+                            help='Concurrent WhatsApp senders')
+        parser.add_argument('--import-workers', type=int, default=1,
+                            help='Concurrent employee import runners')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Outbox entries claimed per batch')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the currently due entries and exit')
+    
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.options = options
+        
+        threads = []
+        for channel, count in (('EMAIL', options['email_workers']), ('WHATSAPP', options['whatsapp_workers'])):
+            for index in range(count):
+                thread = threading.Thread(
+                    target=self._run_worker,
+                    args=(channel, f'{channel.lower()}-{index}-{uuid.uuid4().hex[:8]}'),
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+        for index in range(options['import_workers']):
+            thread = threading.Thread(target=self._run_import_worker, daemon=True)
+            thread.start()
+            threads.append(thread)
+        
+        self.stdout.write(f'Started {len(threads)} notification worker thread(s)')
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping notification workers...')
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+        
+        self.stdout.write(self.style.SUCCESS('Notification workers stopped'))
+    
+    def _run_worker(self, channel, worker_id):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                handled = process_batch(channel, self.options['batch_size'], worker_id)
+                if handled:
+                    continue
+                if self.options['once']:
+                    break
+                self.stop.wait(self.options['poll_interval'])
+        finally:
+            connection.close()
+    
+    def _run_import_worker(self):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    handled = process_import_jobs()
+                except Exception:
+                    # The job stays claimed and is retried once its lease expires
+                    logger.exception('Employee import job failed')
+                    handled = 0
+                if handled:
+                    continue
+                if self.options['once']:
+                    break
+                self.stop.wait(self.options['poll_interval'])
+        finally:
+            connection.close()
@@ -0,0 +1,54 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.models import Company, PayrollRun
+from authentication.payroll import RUN_CHUNK_SIZE, RUN_WORKERS, generate_run, refresh_run, close_run
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate monthly payslip snapshots in parallel chunks. Use --dirty-only to recompute just '
+        'the payslips invalidated since the last run, and --close to freeze the month.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=date.today().year)
+        parser.add_argument('--month', type=int, default=date.today().month)
+        parser.add_argument('--company', type=int, action='append', dest='companies',
+                            help='Company id to process (repeatable), defaults to all active companies')
+        parser.add_argument('--workers', type=int, default=RUN_WORKERS, help='Chunks computed concurrently')
+        parser.add_argument('--chunk-size', type=int, default=RUN_CHUNK_SIZE, help='Employees per chunk')
+        parser.add_argument('--dirty-only', action='store_true',
+                            help='Only recompute dirty or missing payslips of existing runs')
+        parser.add_argument('--close', action='store_true', help='Close the run after generating it')
+    
+    def handle(self, *args, **options):
+        year, month = options['year'], options['month']
+        if not 1 <= month <= 12:
+            raise CommandError('--month must be between 1 and 12')
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers and --chunk-size must be positive')
+        
+        companies = Company.objects.filter(is_active=True)
+        if options['companies']:
+            companies = Company.objects.filter(pk__in=options['companies'])
+        
+        for company in companies:
+            run, _ = PayrollRun.objects.get_or_create(company=company, year=year, month=month)
+            if not run.is_open:
+                self.stdout.write(self.style.WARNING(f'{run} is closed; skipped'))
+                continue
+            
+            if options['dirty_only'] and run.generated_at:
+                written = refresh_run(run)
+                self.stdout.write(f'{run}: recomputed {written} payslip(s)')
+            else:
+                written = generate_run(run, workers=options['workers'], chunk_size=options['chunk_size'])
+                self.stdout.write(f'{run}: generated {written} payslip(s)')
+            
+            if options['close']:
+                close_run(run)
+                self.stdout.write(f'{run}: closed')
+        
+        self.stdout.write(self.style.SUCCESS('Payroll run complete'))
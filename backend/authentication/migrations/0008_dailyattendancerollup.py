@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_attendance_check_in_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('half_day_count', models.PositiveIntegerField(default=0)),
+                ('leave_count', models.PositiveIntegerField(default=0)),
+                ('total_work_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_extra_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('department_breakdown', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='authentication.company')),
+            ],
+            options={
+                'verbose_name': 'Daily Attendance Rollup',
+                'verbose_name_plural': 'Daily Attendance Rollups',
+                'db_table': 'attendance_daily_rollups',
+                'ordering': ['date'],
+                'unique_together': {('company', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    Notification = apps.get_model('authentication', 'Notification')
+    NotificationCounter = apps.get_model('authentication', 'NotificationCounter')
+    rows = Notification.objects.values('user_id').annotate(
+        total=Count('id'),
+        unread=Count('id', filter=Q(is_read=False))
+    ).order_by()
+    NotificationCounter.objects.bulk_create(
+        [
+            NotificationCounter(user_id=row['user_id'], unread_count=row['unread'], total_count=row['total'])
+            for row in rows.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.IntegerField(default=0)),
+                ('total_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Notification Counter',
+                'verbose_name_plural': 'Notification Counters',
+                'db_table': 'notification_counters',
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0010_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'Notification', 'verbose_name_plural': 'Notifications'},
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='notif_user_created_idx'),
+        ),
+    ]
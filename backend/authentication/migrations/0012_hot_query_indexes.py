@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0011_notification_feed_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', 'created_at'], name='notif_user_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeoff',
+            index=models.Index(fields=['status', 'start_date'], name='timeoff_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeoff',
+            index=models.Index(fields=['user', 'start_date'], name='timeoff_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeoff',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['start_date'], name='timeoff_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0012_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='company',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to='authentication.company'),
+        ),
+        migrations.AddField(
+            model_name='leaveallocation',
+            name='company',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leave_allocations', to='authentication.company'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='company',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='authentication.company'),
+        ),
+        migrations.AddField(
+            model_name='timeoff',
+            name='company',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='time_off_requests', to='authentication.company'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['company', 'date', 'status'], name='attendance_company_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveallocation',
+            index=models.Index(fields=['company', 'year'], name='leavealloc_company_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeoff',
+            index=models.Index(fields=['company', 'status', 'start_date'], name='timeoff_company_status_idx'),
+        ),
+    ]
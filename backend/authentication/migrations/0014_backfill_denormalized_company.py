@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Max, Min, OuterRef, Subquery
+
+
+# Primary-key window per UPDATE so large tables are not locked in one statement
+BACKFILL_BATCH_SIZE = 5000
+
+DENORMALIZED_MODELS = ['Attendance', 'TimeOff', 'LeaveAllocation', 'Notification']
+
+
+def backfill_company(apps, schema_editor):
+    User = apps.get_model('authentication', 'User')
+    user_company = Subquery(User.objects.filter(pk=OuterRef('user_id')).values('company_id')[:1])
+
+    for model_name in DENORMALIZED_MODELS:
+        model = apps.get_model('authentication', model_name)
+        bounds = model.objects.filter(company__isnull=True).aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            continue
+        for start in range(bounds['low'], bounds['high'] + 1, BACKFILL_BATCH_SIZE):
+            model.objects.filter(
+                id__gte=start,
+                id__lt=start + BACKFILL_BATCH_SIZE,
+                company__isnull=True
+            ).update(company_id=user_company)
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own rather than holding one long transaction
+    atomic = False
+
+    dependencies = [
+        ('authentication', '0013_denormalized_company'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_company, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+"""
+Convert the attendance table into a PostgreSQL table range-partitioned by month
+on `date`. Other databases are left untouched (see archive_attendance for the
+archive-table fallback).
+
+PostgreSQL requires the partition key in every unique constraint, so the
+primary key becomes (id, date); ids stay unique through the shared sequence
+and nothing references attendance by foreign key.
+"""
+
+from datetime import date
+
+from django.db import migrations
+
+
+# Partitions created beyond the current month at migration time
+MONTHS_AHEAD = 3
+
+
+def _add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_attendance(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    quote = schema_editor.quote_name
+    table, legacy = 'attendance', 'attendance_unpartitioned'
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        if cursor.fetchone()[0] == 'p':
+            return
+
+        # Capture secondary indexes and constraints to recreate on the new table
+        cursor.execute(
+            """
+            SELECT indexdef FROM pg_indexes i
+            WHERE i.tablename = %s AND NOT EXISTS (
+                SELECT 1 FROM pg_constraint c
+                WHERE c.conindid = to_regclass(quote_ident(i.schemaname) || '.' || quote_ident(i.indexname))
+            )
+            """,
+            [table]
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND contype IN ('u', 'f')
+            """,
+            [table]
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(f'SELECT MIN("date"), MAX("date"), MAX(id) FROM {quote(table)}')
+        first_day, last_day, max_id = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f'PARTITION BY RANGE ("date")'
+        )
+        cursor.execute(f'ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, "date")')
+
+        cursor.execute("CREATE SEQUENCE attendance_id_seq_partitioned")
+        cursor.execute(f"ALTER SEQUENCE attendance_id_seq_partitioned OWNED BY {quote(table)}.id")
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ALTER COLUMN id SET DEFAULT nextval('attendance_id_seq_partitioned')"
+        )
+        cursor.execute("SELECT setval('attendance_id_seq_partitioned', %s, %s)", [max_id or 1, max_id is not None])
+
+        # One partition per month of existing data through a few months ahead
+        today = date.today()
+        first_day = first_day or today
+        last_day = max(last_day or today, today)
+        current = date(first_day.year, first_day.month, 1)
+        end = _add_months(date(last_day.year, last_day.month, 1), MONTHS_AHEAD)
+        while current <= end:
+            upper = _add_months(current, 1)
+            cursor.execute(
+                f"CREATE TABLE {quote(f'{table}_p{current.year}_{current.month:02d}')} "
+                f"PARTITION OF {quote(table)} FOR VALUES FROM (%s) TO (%s)",
+                [current, upper]
+            )
+            current = upper
+        cursor.execute(f"CREATE TABLE {quote(f'{table}_default')} PARTITION OF {quote(table)} DEFAULT")
+
+        cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}")
+        cursor.execute(f"DROP TABLE {quote(legacy)}")
+
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        for name, definition in constraints:
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0014_backfill_denormalized_company'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_attendance, migrations.RunPython.noop),
+    ]
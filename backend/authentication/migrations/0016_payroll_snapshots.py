@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0015_partition_attendance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('CLOSED', 'Closed')], default='OPEN', max_length=20)),
+                ('generated_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payroll_runs', to='authentication.company')),
+            ],
+            options={
+                'verbose_name': 'Payroll Run',
+                'verbose_name_plural': 'Payroll Runs',
+                'db_table': 'payroll_runs',
+                'ordering': ['-year', '-month'],
+                'unique_together': {('company', 'year', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Payslip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(blank=True, max_length=100)),
+                ('job_title', models.CharField(blank=True, max_length=100)),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('half_days', models.PositiveIntegerField(default=0)),
+                ('leave_days', models.PositiveIntegerField(default=0)),
+                ('working_days', models.DecimalField(decimal_places=1, default=0, max_digits=5)),
+                ('monthly_wage', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('basic_salary', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('hra', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('allowances', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('gross_salary', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('earned_basic', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('earned_hra', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('earned_allowances', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('professional_tax', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pf_employee', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_deductions', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('net_salary', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('is_dirty', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payslips', to='authentication.payrollrun')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payslips', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Payslip',
+                'verbose_name_plural': 'Payslips',
+                'db_table': 'payslips',
+                'indexes': [models.Index(fields=['run', 'is_dirty'], name='payslip_run_dirty_idx'), models.Index(fields=['user', 'run'], name='payslip_user_run_idx')],
+                'unique_together': {('run', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each (company, year) sequence after the highest serial already issued"""
+    User = apps.get_model('authentication', 'User')
+    EmployeeIdSequence = apps.get_model('authentication', 'EmployeeIdSequence')
+    highest = {}
+    rows = User.objects.filter(company__isnull=False, employee_id__isnull=False).values_list(
+        'company_id', 'year_of_joining', 'employee_id'
+    )
+    for company_id, year, employee_id in rows.iterator():
+        tail = employee_id.rpartition(str(year))[2]
+        serial = int(tail) if tail.isdigit() else 0
+        key = (company_id, year)
+        highest[key] = max(highest.get(key, 0), serial)
+    EmployeeIdSequence.objects.bulk_create(
+        [
+            EmployeeIdSequence(company_id=company_id, year=year, last_serial=serial)
+            for (company_id, year), serial in highest.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0016_payroll_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeIdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('last_serial', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='employee_id_sequences', to='authentication.company')),
+            ],
+            options={
+                'verbose_name': 'Employee ID Sequence',
+                'verbose_name_plural': 'Employee ID Sequences',
+                'db_table': 'employee_id_sequences',
+                'unique_together': {('company', 'year')},
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,165 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:23
+"""
+Employee search documents plus the database's native text index:
+PostgreSQL gets a weighted tsvector generated column with a GIN index; SQLite
+gets an FTS5 trigram table kept in sync by triggers. Other databases (or
+SQLite builds without FTS5) use the in-process trigram index.
+"""
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+
+FTS_COLUMNS = ('name', 'employee_id', 'email', 'department', 'job_title', 'skills', 'certifications', 'location')
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE employee_search_documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', name || ' ' || employee_id || ' ' || email), 'A')
+        || setweight(to_tsvector('simple', department || ' ' || job_title), 'B')
+        || setweight(to_tsvector('simple', skills || ' ' || certifications), 'C')
+        || setweight(to_tsvector('simple', location), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX employee_search_vector_gin ON employee_search_documents USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS employee_search_vector_gin",
+    "ALTER TABLE employee_search_documents DROP COLUMN IF EXISTS search_vector",
+]
+
+_columns = ', '.join(FTS_COLUMNS)
+_new = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+_old = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE employee_search_fts USING fts5(
+        {_columns}, content='employee_search_documents', content_rowid='user_id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER employee_search_fts_ai AFTER INSERT ON employee_search_documents BEGIN
+        INSERT INTO employee_search_fts(rowid, {_columns}) VALUES (new.user_id, {_new});
+    END
+    """,
+    f"""
+    CREATE TRIGGER employee_search_fts_ad AFTER DELETE ON employee_search_documents BEGIN
+        INSERT INTO employee_search_fts(employee_search_fts, rowid, {_columns}) VALUES ('delete', old.user_id, {_old});
+    END
+    """,
+    f"""
+    CREATE TRIGGER employee_search_fts_au AFTER UPDATE ON employee_search_documents BEGIN
+        INSERT INTO employee_search_fts(employee_search_fts, rowid, {_columns}) VALUES ('delete', old.user_id, {_old});
+        INSERT INTO employee_search_fts(rowid, {_columns}) VALUES (new.user_id, {_new});
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS employee_search_fts_au",
+    "DROP TRIGGER IF EXISTS employee_search_fts_ad",
+    "DROP TRIGGER IF EXISTS employee_search_fts_ai",
+    "DROP TABLE IF EXISTS employee_search_fts",
+]
+
+
+def create_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for statement in POSTGRES_FORWARD:
+            schema_editor.execute(statement)
+    elif vendor == 'sqlite':
+        try:
+            for statement in SQLITE_FORWARD:
+                schema_editor.execute(statement)
+        except OperationalError:
+            # SQLite built without FTS5 (or < 3.34 for the trigram tokenizer)
+            for statement in SQLITE_BACKWARD:
+                schema_editor.execute(statement)
+
+
+def drop_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def _flatten(items):
+    if not items:
+        return ''
+    if isinstance(items, (str, int, float)):
+        return str(items)
+    if isinstance(items, dict):
+        return ' '.join(_flatten(value) for value in items.values())
+    return ' '.join(_flatten(item) for item in items)
+
+
+def index_existing_users(apps, schema_editor):
+    User = apps.get_model('authentication', 'User')
+    EmployeeSearchDocument = apps.get_model('authentication', 'EmployeeSearchDocument')
+    rows = User.objects.filter(company__isnull=False).values(
+        'id', 'company_id', 'is_active', 'first_name', 'last_name', 'email', 'employee_id',
+        'profile__department', 'profile__job_title', 'profile__skills', 'profile__certifications',
+        'profile__location'
+    )
+    documents = []
+    for row in rows.iterator():
+        fields = {
+            'name': f"{row['first_name']} {row['last_name']}".strip(),
+            'employee_id': row['employee_id'] or '',
+            'email': row['email'] or '',
+            'department': row['profile__department'] or '',
+            'job_title': row['profile__job_title'] or '',
+            'skills': _flatten(row['profile__skills']),
+            'certifications': _flatten(row['profile__certifications']),
+            'location': row['profile__location'] or '',
+        }
+        documents.append(EmployeeSearchDocument(
+            user_id=row['id'],
+            company_id=row['company_id'],
+            is_active=row['is_active'],
+            document=' '.join(value for value in fields.values() if value).lower(),
+            **fields
+        ))
+    EmployeeSearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0018_user_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeSearchDocument',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('is_active', models.BooleanField(default=True)),
+                ('name', models.CharField(blank=True, max_length=201)),
+                ('employee_id', models.CharField(blank=True, max_length=50)),
+                ('email', models.CharField(blank=True, max_length=254)),
+                ('department', models.CharField(blank=True, max_length=100)),
+                ('job_title', models.CharField(blank=True, max_length=100)),
+                ('skills', models.TextField(blank=True)),
+                ('certifications', models.TextField(blank=True)),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('document', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='authentication.company')),
+            ],
+            options={
+                'verbose_name': 'Employee Search Document',
+                'verbose_name_plural': 'Employee Search Documents',
+                'db_table': 'employee_search_documents',
+                'indexes': [models.Index(fields=['company', 'is_active'], name='search_doc_company_idx')],
+            },
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+        migrations.RunPython(index_existing_users, migrations.RunPython.noop),
+    ]
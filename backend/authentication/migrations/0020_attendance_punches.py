@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0019_employee_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendancePunch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=128)),
+                ('action', models.CharField(choices=[('check_in', 'Check In'), ('check_out', 'Check Out')], max_length=10)),
+                ('punched_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_punches', to='authentication.company')),
+                ('submitted_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submitted_punches', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_punches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Attendance Punch',
+                'verbose_name_plural': 'Attendance Punches',
+                'db_table': 'attendance_punches',
+                'unique_together': {('company', 'idempotency_key')},
+            },
+        ),
+    ]
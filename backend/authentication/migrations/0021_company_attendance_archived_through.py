@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0020_attendance_punches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='attendance_archived_through',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def scrub_welcome_passwords(apps, schema_editor):
+    """Welcome entries no longer carry a temporary password; pending ones get a fresh one at send time"""
+    NotificationOutbox = apps.get_model('authentication', 'NotificationOutbox')
+    entries = list(NotificationOutbox.objects.filter(event='welcome', payload__has_key='temp_password'))
+    for entry in entries:
+        entry.payload.pop('temp_password')
+        entry.payload['issue_password'] = True
+    NotificationOutbox.objects.bulk_update(entries, ['payload'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0021_company_attendance_archived_through'),
+    ]
+
+    operations = [
+        migrations.RunPython(scrub_welcome_passwords, migrations.RunPython.noop),
+    ]
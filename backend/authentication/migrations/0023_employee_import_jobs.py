@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0022_scrub_welcome_passwords'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='employee_imports/')),
+                ('format', models.CharField(max_length=10)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('created', models.JSONField(blank=True, default=list)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='employee_imports', to='authentication.company')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='employee_imports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Employee Import Job',
+                'verbose_name_plural': 'Employee Import Jobs',
+                'db_table': 'employee_import_jobs',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='import_job_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0023_employee_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payslip',
+            name='dirty_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
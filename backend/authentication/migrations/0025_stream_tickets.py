@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0024_payslip_dirty_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreamTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('expires_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stream_tickets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Stream Ticket',
+                'verbose_name_plural': 'Stream Tickets',
+                'db_table': 'stream_tickets',
+                'indexes': [models.Index(fields=['expires_at'], name='stream_ticket_expiry_idx')],
+            },
+        ),
+    ]
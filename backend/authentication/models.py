@@ -1,6 +1,11 @@
+import hashlib
+import secrets
+
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
-from datetime import datetime
+from django.db import connection, models, router, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from datetime import datetime, timedelta
 
 
 class Company(models.Model):
@@ -9,6 +14,9 @@ class Company(models.Model):
     logo = models.ImageField(upload_to='company_logos/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    # Last day whose raw attendance was archived (authentication.partitioning);
+    # rollups up to it are final and never rebuilt
+    attendance_archived_through = models.DateField(null=True, blank=True)
     
     class Meta:
         db_table = 'companies'
@@ -76,6 +84,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     is_first_login = models.BooleanField(default=True)
     
+    # Bumped when role, company or active status changes; access tokens carrying an older value are rejected
+    token_version = models.PositiveIntegerField(default=0)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -85,6 +96,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
     
+    # Columns embedded in access tokens (see authentication.jwt_auth)
+    TOKEN_CLAIM_FIELDS = ('role', 'company_id', 'is_active', 'token_version')
+    
+    # Claim values a claims-built user was created with, until they are reloaded
+    _token_claims = None
+    
     class Meta:
         db_table = 'users'
         verbose_name = 'User'
@@ -97,6 +114,60 @@ class User(AbstractBaseUser, PermissionsMixin):
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}"
     
+    @classmethod
+    def from_token_claims(cls, user_id, claims):
+        """
+        User built from access token claims without a query. The remaining
+        columns are deferred and load together on first access.
+        """
+        values = {'id': user_id, **{field: claims[field] for field in cls.TOKEN_CLAIM_FIELDS}}
+        user = cls.from_db(
+            router.db_for_read(cls),
+            list(values),
+            [values[field.attname] for field in cls._meta.concrete_fields if field.attname in values]
+        )
+        user._token_claims = {field: values[field] for field in cls.TOKEN_CLAIM_FIELDS}
+        return user
+    
+    def _stale_claim_fields(self):
+        """Claim fields still holding the token's values, which may be older than the row"""
+        if self._token_claims is None:
+            return set()
+        return {
+            field for field, value in self._token_claims.items()
+            if field in self.__dict__ and self.__dict__[field] == value
+        }
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # A claims-built user loads every deferred column at once rather than one
+        # query per field, and reloads the claims the caller has not changed
+        reloaded_claims = set()
+        if fields is not None and self._token_claims is not None:
+            reloaded_claims = self._stale_claim_fields()
+            fields = set(fields) | self.get_deferred_fields() | reloaded_claims
+            self._token_claims = None
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if reloaded_claims:
+            from .signals import reset_origin
+            reset_origin(self, reloaded_claims)
+    
+    def save(self, *args, **kwargs):
+        # Never write the token's claim values back over newer ones (e.g. a deactivation
+        # or token revocation committed after the token was issued)
+        stale = self._stale_claim_fields()
+        if stale and not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.attname for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in deferred
+                ]
+            kwargs['update_fields'] = [field for field in update_fields if field not in stale]
+            if not kwargs['update_fields']:
+                return
+        super().save(*args, **kwargs)
+    
     def generate_employee_id(self):
         """Generate employee ID in format: OI[CompanyCode][NameCode][Year][SerialNum]"""
         if not self.company:
@@ -114,16 +185,80 @@ class User(AbstractBaseUser, PermissionsMixin):
         # Year
         year = str(self.year_of_joining)
         
-        # Get serial number for this year
-        year_employees = User.objects.filter(
-            company=self.company,
-            year_of_joining=self.year_of_joining
-        ).count()
-        serial_num = str(year_employees + 1).zfill(4)
+        # Next serial for this company and year
+        serial_num = str(EmployeeIdSequence.reserve(self.company, self.year_of_joining)).zfill(4)
         
         return f"{prefix}{company_code}{name_code}{year}{serial_num}"
 
 
+class EmployeeIdSequence(models.Model):
+    """Last employee ID serial handed out per company and joining year"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='employee_id_sequences')
+    year = models.IntegerField()
+    last_serial = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'employee_id_sequences'
+        verbose_name = 'Employee ID Sequence'
+        verbose_name_plural = 'Employee ID Sequences'
+        unique_together = ['company', 'year']
+    
+    def __str__(self):
+        return f"{self.company_id}/{self.year}: {self.last_serial}"
+    
+    @classmethod
+    def reserve(cls, company, year, count=1):
+        """
+        Reserve `count` consecutive serials and return the first one.
+        The increment is a single UPDATE, so concurrent callers queue on the
+        row lock and never receive overlapping blocks.
+        """
+        company_id = getattr(company, 'pk', company)
+        with transaction.atomic():
+            last_serial = cls._increment(company_id, year, count)
+            if last_serial is None:
+                cls.objects.get_or_create(
+                    company_id=company_id,
+                    year=year,
+                    defaults={'last_serial': cls.highest_serial(company_id, year)}
+                )
+                last_serial = cls._increment(company_id, year, count)
+        return last_serial - count + 1
+    
+    @classmethod
+    def _increment(cls, company_id, year, count):
+        """Bump the counter and return the new value, or None when the row does not exist yet"""
+        if connection.vendor in ('postgresql', 'sqlite'):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {cls._meta.db_table} SET last_serial = last_serial + %s, updated_at = %s "
+                    f"WHERE company_id = %s AND year = %s RETURNING last_serial",
+                    [count, connection.ops.adapt_datetimefield_value(timezone.now()), company_id, year]
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+        
+        sequence = cls.objects.filter(company_id=company_id, year=year)
+        if not sequence.update(last_serial=F('last_serial') + count, updated_at=timezone.now()):
+            return None
+        return sequence.values_list('last_serial', flat=True).get()
+    
+    @staticmethod
+    def highest_serial(company_id, year):
+        """Largest serial already used by a company's employee IDs for a year (seeds a new sequence)"""
+        employee_ids = User.objects.filter(
+            company_id=company_id,
+            year_of_joining=year,
+            employee_id__isnull=False
+        ).values_list('employee_id', flat=True)
+        serials = [
+            int(tail) for tail in (employee_id.rpartition(str(year))[2] for employee_id in employee_ids)
+            if tail.isdigit()
+        ]
+        return max(serials, default=0)
+
+
 class EmployeeProfile(models.Model):
     """Extended employee profile information"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -222,7 +357,12 @@ class Attendance(models.Model):
         ('ABSENT', 'Absent'),        ('HALF_DAY', 'Half Day'),        ('LEAVE', 'On Leave'),
     ]
     
+    # Hours beyond this count as extra hours
+    STANDARD_WORK_HOURS = 8
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_records')
+    # Denormalized from user.company (set on save) so company filters skip the users join
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='attendance_records')
     date = models.DateField()
     check_in = models.TimeField(null=True, blank=True)
     check_out = models.TimeField(null=True, blank=True)
@@ -246,8 +386,12 @@ class Attendance(models.Model):
         db_table = 'attendance'
         verbose_name = 'Attendance'
         verbose_name_plural = 'Attendance Records'
-        unique_together = ['user', 'date']
+        unique_together = ['user', 'date']  # also serves (user_id, date) range scans
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+            models.Index(fields=['company', 'date', 'status'], name='attendance_company_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.date} - {self.status}"
@@ -266,8 +410,7 @@ class Attendance(models.Model):
             duration = check_out_dt - check_in_dt
             hours = duration.total_seconds() / 3600
             
-            # Standard work hours (e.g., 8 hours)
-            standard_hours = 8
+            standard_hours = self.STANDARD_WORK_HOURS
             self.work_hours = min(hours, standard_hours)
             self.extra_hours = max(0, hours - standard_hours)
             
@@ -275,6 +418,71 @@ class Attendance(models.Model):
                 self.status = 'PRESENT'
 
 
+
+class AttendancePunch(models.Model):
+    """
+    A check-in/check-out punch accepted by bulk ingestion, recorded under the
+    client's idempotency key so a resent batch is not applied twice
+    """
+    ACTION_CHOICES = [
+        ('check_in', 'Check In'),
+        ('check_out', 'Check Out'),
+    ]
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='attendance_punches')
+    idempotency_key = models.CharField(max_length=128)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_punches')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    punched_at = models.DateTimeField()
+    submitted_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='submitted_punches'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'attendance_punches'
+        verbose_name = 'Attendance Punch'
+        verbose_name_plural = 'Attendance Punches'
+        unique_together = ['company', 'idempotency_key']
+    
+    def __str__(self):
+        return f"{self.user_id} {self.action} at {self.punched_at}"
+
+
+class DailyAttendanceRollup(models.Model):
+    """Per-company, per-day attendance totals materialized from Attendance"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='attendance_rollups')
+    date = models.DateField()
+    
+    # Record counts per attendance status
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    half_day_count = models.PositiveIntegerField(default=0)
+    leave_count = models.PositiveIntegerField(default=0)
+    
+    # Hour totals across all records of the day
+    total_work_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_extra_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # {department: {'PRESENT': n, 'ABSENT': n, 'HALF_DAY': n, 'LEAVE': n, 'total': n}}
+    department_breakdown = models.JSONField(default=dict, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'attendance_daily_rollups'
+        verbose_name = 'Daily Attendance Rollup'
+        verbose_name_plural = 'Daily Attendance Rollups'
+        unique_together = ['company', 'date']
+        ordering = ['date']
+    
+    def __str__(self):
+        return f"{self.company.name} - {self.date}"
+    
+    @property
+    def total_records(self):
+        return self.present_count + self.absent_count + self.half_day_count + self.leave_count
+
 class TimeOff(models.Model):
     """Time off / Leave management"""
     TYPE_CHOICES = [
@@ -290,6 +498,8 @@ class TimeOff(models.Model):
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='time_off_requests')
+    # Denormalized from user.company (set on save) so company filters skip the users join
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='time_off_requests')
     time_off_type = models.CharField(max_length=20, choices=TYPE_CHOICES)
     start_date = models.DateField()
     end_date = models.DateField()
@@ -308,6 +518,13 @@ class TimeOff(models.Model):
         verbose_name = 'Time Off'
         verbose_name_plural = 'Time Off Requests'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'start_date'], name='timeoff_status_start_idx'),
+            models.Index(fields=['company', 'status', 'start_date'], name='timeoff_company_status_idx'),
+            models.Index(fields=['user', 'start_date'], name='timeoff_user_start_idx'),
+            # Small partial index for the approval queue
+            models.Index(fields=['start_date'], condition=Q(status='PENDING'), name='timeoff_pending_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.time_off_type} ({self.start_date} to {self.end_date})"
@@ -321,6 +538,8 @@ class TimeOff(models.Model):
 class LeaveAllocation(models.Model):
     """Leave allocation per user per year"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leave_allocations')
+    # Denormalized from user.company (set on save) so company filters skip the users join
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='leave_allocations')
     year = models.IntegerField(default=datetime.now().year)
     paid_leave_total = models.IntegerField(default=24)  # 24 days per year
     paid_leave_used = models.IntegerField(default=0)
@@ -334,6 +553,9 @@ class LeaveAllocation(models.Model):
         unique_together = ['user', 'year']
         verbose_name = 'Leave Allocation'
         verbose_name_plural = 'Leave Allocations'
+        indexes = [
+            models.Index(fields=['company', 'year'], name='leavealloc_company_year_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.year}"
@@ -357,6 +579,8 @@ class Notification(models.Model):
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    # Denormalized from user.company (set on save) so company filters skip the users join
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='notifications')
     title = models.CharField(max_length=255)
     message = models.TextField()
     notification_type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='INFO')
@@ -370,14 +594,365 @@ class Notification(models.Model):
         db_table = 'notifications'
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Keyset pagination of a user's feed on (created_at, id)
+            models.Index(fields=['user', 'created_at', 'id'], name='notif_user_created_idx'),
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notif_user_read_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.title}"
     
     def mark_as_read(self):
-        """Mark notification as read"""
-        if not self.is_read:
-            self.is_read = True
-            self.read_at = datetime.now()
-            self.save()
+        """Mark notification as read; returns True if it was unread"""
+        if self.is_read:
+            return False
+        
+        now = timezone.now()
+        updated = Notification.objects.filter(pk=self.pk, is_read=False).update(is_read=True, read_at=now)
+        self.is_read = True
+        self.read_at = now
+        if updated:
+            NotificationCounter.adjust(self.user_id, unread=-1)
+        return bool(updated)
+
+
+class NotificationCounter(models.Model):
+    """Denormalized per-user notification totals so badge polling is a primary-key lookup"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread_count = models.IntegerField(default=0)
+    total_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'notification_counters'
+        verbose_name = 'Notification Counter'
+        verbose_name_plural = 'Notification Counters'
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_count} unread / {self.total_count}"
+    
+    @classmethod
+    def recount(cls, user_ids):
+        """Rebuild counters for the given users from the notifications table"""
+        user_ids = list(user_ids)
+        counts = {
+            row['user_id']: row
+            for row in Notification.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+                total=Count('id'),
+                unread=Count('id', filter=Q(is_read=False))
+            ).order_by()
+        }
+        cls.objects.bulk_create(
+            [
+                cls(
+                    user_id=user_id,
+                    unread_count=counts.get(user_id, {}).get('unread', 0),
+                    total_count=counts.get(user_id, {}).get('total', 0)
+                )
+                for user_id in user_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['unread_count', 'total_count', 'updated_at']
+        )
+    
+    @classmethod
+    def adjust(cls, user_ids, unread=0, total=0):
+        """
+        Atomically shift counters with a single UPDATE ... SET col = col + n.
+        Users without a counter row yet are initialised from the source table.
+        """
+        if isinstance(user_ids, int):
+            user_ids = [user_ids]
+        user_ids = set(user_ids)
+        if not user_ids or (not unread and not total):
+            return
+        
+        counters = cls.objects.filter(user_id__in=user_ids)
+        updated = counters.update(
+            unread_count=F('unread_count') + unread,
+            total_count=F('total_count') + total,
+            updated_at=timezone.now()
+        )
+        if updated != len(user_ids):
+            missing = user_ids - set(counters.values_list('user_id', flat=True))
+            if missing:
+                cls.recount(missing)
+        
+        from .realtime import publish_counters
+        publish_counters(user_ids)
+    
+    @classmethod
+    def snapshot(cls, user):
+        """(total, unread, updated_at) for a user, initialising the counter on first use"""
+        fields = ('total_count', 'unread_count', 'updated_at')
+        counter = cls.objects.filter(user_id=user.pk).values_list(*fields).first()
+        if counter is None:
+            cls.recount([user.pk])
+            counter = cls.objects.filter(user_id=user.pk).values_list(*fields).first()
+        return counter
+    
+    @classmethod
+    def counts_for(cls, user):
+        """(total, unread) for a user"""
+        return cls.snapshot(user)[:2]
+
+
+class NotificationOutbox(models.Model):
+    """Queued email/WhatsApp notification awaiting delivery by the notification worker"""
+    CHANNEL_CHOICES = [
+        ('EMAIL', 'Email'),
+        ('WHATSAPP', 'WhatsApp'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('SENT', 'Sent'),
+        ('SKIPPED', 'Skipped'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    event = models.CharField(max_length=50)  # 'leave_approval', 'leave_request_to_admin', etc.
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    
+    # Delivery attempts and exponential backoff
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    
+    # Worker lease
+    claimed_by = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'notification_outbox'
+        verbose_name = 'Notification Outbox Entry'
+        verbose_name_plural = 'Notification Outbox'
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['channel', 'status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.channel} {self.event} ({self.status})"
+
+
+class StreamTicket(models.Model):
+    """
+    Single-use credential, valid for TTL seconds, that opens the notification
+    stream. EventSource cannot send an Authorization header, and the stream URL
+    ends up in access logs, so it carries a ticket instead of the access token.
+    Only the ticket's SHA-256 digest is stored.
+    """
+    TTL = 30
+    
+    key = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='stream_tickets')
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'stream_tickets'
+        verbose_name = 'Stream Ticket'
+        verbose_name_plural = 'Stream Tickets'
+        indexes = [
+            models.Index(fields=['expires_at'], name='stream_ticket_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Stream ticket for {self.user_id}"
+    
+    @staticmethod
+    def digest(ticket):
+        return hashlib.sha256(ticket.encode()).hexdigest()
+    
+    @classmethod
+    def issue(cls, user):
+        """New ticket for the user; expired tickets are purged on the way"""
+        now = timezone.now()
+        cls.objects.filter(expires_at__lte=now).delete()
+        ticket = secrets.token_urlsafe(32)
+        cls.objects.create(key=cls.digest(ticket), user_id=user.pk, expires_at=now + timedelta(seconds=cls.TTL))
+        return ticket
+    
+    @classmethod
+    def redeem(cls, ticket):
+        """The ticket's active user, or None; a ticket is accepted at most once"""
+        found = cls.objects.select_related('user').filter(
+            key=cls.digest(ticket), expires_at__gt=timezone.now()
+        ).first()
+        if found is None:
+            return None
+        # Only the request whose delete removed the row may use it
+        deleted, _ = cls.objects.filter(pk=found.pk).delete()
+        if not deleted or not found.user.is_active:
+            return None
+        return found.user
+
+
+class EmployeeImportJob(models.Model):
+    """Uploaded employee import file waiting for the notification worker to run it"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='employee_imports')
+    requested_by = models.ForeignKey(
+        'User', on_delete=models.SET_NULL, null=True, blank=True, related_name='employee_imports'
+    )
+    file = models.FileField(upload_to='employee_imports/')
+    format = models.CharField(max_length=10)  # 'csv' or 'jsonl'
+    row_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    
+    # Outcome: employees created, or the rows that stopped the import
+    created = models.JSONField(default=list, blank=True)
+    errors = models.JSONField(default=list, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'employee_import_jobs'
+        verbose_name = 'Employee Import Job'
+        verbose_name_plural = 'Employee Import Jobs'
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='import_job_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Import {self.pk} into {self.company_id} ({self.status})"
+
+
+class PayrollRun(models.Model):
+    """A company's payroll for one month; reports read its persisted payslips"""
+    STATUS_CHOICES = [
+        ('OPEN', 'Open'),
+        ('CLOSED', 'Closed'),
+    ]
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='payroll_runs')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
+    
+    generated_at = models.DateTimeField(null=True, blank=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'payroll_runs'
+        verbose_name = 'Payroll Run'
+        verbose_name_plural = 'Payroll Runs'
+        unique_together = ['company', 'year', 'month']
+        ordering = ['-year', '-month']
+    
+    def __str__(self):
+        return f"{self.company.name} - {self.year}-{self.month:02d} ({self.status})"
+    
+    @property
+    def is_open(self):
+        return self.status == 'OPEN'
+
+
+class Payslip(models.Model):
+    """Snapshot of one employee's computed pay for a payroll run"""
+    run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='payslips')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payslips')
+    
+    # Profile details as of computation
+    department = models.CharField(max_length=100, blank=True)
+    job_title = models.CharField(max_length=100, blank=True)
+    
+    # Attendance for the month
+    present_days = models.PositiveIntegerField(default=0)
+    half_days = models.PositiveIntegerField(default=0)
+    leave_days = models.PositiveIntegerField(default=0)
+    working_days = models.DecimalField(max_digits=5, decimal_places=1, default=0)
+    
+    # Configured monthly components
+    monthly_wage = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    basic_salary = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    hra = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    allowances = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Earned for the days worked
+    gross_salary = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    earned_basic = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    earned_hra = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    earned_allowances = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Deductions and net pay
+    professional_tax = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pf_employee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_deductions = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    net_salary = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Set when source attendance or salary changes; recomputed before the next read
+    is_dirty = models.BooleanField(default=False)
+    # Bumped with every mark_dirty; a recompute only keeps is_dirty cleared if it is unchanged
+    dirty_version = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'payslips'
+        verbose_name = 'Payslip'
+        verbose_name_plural = 'Payslips'
+        unique_together = ['run', 'user']
+        indexes = [
+            models.Index(fields=['run', 'is_dirty'], name='payslip_run_dirty_idx'),
+            models.Index(fields=['user', 'run'], name='payslip_user_run_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.get_full_name()} - {self.run.year}-{self.run.month:02d}"
+
+
+class EmployeeSearchDocument(models.Model):
+    """
+    Denormalized, searchable copy of an employee's directory fields, kept in step
+    by signals. The database-specific index (PostgreSQL tsvector GIN or SQLite
+    FTS5) is created on this table by migration 0019.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='search_documents')
+    is_active = models.BooleanField(default=True)
+    
+    # Indexed fields, highest weight first
+    name = models.CharField(max_length=201, blank=True)
+    employee_id = models.CharField(max_length=50, blank=True)
+    email = models.CharField(max_length=254, blank=True)
+    department = models.CharField(max_length=100, blank=True)
+    job_title = models.CharField(max_length=100, blank=True)
+    skills = models.TextField(blank=True)
+    certifications = models.TextField(blank=True)
+    location = models.CharField(max_length=200, blank=True)
+    
+    # Lowercased concatenation of every field, for word-prefix scans and the spelling vocabulary
+    document = models.TextField(blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'employee_search_documents'
+        verbose_name = 'Employee Search Document'
+        verbose_name_plural = 'Employee Search Documents'
+        indexes = [
+            models.Index(fields=['company', 'is_active'], name='search_doc_company_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.employee_id})"
@@ -0,0 +1,249 @@
+"""
+Notification Dispatch Queue
+Outbox-backed delivery of email and WhatsApp notifications.
+Views enqueue rows; the run_notification_worker command claims and sends them.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import NotificationOutbox, TimeOff, User
+
+logger = logging.getLogger(__name__)
+
+
+# Exponential backoff: 30s, 60s, 120s, ... capped at one hour
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+# A PROCESSING row older than this is assumed orphaned by a dead worker
+LEASE_SECONDS = 300
+
+# ============================================================================
+# ENQUEUE
+# ============================================================================
+
+def enqueue(channel, event, **payload):
+    """Record a notification for asynchronous delivery (a single INSERT)"""
+    return NotificationOutbox.objects.create(channel=channel, event=event, payload=payload)
+
+
+def enqueue_leave_notification(event, time_off, channels=('EMAIL',)):
+    """Queue a leave-related notification on each requested channel"""
+    return [enqueue(channel, event, time_off_id=time_off.id) for channel in channels]
+
+
+def enqueue_welcome_emails(users, issue_passwords=True):
+    """
+    Queue welcome emails for users with one bulk INSERT. With issue_passwords,
+    the worker sets a fresh temporary password when it sends the email (while
+    the user has not logged in yet), so no credential is ever stored in the outbox.
+    """
+    return NotificationOutbox.objects.bulk_create([
+        NotificationOutbox(
+            channel='EMAIL',
+            event='welcome',
+            payload={'user_id': user.id, 'issue_password': issue_passwords}
+        )
+        for user in users
+    ])
+
+
+# ============================================================================
+# HANDLERS
+# ============================================================================
+
+# Events addressed to a user (payload user_id) rather than a leave request (payload time_off_id).
+# Handlers receive that subject and the entry payload.
+USER_EVENTS = ('welcome',)
+
+
+def _email_handlers(passwords):
+    from .notifications import EmailNotificationService
+    return {
+        'leave_approval': lambda time_off, payload: EmailNotificationService.send_leave_approval_email(time_off),
+        'leave_rejection': lambda time_off, payload: EmailNotificationService.send_leave_rejection_email(time_off),
+        'leave_request_to_admin': lambda time_off, payload: EmailNotificationService.send_leave_request_to_admin(time_off),
+        'welcome': lambda user, payload: EmailNotificationService.send_welcome_email(user, passwords.get(user.id)),
+    }
+
+
+def _issue_passwords(entries):
+    """
+    Set a fresh temporary password for every welcome entry of a batch that asks
+    for one, hashed together (see employee_import.hash_passwords) and written in
+    one UPDATE. Users who already logged in keep theirs. Returns {user_id: password}.
+    """
+    from .employee_import import hash_passwords
+    from .utils import generate_random_password
+
+    user_ids = {
+        entry.payload.get('user_id') for entry in entries
+        if entry.event == 'welcome' and entry.payload.get('issue_password')
+    }
+    users = list(User.objects.filter(pk__in=user_ids, is_first_login=True).only('id', 'password'))
+    if not users:
+        return {}
+
+    passwords = [generate_random_password() for _ in users]
+    for user, password_hash in zip(users, hash_passwords(passwords)):
+        user.password = password_hash
+    User.objects.bulk_update(users, ['password'])
+    return {user.id: password for user, password in zip(users, passwords)}
+
+
+def _whatsapp_handlers(service):
+    def requires_phone(send):
+        # No phone number means there is nothing to retry
+        return lambda time_off, payload: send(time_off) if time_off.user.phone else None
+
+    return {
+        'leave_approval': requires_phone(service.send_leave_approval_whatsapp),
+        'leave_rejection': requires_phone(service.send_leave_rejection_whatsapp),
+    }
+
+
+def _load_time_offs(entries):
+    """Fetch every TimeOff referenced by a batch in one query"""
+    ids = {entry.payload.get('time_off_id') for entry in entries if entry.payload.get('time_off_id')}
+    return TimeOff.objects.select_related(
+        'user', 'user__company', 'user__profile', 'approved_by'
+    ).in_bulk(ids)
+
+
+def _load_users(entries):
+    """Fetch every User referenced by a batch in one query"""
+    ids = {entry.payload.get('user_id') for entry in entries if entry.payload.get('user_id')}
+    return User.objects.select_related('company').in_bulk(ids)
+
+
+# ============================================================================
+# CLAIM / DISPATCH
+# ============================================================================
+
+def claim_batch(channel, batch_size, worker_id=None):
+    """
+    Atomically claim up to batch_size due entries for a channel.
+    Claims are race-free across threads and processes: the conditional UPDATE
+    only succeeds for rows still PENDING (or whose lease has expired).
+    """
+    worker_id = worker_id or uuid.uuid4().hex
+    now = timezone.now()
+    due = Q(status='PENDING', next_attempt_at__lte=now) | Q(
+        status='PROCESSING', claimed_at__lt=now - timedelta(seconds=LEASE_SECONDS)
+    )
+
+    with transaction.atomic():
+        candidate_ids = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+                due, channel=channel
+            ).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        if not candidate_ids:
+            return []
+        NotificationOutbox.objects.filter(due, id__in=candidate_ids).update(
+            status='PROCESSING', claimed_by=worker_id, claimed_at=now
+        )
+
+    return list(NotificationOutbox.objects.filter(
+        id__in=candidate_ids, claimed_by=worker_id, status='PROCESSING'
+    ))
+
+
+def _finish(entry, result, error=''):
+    """Record the outcome of one delivery attempt"""
+    entry.attempts += 1
+    entry.claimed_by = ''
+    entry.claimed_at = None
+
+    if result is True:
+        entry.status = 'SENT'
+        entry.sent_at = timezone.now()
+        entry.last_error = ''
+    elif result is None:
+        entry.status = 'SKIPPED'
+        entry.last_error = error
+    elif entry.attempts >= entry.max_attempts:
+        entry.status = 'FAILED'
+        entry.last_error = error or 'Delivery failed'
+        logger.error(f"Notification outbox {entry.id} failed permanently: {entry.last_error}")
+    else:
+        delay = min(RETRY_BASE_SECONDS * 2 ** (entry.attempts - 1), RETRY_MAX_SECONDS)
+        entry.status = 'PENDING'
+        entry.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        entry.last_error = error or 'Delivery failed'
+
+    entry.save(update_fields=[
+        'attempts', 'status', 'sent_at', 'next_attempt_at', 'last_error', 'claimed_by', 'claimed_at'
+    ])
+
+
+def _deliver(entries, handlers, skip_reason=None):
+    time_offs = _load_time_offs(entries)
+    users = _load_users(entries)
+    for entry in entries:
+        if skip_reason:
+            _finish(entry, None, skip_reason)
+            continue
+
+        handler = handlers.get(entry.event)
+        if handler is None:
+            _finish(entry, None, f'Unknown event "{entry.event}"')
+            continue
+
+        if entry.event in USER_EVENTS:
+            subject = users.get(entry.payload.get('user_id'))
+            missing = 'Employee no longer exists'
+        else:
+            subject = time_offs.get(entry.payload.get('time_off_id'))
+            missing = 'Leave request no longer exists'
+        if subject is None:
+            _finish(entry, None, missing)
+            continue
+
+        try:
+            _finish(entry, handler(subject, entry.payload))
+        except Exception as e:
+            _finish(entry, False, str(e))
+
+
+def dispatch_email_batch(entries):
+    """Send a batch of queued emails over a single SMTP connection"""
+    from .notifications import EmailNotificationService
+    try:
+        passwords = _issue_passwords(entries)
+        with EmailNotificationService.batched_connection():
+            _deliver(entries, _email_handlers(passwords))
+    except Exception as e:
+        # Connection-level failure: every unfinished entry is retried
+        logger.error(f"Email batch failed: {str(e)}")
+        for entry in entries:
+            if entry.status == 'PROCESSING':
+                _finish(entry, False, str(e))
+
+
+def dispatch_whatsapp_batch(entries):
+    """Send a batch of queued WhatsApp messages with the pooled Twilio client"""
+    from .notifications import WhatsAppNotificationService
+    service = WhatsAppNotificationService()
+    skip_reason = None if service.enabled else 'Twilio credentials not configured'
+    _deliver(entries, _whatsapp_handlers(service), skip_reason)
+
+
+DISPATCHERS = {
+    'EMAIL': dispatch_email_batch,
+    'WHATSAPP': dispatch_whatsapp_batch,
+}
+
+
+def process_batch(channel, batch_size=50, worker_id=None):
+    """Claim and dispatch one batch; returns the number of entries handled"""
+    entries = claim_batch(channel, batch_size, worker_id)
+    if entries:
+        DISPATCHERS[channel](entries)
+    return len(entries)
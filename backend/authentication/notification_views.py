@@ -3,24 +3,78 @@ Notification Management Views
 Handles in-app notifications for users
 """
 
+import base64
+import hashlib
+from datetime import datetime
+
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
-from .models import Notification
-from .profile_serializers import NotificationSerializer
+from django.db.models import Q
+from django.utils import timezone
+from .models import Notification, NotificationCounter
+from .profile_serializers import NotificationSerializer, BroadcastNotificationSerializer
+from .notifications import InAppNotificationService
+from .permissions import IsAdminOrHR
+from .analytics_cache import normalize_params
+
+
+# Page size bounds for the notification feed
+FEED_DEFAULT_LIMIT = 50
+FEED_MAX_LIMIT = 100
+
+
+def encode_cursor(notification):
+    """Opaque keyset cursor for a notification's (created_at, id) position"""
+    raw = f'{notification.created_at.isoformat()}|{notification.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), int(pk)
 
 
 class MyNotificationsView(APIView):
-    """Get all notifications for current user"""
+    """
+    Keyset-paginated notification feed for current user.
+    Newest first; pass `cursor` (next_cursor) for older pages, or `since`
+    (latest_cursor) to fetch only rows created after the last poll.
+    Unchanged feeds return 304 when If-None-Match matches the ETag.
+    """
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
         # Get query parameters
         is_read = request.query_params.get('is_read')
         notification_type = request.query_params.get('type')
-        limit = request.query_params.get('limit', 50)
+        cursor = request.query_params.get('cursor')
+        since = request.query_params.get('since')
+        
+        try:
+            limit = min(max(int(request.query_params.get('limit', FEED_DEFAULT_LIMIT)), 1), FEED_MAX_LIMIT)
+            position = decode_cursor(cursor) if cursor else None
+            since_position = decode_cursor(since) if since else None
+        except ValueError:
+            return Response(
+                {'error': 'Invalid limit, cursor or since parameter'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Every create/read/delete bumps the counter, so it versions the whole feed
+        total_count, unread_count, updated_at = NotificationCounter.snapshot(request.user)
+        etag = '"{}"'.format(hashlib.sha1(
+            f'{request.user.pk}:{updated_at.isoformat()}:{total_count}:{unread_count}:'
+            f'{normalize_params(request.query_params)}'.encode()
+        ).hexdigest())
+        
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
         
         # Base query
         notifications = Notification.objects.filter(user=request.user)
@@ -33,19 +87,45 @@ class MyNotificationsView(APIView):
         if notification_type:
             notifications = notifications.filter(notification_type=notification_type.upper())
         
-        # Limit results
-        notifications = notifications[:int(limit)]
-        
-        # Get counts
-        total_count = Notification.objects.filter(user=request.user).count()
-        unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
-        
-        serializer = NotificationSerializer(notifications, many=True)
-        
-        return Response({
+        # Keyset window on (created_at, id), served by notif_user_created_idx
+        if position:
+            created_at, pk = position
+            notifications = notifications.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        if since_position:
+            created_at, pk = since_position
+            notifications = notifications.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            )
+        
+        page = list(notifications.order_by('-created_at', '-id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        
+        serializer = NotificationSerializer(page, many=True)
+        
+        response = Response({
             'total_count': total_count,
             'unread_count': unread_count,
-            'notifications': serializer.data
+            'notifications': serializer.data,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(page[-1]) if has_more else None,
+            'latest_cursor': encode_cursor(page[0]) if page else since
+        })
+        response['ETag'] = etag
+        return response
+
+
+class UnreadNotificationCountView(APIView):
+    """Lightweight badge count for polling clients"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        total_count, unread_count = NotificationCounter.counts_for(request.user)
+        return Response({
+            'total_count': total_count,
+            'unread_count': unread_count
         })
 
 
@@ -73,15 +153,13 @@ class MarkAllNotificationsReadView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        notifications = Notification.objects.filter(
+        # Single set-based UPDATE instead of a save() per row
+        count = Notification.objects.filter(
             user=request.user,
             is_read=False
-        )
-        
-        count = notifications.count()
+        ).update(is_read=True, read_at=timezone.now())
         
-        for notification in notifications:
-            notification.mark_as_read()
+        NotificationCounter.adjust(request.user.pk, unread=-count)
         
         return Response({
             'message': f'{count} notification(s) marked as read',
@@ -100,7 +178,11 @@ class DeleteNotificationView(APIView):
             user=request.user
         )
         
-        notification.delete()
+        # Conditional deletes keep the counter exact if the row is read concurrently
+        if Notification.objects.filter(pk=notification.pk, is_read=False).delete()[0]:
+            NotificationCounter.adjust(request.user.pk, unread=-1, total=-1)
+        elif Notification.objects.filter(pk=notification.pk).delete()[0]:
+            NotificationCounter.adjust(request.user.pk, total=-1)
         
         return Response({
             'message': 'Notification deleted successfully'
@@ -117,10 +199,38 @@ class ClearAllNotificationsView(APIView):
             is_read=True
         )
         
-        count = notifications.count()
-        notifications.delete()
+        count, _ = notifications.delete()
+        NotificationCounter.adjust(request.user.pk, total=-count)
         
         return Response({
             'message': f'{count} notification(s) cleared',
             'count': count
         }, status=status.HTTP_204_NO_CONTENT)
+
+
+class BroadcastNotificationView(APIView):
+    """Admin/HR announcement to the whole company or a role/department subset"""
+    permission_classes = [IsAuthenticated, IsAdminOrHR]
+    
+    def post(self, request):
+        serializer = BroadcastNotificationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        recipients = InAppNotificationService.recipients(
+            request.user.company,
+            roles=data['roles'],
+            departments=data['departments']
+        )
+        count = InAppNotificationService.fan_out(
+            recipients,
+            title=data['title'],
+            message=data['message'],
+            notification_type=data['notification_type'],
+            related_object_type='announcement'
+        )
+        
+        return Response({
+            'message': f'Announcement sent to {count} user(s)',
+            'count': count
+        }, status=status.HTTP_201_CREATED)
@@ -3,16 +3,25 @@ Notification System for HRMS
 Handles Email, WhatsApp, and In-app notifications
 """
 
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import send_mail, EmailMultiAlternatives, get_connection
 from django.conf import settings
+from django.db import transaction
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from twilio.rest import Client
 from decouple import config
+from contextlib import contextmanager
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Per-thread SMTP connection shared by emails sent inside batched_connection()
+_email_batch = threading.local()
+
+# Notification rows written per INSERT when fanning out to many recipients
+FAN_OUT_BATCH_SIZE = config('NOTIFICATION_FANOUT_BATCH_SIZE', default=1000, cast=int)
+
 
 # ============================================================================
 # EMAIL NOTIFICATIONS
@@ -22,10 +31,28 @@ class EmailNotificationService:
     """Service for sending email notifications"""
     
     @staticmethod
-    def send_welcome_email(user, temp_password):
-        """Send welcome email to newly created employee"""
+    @contextmanager
+    def batched_connection():
+        """Send every email issued in this block over a single SMTP connection"""
+        connection = get_connection()
+        connection.open()
+        _email_batch.connection = connection
+        try:
+            yield connection
+        finally:
+            _email_batch.connection = None
+            connection.close()
+    
+    @staticmethod
+    def send_welcome_email(user, temp_password=None):
+        """Send welcome email to newly created employee (without a password, the admin shares it)"""
         subject = f'Welcome to {user.company.name} - Dayflow HRMS'
         
+        if temp_password:
+            password_html = f"""<code style="background-color: #E5E7EB; padding: 5px 10px; border-radius: 4px; font-size: 14px;">{temp_password}</code>"""
+        else:
+            password_html = 'provided by your administrator'
+        
         html_content = f"""
         <html>
         <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
@@ -42,7 +69,7 @@ class EmailNotificationService:
                     <p style="margin: 5px 0;"><strong>Employee ID:</strong> {user.employee_id}</p>
                     <p style="margin: 5px 0;"><strong>Email:</strong> {user.email}</p>
                     <p style="margin: 5px 0;"><strong>Temporary Password:</strong> 
-                        <code style="background-color: #E5E7EB; padding: 5px 10px; border-radius: 4px; font-size: 14px;">{temp_password}</code>
+                        {password_html}
                     </p>
                 </div>
                 
@@ -302,7 +329,8 @@ class EmailNotificationService:
                 subject=subject,
                 body=plain_content,
                 from_email=settings.DEFAULT_FROM_EMAIL,
-                to=recipient_list
+                to=recipient_list,
+                connection=getattr(_email_batch, 'connection', None)
             )
             msg.attach_alternative(html_content, "text/html")
             msg.send()
@@ -320,6 +348,10 @@ class EmailNotificationService:
 class WhatsAppNotificationService:
     """Service for sending WhatsApp notifications via Twilio"""
     
+    # Twilio clients are reused across instances, keyed by credentials
+    _client_pool = {}
+    _client_pool_lock = threading.Lock()
+    
     def __init__(self):
         try:
             self.account_sid = config('TWILIO_ACCOUNT_SID', default='')
@@ -327,7 +359,7 @@ class WhatsAppNotificationService:
             self.whatsapp_from = config('TWILIO_WHATSAPP_NUMBER', default='')
             
             if self.account_sid and self.auth_token:
-                self.client = Client(self.account_sid, self.auth_token)
+                self.client = self._get_client(self.account_sid, self.auth_token)
                 self.enabled = True
             else:
                 self.enabled = False
@@ -336,6 +368,17 @@ class WhatsAppNotificationService:
             self.enabled = False
             logger.error(f"Failed to initialize Twilio client: {str(e)}")
     
+    @classmethod
+    def _get_client(cls, account_sid, auth_token):
+        """Return the pooled Twilio client for these credentials, creating it once"""
+        key = (account_sid, auth_token)
+        with cls._client_pool_lock:
+            client = cls._client_pool.get(key)
+            if client is None:
+                client = Client(account_sid, auth_token)
+                cls._client_pool[key] = client
+            return client
+    
     def send_leave_approval_whatsapp(self, time_off):
         """Send WhatsApp notification when leave is approved"""
         if not self.enabled:
@@ -454,7 +497,8 @@ class InAppNotificationService:
     @staticmethod
     def create_notification(user, title, message, notification_type='INFO', related_object_type=None, related_object_id=None):
         """Create an in-app notification for a user"""
-        from .models import Notification
+        from .models import Notification, NotificationCounter
+        from .realtime import publish_notifications
         
         try:
             notification = Notification.objects.create(
@@ -465,12 +509,83 @@ class InAppNotificationService:
                 related_object_type=related_object_type,
                 related_object_id=related_object_id
             )
+            publish_notifications([notification])
+            NotificationCounter.adjust(user.pk, unread=1, total=1)
             logger.info(f"In-app notification created: {notification.id} for {user.email}")
             return notification
         except Exception as e:
             logger.error(f"Failed to create notification for {user.email}: {str(e)}")
             return None
     
+    @staticmethod
+    def recipients(company, roles=None, departments=None):
+        """Users of a company, optionally narrowed by role and/or department"""
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        
+        queryset = User.objects.filter(company=company, is_active=True)
+        if roles:
+            queryset = queryset.filter(role__in=roles)
+        if departments:
+            queryset = queryset.filter(profile__department__in=departments)
+        return queryset
+    
+    @staticmethod
+    def fan_out(recipients, title, message, notification_type='INFO', related_object_type=None,
+                related_object_id=None, batch_size=None):
+        """
+        Create the same notification for many users with batched INSERTs.
+        `recipients` is a User queryset (or iterable of users / user ids).
+        All batches and counter updates commit together and are published only
+        after the commit, so a failure leaves nothing behind to duplicate on retry.
+        Returns the number of notifications created.
+        """
+        from .models import Notification, NotificationCounter
+        from .realtime import publish_notifications
+        
+        def flush(batch):
+            Notification.objects.bulk_create(batch)
+            publish_notifications(batch)
+            NotificationCounter.adjust([n.user_id for n in batch], unread=1, total=1)
+        
+        batch_size = batch_size or FAN_OUT_BATCH_SIZE
+        if not hasattr(recipients, 'values_list'):
+            from django.contrib.auth import get_user_model
+            recipients = get_user_model().objects.filter(
+                pk__in=[getattr(recipient, 'pk', recipient) for recipient in recipients]
+            )
+        rows = recipients.values_list('id', 'company_id').iterator(chunk_size=batch_size)
+        
+        created = 0
+        batch = []
+        try:
+            # publish_notifications/publish_counters defer to on_commit, so nothing is
+            # pushed to clients unless every batch commits
+            with transaction.atomic():
+                for user_id, company_id in rows:
+                    batch.append(Notification(
+                        user_id=user_id,
+                        company_id=company_id,
+                        title=title,
+                        message=message,
+                        notification_type=notification_type,
+                        related_object_type=related_object_type,
+                        related_object_id=related_object_id
+                    ))
+                    if len(batch) >= batch_size:
+                        flush(batch)
+                        created += len(batch)
+                        batch = []
+                if batch:
+                    flush(batch)
+                    created += len(batch)
+        except Exception as e:
+            logger.error(f"Notification fan-out '{title}' failed after {created} rows, rolled back: {str(e)}")
+            return 0
+        
+        logger.info(f"In-app notification '{title}' fanned out to {created} user(s)")
+        return created
+    
     @staticmethod
     def notify_leave_request_submitted(time_off):
         """Create notification for employee when leave is submitted"""
@@ -511,28 +626,19 @@ class InAppNotificationService:
     @staticmethod
     def notify_admin_new_leave_request(time_off):
         """Notify all admins/HR about new leave request"""
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        admins = User.objects.filter(
-            company=time_off.user.company,
-            role__in=['ADMIN', 'HR']
+        admins = InAppNotificationService.recipients(
+            time_off.user.company,
+            roles=['ADMIN', 'HR']
         )
         
-        notifications = []
-        for admin in admins:
-            notification = InAppNotificationService.create_notification(
-                user=admin,
-                title=f'New Leave Request from {time_off.user.get_full_name()}',
-                message=f'{time_off.user.get_full_name()} has requested {time_off.get_time_off_type_display()} for {time_off.total_days} day(s) from {time_off.start_date} to {time_off.end_date}.',
-                notification_type='WARNING',
-                related_object_type='leave',
-                related_object_id=time_off.id
-            )
-            if notification:
-                notifications.append(notification)
-        
-        return notifications
+        return InAppNotificationService.fan_out(
+            admins,
+            title=f'New Leave Request from {time_off.user.get_full_name()}',
+            message=f'{time_off.user.get_full_name()} has requested {time_off.get_time_off_type_display()} for {time_off.total_days} day(s) from {time_off.start_date} to {time_off.end_date}.',
+            notification_type='WARNING',
+            related_object_type='leave',
+            related_object_id=time_off.id
+        )
     
     @staticmethod
     def notify_attendance_milestone(user, days_count):
@@ -0,0 +1,298 @@
+"""
+Attendance Partitioning & Archival
+Monthly range partitions for the attendance table on PostgreSQL, plus archival
+of closed years to compressed files or archive tables (the portable fallback
+for SQLite). Daily rollups are kept, so dashboards still cover archived years;
+each company records its last archived day so later rebuilds leave them alone.
+"""
+
+import csv
+import gzip
+import logging
+from datetime import date
+from pathlib import Path
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .date_ranges import year_bounds
+from .models import Company, Attendance
+
+logger = logging.getLogger(__name__)
+
+
+TABLE = Attendance._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+# Rows fetched per round trip while exporting an archive
+EXPORT_CHUNK_SIZE = 5000
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(first_day):
+    return f'{TABLE}_p{first_day.year}_{first_day.month:02d}'
+
+
+def supports_partitioning():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned():
+    """True when the attendance table is a PostgreSQL partitioned table"""
+    if not supports_partitioning():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+# ============================================================================
+# POSTGRESQL PARTITIONS
+# ============================================================================
+
+def _partition_exists(cursor, name):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    return cursor.fetchone()[0]
+
+
+def create_month_partition(cursor, first_day):
+    """
+    Create the partition for one month. Rows for that month already sitting in
+    the default partition are moved into it (PostgreSQL refuses to attach a
+    range that the default partition still holds).
+    """
+    name = partition_name(first_day)
+    if _partition_exists(cursor, name):
+        return False
+
+    quote = connection.ops.quote_name
+    bounds = [first_day, add_months(first_day, 1)]
+
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {quote(DEFAULT_PARTITION)} WHERE "date" >= %s AND "date" < %s)',
+        bounds
+    )
+    if cursor.fetchone()[0]:
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(DEFAULT_PARTITION)}")
+        cursor.execute(
+            f"CREATE TABLE {quote(name)} PARTITION OF {quote(TABLE)} FOR VALUES FROM (%s) TO (%s)",
+            bounds
+        )
+        cursor.execute(
+            f'INSERT INTO {quote(TABLE)} SELECT * FROM {quote(DEFAULT_PARTITION)} WHERE "date" >= %s AND "date" < %s',
+            bounds
+        )
+        cursor.execute(f'DELETE FROM {quote(DEFAULT_PARTITION)} WHERE "date" >= %s AND "date" < %s', bounds)
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} ATTACH PARTITION {quote(DEFAULT_PARTITION)} DEFAULT")
+    else:
+        cursor.execute(
+            f"CREATE TABLE {quote(name)} PARTITION OF {quote(TABLE)} FOR VALUES FROM (%s) TO (%s)",
+            bounds
+        )
+    return True
+
+
+def ensure_month_partitions(start, end):
+    """Create any missing monthly partitions covering start..end; returns the names created"""
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        current = month_start(start)
+        while current <= end:
+            if create_month_partition(cursor, current):
+                created.append(partition_name(current))
+            current = add_months(current, 1)
+    return created
+
+
+def drop_empty_partitions(start, end):
+    """Detach and drop the (already emptied) monthly partitions inside start..end"""
+    quote = connection.ops.quote_name
+    dropped = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        current = month_start(start)
+        while current <= end:
+            name = partition_name(current)
+            if _partition_exists(cursor, name):
+                cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {quote(name)})")
+                if not cursor.fetchone()[0]:
+                    cursor.execute(f"ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}")
+                    cursor.execute(f"DROP TABLE {quote(name)}")
+                    dropped.append(name)
+            current = add_months(current, 1)
+    return dropped
+
+
+# ============================================================================
+# ARCHIVAL
+# ============================================================================
+
+def _columns():
+    return [field.column for field in Attendance._meta.concrete_fields]
+
+
+def _year_rows(year):
+    start, end = year_bounds(year)
+    return Attendance.objects.filter(date__gte=start, date__lte=end).order_by('date', 'id').values_list(
+        *[field.attname for field in Attendance._meta.concrete_fields]
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _export_csv(year, path):
+    count = 0
+    with gzip.open(path, 'wt', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(_columns())
+        for row in _year_rows(year):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _arrow_type(field, pa):
+    internal = field.get_internal_type()
+    if internal == 'DateField':
+        return pa.date32()
+    if internal == 'TimeField':
+        return pa.time64('us')
+    if internal == 'DateTimeField':
+        return pa.timestamp('us', tz='UTC')
+    if internal == 'DecimalField':
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if internal == 'BooleanField':
+        return pa.bool_()
+    if internal in ('CharField', 'TextField'):
+        return pa.string()
+    return pa.int64()
+
+
+def _export_parquet(year, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet archives require the "pyarrow" package')
+
+    fields = Attendance._meta.concrete_fields
+    schema = pa.schema([(field.column, _arrow_type(field, pa)) for field in fields])
+
+    count = 0
+    chunk = []
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for row in _year_rows(year):
+            chunk.append(row)
+            if len(chunk) >= EXPORT_CHUNK_SIZE:
+                writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, r)) for r in chunk], schema))
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, r)) for r in chunk], schema))
+            count += len(chunk)
+    return count
+
+
+EXPORTERS = {
+    'csv': ('csv.gz', _export_csv),
+    'parquet': ('parquet', _export_parquet),
+}
+
+
+def _delete_year(year):
+    """
+    Remove a year's raw rows with a plain DELETE. Going through the ORM would
+    fire post_delete per row, and the rollup signal would then erase the very
+    rollups archival is meant to keep.
+    """
+    start, end = year_bounds(year)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(TABLE)} WHERE "date" >= %s AND "date" <= %s',
+            [start, end]
+        )
+        return cursor.rowcount
+
+
+def _company_ids(year):
+    start, end = year_bounds(year)
+    return list(
+        Attendance.objects.filter(date__gte=start, date__lte=end, company__isnull=False)
+        .values_list('company_id', flat=True).distinct()
+    )
+
+
+def _mark_archived(year, company_ids):
+    """Move the companies' archived-through day up to the end of the year"""
+    _, end = year_bounds(year)
+    Company.objects.filter(pk__in=company_ids).filter(
+        Q(attendance_archived_through__isnull=True) | Q(attendance_archived_through__lt=end)
+    ).update(attendance_archived_through=end)
+
+
+def _finish_archive(year, company_ids):
+    from .analytics_cache import invalidate_company
+
+    if is_partitioned():
+        drop_empty_partitions(*year_bounds(year))
+    for company_id in company_ids:
+        invalidate_company(company_id)
+
+
+def archive_year_to_file(year, directory, fmt='csv'):
+    """Export a closed year to a compressed file, then drop its raw rows; returns (path, rows)"""
+    from .rollups import rebuild_range
+
+    extension, exporter = EXPORTERS[fmt]
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{TABLE}_{year}.{extension}'
+
+    # Rollups must be complete before the raw rows go away
+    rebuild_range(*year_bounds(year))
+    company_ids = _company_ids(year)
+
+    exported = exporter(year, path)
+    with transaction.atomic():
+        deleted = _delete_year(year)
+        if deleted != exported:
+            raise RuntimeError(
+                f'Archive of {year} wrote {exported} rows but {deleted} matched for deletion; rolled back'
+            )
+        _mark_archived(year, company_ids)
+
+    _finish_archive(year, company_ids)
+    logger.info(f"Archived {exported} attendance rows for {year} to {path}")
+    return path, exported
+
+
+def archive_year_to_table(year):
+    """Move a closed year into its own archive table; returns (table, rows)"""
+    from .rollups import rebuild_range
+
+    quote = connection.ops.quote_name
+    archive_table = f'{TABLE}_archive_{year}'
+    start, end = year_bounds(year)
+
+    rebuild_range(start, end)
+    company_ids = _company_ids(year)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE {quote(archive_table)} AS SELECT * FROM {quote(TABLE)} WHERE "date" >= %s AND "date" <= %s',
+            [start, end]
+        )
+        cursor.execute(f"SELECT COUNT(*) FROM {quote(archive_table)}")
+        moved = cursor.fetchone()[0]
+        _delete_year(year)
+        _mark_archived(year, company_ids)
+
+    _finish_archive(year, company_ids)
+    logger.info(f"Moved {moved} attendance rows for {year} to {archive_table}")
+    return archive_table, moved
@@ -0,0 +1,70 @@
+"""
+Password Verification
+Login-path password checks that never rehash inline: outdated hashes are
+upgraded on a background thread so a login costs exactly one hash
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from django.db import connection
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+_rehash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_REHASH_WORKERS,
+    thread_name_prefix='password-rehash'
+)
+_pending_lock = threading.Lock()
+_pending_user_ids = set()
+
+
+def needs_upgrade(encoded):
+    """True when a stored hash was made with another hasher or a different cost"""
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def verify_password(user, raw_password):
+    """Check a password; on success, queue an upgrade of an outdated hash"""
+    encoded = user.password
+    if not raw_password or not encoded:
+        return False
+
+    # No setter: Django would otherwise rehash synchronously, doubling the login's cost
+    if not check_password(raw_password, encoded):
+        return False
+
+    if needs_upgrade(encoded):
+        schedule_rehash(user.pk, raw_password, encoded)
+    return True
+
+
+def schedule_rehash(user_id, raw_password, encoded):
+    with _pending_lock:
+        if user_id in _pending_user_ids:
+            return
+        _pending_user_ids.add(user_id)
+    _rehash_executor.submit(_rehash, user_id, raw_password, encoded)
+
+
+def _rehash(user_id, raw_password, encoded):
+    try:
+        # Conditional on the old hash so a password changed meanwhile is never overwritten
+        User.objects.filter(pk=user_id, password=encoded).update(password=make_password(raw_password))
+    except Exception:
+        logger.exception(f"Background password rehash failed for user {user_id}")
+    finally:
+        with _pending_lock:
+            _pending_user_ids.discard(user_id)
+        connection.close()
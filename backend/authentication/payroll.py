@@ -0,0 +1,272 @@
+"""
+Payroll Runs
+Persists monthly Payslip snapshots computed by PayrollEngine and keeps open
+months current by recomputing only the payslips marked dirty
+"""
+
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+
+from decouple import config
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .analytics_cache import invalidate_company
+from .analytics_engine import PayrollEngine
+from .date_ranges import month_bounds
+from .models import EmployeeProfile, PayrollRun, Payslip
+
+logger = logging.getLogger(__name__)
+
+
+# Employees computed and written per chunk of a payroll run
+RUN_CHUNK_SIZE = config('PAYROLL_CHUNK_SIZE', default=1000, cast=int)
+
+# Chunks computed concurrently by a payroll run
+RUN_WORKERS = config('PAYROLL_WORKERS', default=4, cast=int)
+
+CENT = Decimal('0.01')
+
+SNAPSHOT_FIELDS = [
+    'department', 'job_title', 'present_days', 'half_days', 'leave_days', 'working_days',
+    'monthly_wage', 'basic_salary', 'hra', 'allowances', 'gross_salary', 'earned_basic',
+    'earned_hra', 'earned_allowances', 'professional_tax', 'pf_employee', 'total_deductions',
+    'net_salary'
+]
+
+
+# ============================================================================
+# COMPUTATION
+# ============================================================================
+
+def _payroll_user_ids(run):
+    """Employees the run pays: active users of the company with a profile"""
+    return set(
+        EmployeeProfile.objects.filter(
+            user__company_id=run.company_id,
+            user__is_active=True
+        ).values_list('user_id', flat=True)
+    )
+
+
+def compute_payslips(run, user_ids):
+    """
+    Compute and upsert the payslips of the given users; returns the number written.
+    A payslip marked dirty while it was being computed stays dirty.
+    """
+    versions = dict(run.payslips.filter(user_id__in=user_ids).values_list('user_id', 'dirty_version'))
+    engine = PayrollEngine(run.company, *month_bounds(run.year, run.month), user_ids=user_ids).compute()
+    now = timezone.now()
+    payslips = [
+        Payslip(
+            run=run,
+            user_id=line['user_id'],
+            is_dirty=False,
+            computed_at=now,
+            **{field: line[field] for field in SNAPSHOT_FIELDS}
+        )
+        for line in engine.rows()
+    ]
+    Payslip.objects.bulk_create(
+        payslips,
+        update_conflicts=True,
+        unique_fields=['run', 'user'],
+        update_fields=[*SNAPSHOT_FIELDS, 'is_dirty', 'computed_at']
+    )
+
+    # mark_dirty calls that landed after the versions were read computed from older data
+    changed = [
+        user_id
+        for user_id, version in run.payslips.filter(user_id__in=user_ids).values_list('user_id', 'dirty_version')
+        if version != versions.get(user_id, 0)
+    ]
+    if changed:
+        run.payslips.filter(user_id__in=changed).update(is_dirty=True)
+    return len(payslips)
+
+
+def _compute_chunk(run, user_ids):
+    # Worker threads open their own connection; release it when the chunk is done
+    try:
+        return compute_payslips(run, user_ids)
+    finally:
+        connection.close()
+
+
+def generate_run(run, workers=RUN_WORKERS, chunk_size=RUN_CHUNK_SIZE):
+    """(Re)compute every payslip of a run in parallel chunks; returns the number written"""
+    user_ids = sorted(_payroll_user_ids(run))
+    company = run.company  # loaded once here rather than racing in each worker
+    run.payslips.exclude(user_id__in=user_ids).delete()
+
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    if workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            written = sum(executor.map(lambda chunk: _compute_chunk(run, chunk), chunks))
+        logger.debug(f"Computed {len(chunks)} chunk(s) of {company} payroll with {workers} worker(s)")
+    else:
+        written = sum(compute_payslips(run, chunk) for chunk in chunks)
+
+    run.generated_at = timezone.now()
+    run.save(update_fields=['generated_at'])
+    invalidate_company(run.company_id)
+    logger.info(f"Generated {written} payslip(s) for {run}")
+    return written
+
+
+def refresh_run(run):
+    """
+    Bring an open run up to date: recompute dirty payslips, add employees who
+    joined the payroll and drop those who left. Returns the number recomputed.
+    """
+    if not run.is_open:
+        return 0
+
+    payroll_ids = _payroll_user_ids(run)
+    existing = dict(run.payslips.values_list('user_id', 'is_dirty'))
+
+    stale = set(existing) - payroll_ids
+    if stale:
+        run.payslips.filter(user_id__in=stale).delete()
+
+    # Dirty payslips plus employees with no payslip yet
+    pending = sorted(user_id for user_id in payroll_ids if existing.get(user_id, True))
+    if not pending and not stale:
+        return 0
+
+    recomputed = sum(
+        compute_payslips(run, pending[i:i + RUN_CHUNK_SIZE])
+        for i in range(0, len(pending), RUN_CHUNK_SIZE)
+    )
+    invalidate_company(run.company_id)
+    return recomputed
+
+
+def report_run(company, year, month):
+    """
+    The month's generated run, refreshed while open; None when payroll has not
+    been run for the month. Runs are only created by run_payroll, never by reads.
+    """
+    run = PayrollRun.objects.filter(
+        company=company, year=year, month=month, generated_at__isnull=False
+    ).first()
+    if run is not None:
+        refresh_run(run)
+    return run
+
+
+def close_run(run):
+    """Freeze a run after a final refresh; its payslips no longer follow source changes"""
+    with transaction.atomic():
+        refresh_run(run)
+        run.status = 'CLOSED'
+        run.closed_at = timezone.now()
+        run.save(update_fields=['status', 'closed_at'])
+    invalidate_company(run.company_id)
+
+
+# ============================================================================
+# INVALIDATION
+# ============================================================================
+
+def mark_dirty(user_id, day=None):
+    """
+    Flag a user's payslips in open runs for recomputation; limited to the run
+    for `day`'s month when given. A single UPDATE, a no-op when no run exists.
+    Already dirty payslips are bumped too, in case a recompute is under way.
+    """
+    payslips = Payslip.objects.filter(user_id=user_id, run__status='OPEN')
+    if day is not None:
+        payslips = payslips.filter(run__year=day.year, run__month=day.month)
+    return payslips.update(is_dirty=True, dirty_version=F('dirty_version') + 1)
+
+
+def mark_dirty_many(user_days):
+    """mark_dirty for many (user_id, day) pairs, e.g. after bulk attendance writes: one UPDATE per month"""
+    months = defaultdict(set)
+    for user_id, day in user_days:
+        months[(day.year, day.month)].add(user_id)
+    return sum(
+        Payslip.objects.filter(
+            user_id__in=user_ids, run__status='OPEN', run__year=year, run__month=month
+        ).update(is_dirty=True, dirty_version=F('dirty_version') + 1)
+        for (year, month), user_ids in months.items()
+    )
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def _summary(count, total_payout, distribution, departments):
+    return {
+        'summary': {
+            'total_payout': total_payout,
+            'avg_salary': (total_payout / count).quantize(CENT, ROUND_HALF_UP) if count else Decimal('0'),
+            'processed_count': count
+        },
+        'distribution': distribution,
+        'department_payroll': departments
+    }
+
+
+def run_summary(run):
+    """Totals, distribution and department breakdown aggregated from the snapshots"""
+    totals = run.payslips.aggregate(
+        count=Count('id'),
+        total_payout=Sum('gross_salary'),
+        basic_salary=Sum('earned_basic'),
+        hra=Sum('earned_hra'),
+        allowances=Sum('earned_allowances'),
+        deductions=Sum('total_deductions')
+    )
+
+    departments = run.payslips.values('department').annotate(
+        total=Sum('gross_salary'),
+        count=Count('id')
+    ).order_by('department')
+
+    return _summary(
+        totals['count'],
+        totals['total_payout'] or Decimal('0'),
+        {
+            'basic_salary': totals['basic_salary'] or Decimal('0'),
+            'hra': totals['hra'] or Decimal('0'),
+            'allowances': totals['allowances'] or Decimal('0'),
+            'deductions': totals['deductions'] or Decimal('0')
+        },
+        {
+            row['department'] or 'Unknown': {'total': row['total'], 'count': row['count']}
+            for row in departments
+        }
+    )
+
+
+def transient_lines(company, year, month):
+    """Payroll lines for a month without a run: computed on the fly, nothing saved"""
+    return list(PayrollEngine(company, *month_bounds(year, month)).compute().rows())
+
+
+def lines_summary(lines):
+    """run_summary() for payroll lines that were not saved"""
+    departments = {}
+    for line in sorted(lines, key=lambda line: line['department'] or ''):
+        totals = departments.setdefault(line['department'] or 'Unknown', {'total': Decimal('0'), 'count': 0})
+        totals['total'] += line['gross_salary']
+        totals['count'] += 1
+
+    return _summary(
+        len(lines),
+        sum((line['gross_salary'] for line in lines), Decimal('0')),
+        {
+            key: sum((line[field] for line in lines), Decimal('0'))
+            for key, field in (
+                ('basic_salary', 'earned_basic'), ('hra', 'earned_hra'),
+                ('allowances', 'earned_allowances'), ('deductions', 'total_deductions')
+            )
+        },
+        departments
+    )
@@ -0,0 +1,335 @@
+"""
+Presence Board
+Who is in today, per company, held in a store instead of recomputed on every
+dashboard load: one set of user ids per status plus running counters, so
+reading the split is O(1) and a board's size follows the company's headcount
+(not the largest user id). Attendance and leave changes move a user between
+sets atomically; a missing board is rebuilt from Attendance and TimeOff.
+
+The local store lives in one process (entries expire after PRESENCE_LOCAL_TTL
+so other processes' writes show up); the redis store (any Redis-compatible
+server) is shared by every process.
+"""
+
+import threading
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import User, Attendance, TimeOff
+
+
+# Statuses with a member set; everyone else active is ABSENT
+BOARD_STATUSES = ('PRESENT', 'HALF_DAY', 'LEAVE')
+
+# Redis boards outlive their day long enough for late dashboards, then expire
+REDIS_BOARD_TTL = 36 * 3600
+
+
+# ============================================================================
+# LOCAL (IN-PROCESS) STORE
+# ============================================================================
+
+class LocalBoard:
+    def __init__(self, statuses, total):
+        self.total = total
+        self.members = {
+            status: {user_id for user_id, value in statuses.items() if value == status}
+            for status in BOARD_STATUSES
+        }
+
+
+class LocalPresenceStore:
+    """
+    Boards as Python sets behind a lock. Every status change bumps a
+    per-board sequence, so a rebuild that raced with a change is discarded.
+    """
+
+    def __init__(self, url=None):
+        self.ttl = settings.PRESENCE_LOCAL_TTL
+        self._boards = {}
+        self._sequences = {}
+        self._lock = threading.Lock()
+
+    def _board(self, key):
+        entry = self._boards.get(key)
+        if entry is None:
+            return None
+        expires_at, board = entry
+        if expires_at < time.monotonic():
+            del self._boards[key]
+            return None
+        return board
+
+    def sequence(self, company_id, day):
+        with self._lock:
+            return self._sequences.get((company_id, day), 0)
+
+    def counts(self, company_id, day):
+        with self._lock:
+            board = self._board((company_id, day))
+            if board is None:
+                return None
+            return {'total': board.total, **{status: len(members) for status, members in board.members.items()}}
+
+    def members(self, company_id, day, status):
+        with self._lock:
+            board = self._board((company_id, day))
+            if board is None:
+                return None
+            return sorted(board.members[status])
+
+    def put(self, company_id, day, statuses, total, sequence):
+        key = (company_id, day)
+        with self._lock:
+            if self._sequences.get(key, 0) != sequence:
+                return False
+            self._boards[key] = (time.monotonic() + self.ttl, LocalBoard(statuses, total))
+            return True
+
+    def set_status(self, company_id, day, user_id, status):
+        key = (company_id, day)
+        with self._lock:
+            self._sequences[key] = self._sequences.get(key, 0) + 1
+            board = self._board(key)
+            if board is None:
+                return
+            for board_status, members in board.members.items():
+                if board_status == status:
+                    members.add(user_id)
+                else:
+                    members.discard(user_id)
+
+    def drop(self, company_id, day):
+        key = (company_id, day)
+        with self._lock:
+            self._sequences[key] = self._sequences.get(key, 0) + 1
+            self._boards.pop(key, None)
+
+
+# ============================================================================
+# REDIS STORE
+# ============================================================================
+
+# KEYS: sequence, counts hash, one member set per status. ARGV: user id, new status (or '').
+# Statuses come after in ARGV[3..] in the same order as the set keys.
+SET_STATUS_SCRIPT = """
+redis.call('INCR', KEYS[1])
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return 0
+end
+for index = 3, #KEYS do
+    local status = ARGV[index]
+    if status == ARGV[2] then
+        if redis.call('SADD', KEYS[index], ARGV[1]) == 1 then
+            redis.call('HINCRBY', KEYS[2], status, 1)
+            -- A set that was empty at put() is created here; let it expire with the board
+            if redis.call('TTL', KEYS[index]) < 0 then
+                redis.call('EXPIRE', KEYS[index], redis.call('TTL', KEYS[2]))
+            end
+        end
+    elseif redis.call('SREM', KEYS[index], ARGV[1]) == 1 then
+        redis.call('HINCRBY', KEYS[2], status, -1)
+    end
+end
+return 1
+"""
+
+
+class RedisPresenceStore:
+    """Boards as Redis sets of user ids with a counts hash, changed by one Lua script"""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('PRESENCE_STORE=redis requires the "redis" package')
+        self._client = redis.Redis.from_url(url)
+        self._set_status = self._client.register_script(SET_STATUS_SCRIPT)
+        self._watch_error = redis.WatchError
+
+    @staticmethod
+    def _keys(company_id, day):
+        prefix = f'presence:{company_id}:{day.isoformat()}'
+        return f'{prefix}:seq', f'{prefix}:counts', [f'{prefix}:{status}' for status in BOARD_STATUSES]
+
+    def sequence(self, company_id, day):
+        sequence_key, _, _ = self._keys(company_id, day)
+        return int(self._client.get(sequence_key) or 0)
+
+    def counts(self, company_id, day):
+        _, counts_key, _ = self._keys(company_id, day)
+        counts = self._client.hgetall(counts_key)
+        if not counts:
+            return None
+        return {key.decode(): int(value) for key, value in counts.items()}
+
+    def members(self, company_id, day, status):
+        _, counts_key, set_keys = self._keys(company_id, day)
+        with self._client.pipeline() as pipe:
+            pipe.exists(counts_key)
+            pipe.smembers(set_keys[BOARD_STATUSES.index(status)])
+            exists, members = pipe.execute()
+        if not exists:
+            return None
+        return sorted(int(member) for member in members)
+
+    def put(self, company_id, day, statuses, total, sequence):
+        sequence_key, counts_key, set_keys = self._keys(company_id, day)
+        members = {
+            status: [user_id for user_id, value in statuses.items() if value == status]
+            for status in BOARD_STATUSES
+        }
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(sequence_key)
+                if int(pipe.get(sequence_key) or 0) != sequence:
+                    return False
+                pipe.multi()
+                pipe.delete(counts_key, *set_keys)
+                for key, status in zip(set_keys, BOARD_STATUSES):
+                    if members[status]:
+                        pipe.sadd(key, *members[status])
+                pipe.hset(counts_key, mapping={
+                    'total': total, **{status: len(user_ids) for status, user_ids in members.items()}
+                })
+                for key in (counts_key, *set_keys):
+                    pipe.expire(key, REDIS_BOARD_TTL)
+                pipe.execute()
+                return True
+            except self._watch_error:
+                return False
+
+    def set_status(self, company_id, day, user_id, status):
+        sequence_key, counts_key, set_keys = self._keys(company_id, day)
+        self._set_status(
+            keys=[sequence_key, counts_key, *set_keys],
+            args=[user_id, status or '', *BOARD_STATUSES]
+        )
+
+    def drop(self, company_id, day):
+        sequence_key, counts_key, set_keys = self._keys(company_id, day)
+        with self._client.pipeline() as pipe:
+            pipe.incr(sequence_key)
+            pipe.expire(sequence_key, REDIS_BOARD_TTL)
+            pipe.delete(counts_key, *set_keys)
+            pipe.execute()
+
+
+STORES = {
+    'local': LocalPresenceStore,
+    'redis': RedisPresenceStore,
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide store chosen by PRESENCE_STORE (a name above or a dotted class path)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                name = settings.PRESENCE_STORE
+                store_class = STORES.get(name) or import_string(name)
+                _store = store_class(settings.PRESENCE_STORE_URL)
+    return _store
+
+
+# ============================================================================
+# BOARD
+# ============================================================================
+
+def _statuses(company_id, day, user_ids=None):
+    """
+    {user_id: status} for active employees on the board: their attendance
+    status, or LEAVE under an approved time-off request
+    """
+    users = User.objects.filter(company_id=company_id, is_active=True)
+    records = Attendance.objects.filter(company_id=company_id, date=day, status__in=BOARD_STATUSES)
+    leaves = TimeOff.objects.filter(
+        company_id=company_id, status='APPROVED', start_date__lte=day, end_date__gte=day
+    )
+    if user_ids is not None:
+        users, records, leaves = (
+            queryset.filter(**{lookup: user_ids})
+            for queryset, lookup in ((users, 'id__in'), (records, 'user_id__in'), (leaves, 'user_id__in'))
+        )
+
+    active = set(users.values_list('id', flat=True))
+    statuses = dict.fromkeys(leaves.values_list('user_id', flat=True), 'LEAVE')
+    # A check-in on a leave day counts as present
+    statuses.update(records.values_list('user_id', 'status'))
+    return {user_id: status for user_id, status in statuses.items() if user_id in active}, len(active)
+
+
+def _rebuild(company_id, day):
+    """Build a board from the database and store it unless a status changed meanwhile"""
+    store = get_store()
+    sequence = store.sequence(company_id, day)
+    statuses, total = _statuses(company_id, day)
+    store.put(company_id, day, statuses, total, sequence)
+    return statuses, total
+
+
+def presence_counts(company_id):
+    """Today's {'date', 'total', 'PRESENT', 'HALF_DAY', 'LEAVE', 'ABSENT'}; rebuilt from the database on a miss"""
+    day = date.today()
+    counts = get_store().counts(company_id, day)
+    if counts is None:
+        statuses, total = _rebuild(company_id, day)
+        counts = {'total': total, **{status: 0 for status in BOARD_STATUSES}}
+        for status in statuses.values():
+            counts[status] += 1
+    return {
+        'date': day.isoformat(),
+        'total': counts['total'],
+        **{status: counts[status] for status in BOARD_STATUSES},
+        'ABSENT': max(0, counts['total'] - sum(counts[status] for status in BOARD_STATUSES)),
+    }
+
+
+def presence_members(company_id, status):
+    """User ids with a board status today, lowest first"""
+    day = date.today()
+    members = get_store().members(company_id, day, status)
+    if members is None:
+        statuses, _ = _rebuild(company_id, day)
+        members = sorted(user_id for user_id, value in statuses.items() if value == status)
+    return members
+
+
+def record_status(company_id, day, user_id, status):
+    """Set one user's board status (None = absent) once the current transaction commits"""
+    # Only today's board is kept
+    if not company_id or day != date.today():
+        return
+    status = status if status in BOARD_STATUSES else None
+    transaction.on_commit(lambda: get_store().set_status(company_id, day, user_id, status))
+
+
+def refresh_users(company_id, day, user_ids):
+    """Re-derive some users' board statuses from the database, e.g. after bulk writes or leave changes"""
+    if not company_id or not user_ids or day != date.today():
+        return
+    user_ids = list(user_ids)
+    statuses, _ = _statuses(company_id, day, user_ids)
+
+    def apply():
+        store = get_store()
+        for user_id in user_ids:
+            store.set_status(company_id, day, user_id, statuses.get(user_id))
+    transaction.on_commit(apply)
+
+
+def forget_company(company_id):
+    """Drop a company's board (e.g. after headcount changes); the next read rebuilds it"""
+    if not company_id:
+        return
+    day = date.today()
+    transaction.on_commit(lambda: get_store().drop(company_id, day))
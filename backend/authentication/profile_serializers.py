@@ -190,6 +190,19 @@ class NotificationSerializer(serializers.ModelSerializer):
             return f"{weeks} week{'s' if weeks != 1 else ''} ago"
 
 
+class BroadcastNotificationSerializer(serializers.Serializer):
+    """Serializer for company-wide (or role/department-targeted) announcements"""
+    title = serializers.CharField(max_length=255)
+    message = serializers.CharField()
+    notification_type = serializers.ChoiceField(choices=Notification.TYPE_CHOICES, default='INFO')
+    roles = serializers.ListField(
+        child=serializers.ChoiceField(choices=User.ROLE_CHOICES), required=False, default=list
+    )
+    departments = serializers.ListField(
+        child=serializers.CharField(max_length=100), required=False, default=list
+    )
+
+
 class EmployeeDocumentSerializer(serializers.ModelSerializer):
     """Serializer for employee documents"""
     file_url = serializers.SerializerMethodField()
@@ -0,0 +1,182 @@
+"""
+Query Budgets
+Counts the SQL each request runs, groups repeated statements by template and
+points N+1 loops at the line that issued them. Views declare a `query_budget`;
+the middleware reports over Server-Timing and the log, and the test helpers
+fail a test that exceeds the budget or contains an N+1
+"""
+
+import logging
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import resolve
+
+logger = logging.getLogger(__name__)
+
+
+PROJECT_ROOT = str(settings.BASE_DIR)
+
+_IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)')
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more queries than its view allows, or repeated one in a loop"""
+
+
+def sql_template(sql):
+    """SQL with literals and IN-lists collapsed, so each loop iteration maps to the same template"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _origin():
+    """file:line of the innermost project frame outside this module"""
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (
+            filename.startswith(PROJECT_ROOT)
+            and filename != __file__
+            and 'site-packages' not in filename
+        ):
+            return f'{os.path.relpath(filename, PROJECT_ROOT)}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class QueryReport:
+    """Queries seen while recording; installed as a connection execute wrapper"""
+
+    def __init__(self, n_plus_one_threshold=None):
+        self.n_plus_one_threshold = n_plus_one_threshold or settings.QUERY_BUDGET_N_PLUS_ONE_THRESHOLD
+        self.count = 0
+        self.duration = 0.0
+        self.templates = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            template = sql_template(sql)
+            self.templates[template] += 1
+            # The stack is only walked once a template starts repeating
+            if self.templates[template] == 2:
+                self.origins[template] = _origin()
+
+    def repeated(self):
+        """[(template, count, origin)] for templates run at least the N+1 threshold times"""
+        return [
+            (template, count, self.origins.get(template, 'unknown'))
+            for template, count in self.templates.most_common()
+            if count >= self.n_plus_one_threshold
+        ]
+
+    def problems(self, budget):
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f'{self.count} queries exceed the budget of {budget}')
+        for template, count, origin in self.repeated():
+            problems.append(f'N+1: {count}x at {origin}: {template[:200]}')
+        return problems
+
+
+@contextmanager
+def record_queries(n_plus_one_threshold=None):
+    """Record every query run on any database connection inside the block"""
+    report = QueryReport(n_plus_one_threshold)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(report))
+        yield report
+
+
+def view_query_budget(view):
+    """Query budget declared by a view function or class (falls back to QUERY_BUDGET_DEFAULT)"""
+    view_class = getattr(view, 'view_class', None) or getattr(view, 'cls', None) or view
+    return getattr(view_class, 'query_budget', settings.QUERY_BUDGET_DEFAULT)
+
+
+def _view_name(view):
+    view_class = getattr(view, 'view_class', None) or getattr(view, 'cls', None) or view
+    return f'{view_class.__module__}.{view_class.__qualname__}'
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+class QueryBudgetMiddleware:
+    """
+    Adds a Server-Timing header (db time and query count, total app time) and
+    logs requests that exceed their view's budget or repeat a query template.
+    With QUERY_BUDGET_STRICT the request fails instead.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with record_queries() as report:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        response['Server-Timing'] = (
+            f'db;dur={report.duration * 1000:.1f};desc="{report.count} queries", '
+            f'app;dur={elapsed * 1000:.1f}'
+        )
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+
+        problems = report.problems(view_query_budget(match.func))
+        if problems:
+            message = f'{request.method} {request.path} ({_view_name(match.func)}): ' + '; '.join(problems)
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+# ============================================================================
+# TEST HELPERS
+# ============================================================================
+
+@contextmanager
+def query_budget(max_queries, n_plus_one_threshold=None, label='block'):
+    """Fail with AssertionError when the block exceeds max_queries or contains an N+1"""
+    with record_queries(n_plus_one_threshold) as report:
+        yield report
+    problems = report.problems(max_queries)
+    if problems:
+        raise AssertionError(f'{label}: ' + '\n  '.join(problems))
+
+
+class QueryBudgetTestMixin:
+    """
+    For APITestCase/TestCase subclasses: request an endpoint and assert it
+    stays within the query budget declared on its view.
+    """
+
+    def assertWithinQueryBudget(self, method, path, *args, **kwargs):
+        view = resolve(path.split('?')[0]).func
+        with query_budget(view_query_budget(view), label=f'{method.upper()} {path} ({_view_name(view)})'):
+            return getattr(self.client, method.lower())(path, *args, **kwargs)
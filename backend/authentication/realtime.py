@@ -0,0 +1,241 @@
+"""
+Real-time Push
+Pub/sub brokers that carry notification and dashboard events to the SSE stream.
+The local broker works within a single ASGI process; the redis broker (any
+Redis-compatible server) is needed when publishers and streams run in
+different processes.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# Events buffered per subscriber; slower clients drop the overflow and resync
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def company_channel(company_id):
+    return f'company:{company_id}'
+
+
+# ============================================================================
+# LOCAL (IN-PROCESS) BROKER
+# ============================================================================
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        logger.warning("Real-time subscriber queue full, dropping event")
+
+
+class LocalSubscription:
+    """Subscription backed by an asyncio queue on the subscriber's event loop"""
+    
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    
+    async def get(self, timeout=None):
+        """Next message, or None if nothing arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+    
+    async def close(self):
+        self.broker._remove(self)
+
+
+class LocalBroker:
+    """In-process broker; publishing is thread-safe and never blocks on subscribers"""
+    
+    def __init__(self, url=None):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+    
+    def wants(self, channel):
+        return bool(self._subscribers.get(channel))
+    
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(_offer, subscription.queue, message)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self._remove(subscription)
+    
+    async def subscribe(self, channels):
+        subscription = LocalSubscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+    
+    def _remove(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].discard(subscription)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+# ============================================================================
+# REDIS PUB/SUB BROKER
+# ============================================================================
+
+class RedisSubscription:
+    """Subscription backed by a Redis PUBSUB connection"""
+    
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+    
+    async def get(self, timeout=None):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+    
+    async def close(self):
+        await self.pubsub.reset()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """Cross-process broker over Redis PUBLISH/SUBSCRIBE"""
+    
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('REALTIME_BROKER=redis requires the "redis" package')
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+    
+    def wants(self, channel):
+        # Subscribers may live in other processes
+        return True
+    
+    def publish(self, channel, message):
+        self._client.publish(channel, json.dumps(message, default=str))
+    
+    async def subscribe(self, channels):
+        import redis.asyncio
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(*channels)
+        return RedisSubscription(client, pubsub)
+
+
+BROKERS = {
+    'local': LocalBroker,
+    'redis': RedisBroker,
+}
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Process-wide broker chosen by REALTIME_BROKER (a name above or a dotted class path)"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                name = settings.REALTIME_BROKER
+                broker_class = BROKERS.get(name) or import_string(name)
+                _broker = broker_class(settings.REALTIME_BROKER_URL)
+    return _broker
+
+
+# ============================================================================
+# PUBLISHING
+# ============================================================================
+
+def publish(channel, event, data):
+    """Publish an event once the current transaction (if any) commits"""
+    broker = get_broker()
+    if not broker.wants(channel):
+        return
+
+    message = {'event': event, 'data': data}
+
+    def send():
+        try:
+            broker.publish(channel, message)
+        except Exception as e:
+            logger.error(f"Failed to publish {event} on {channel}: {str(e)}")
+
+    transaction.on_commit(send)
+
+
+def notification_payload(notification):
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'related_object_type': notification.related_object_type,
+        'related_object_id': notification.related_object_id,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+def publish_notifications(notifications):
+    for notification in notifications:
+        publish(user_channel(notification.user_id), 'notification', notification_payload(notification))
+
+
+def publish_counters(user_ids):
+    """Push fresh unread/total counts to any connected clients of these users"""
+    from .models import NotificationCounter
+
+    broker = get_broker()
+    user_ids = [user_id for user_id in user_ids if broker.wants(user_channel(user_id))]
+    if not user_ids:
+        return
+
+    counters = NotificationCounter.objects.filter(user_id__in=user_ids).values_list(
+        'user_id', 'total_count', 'unread_count'
+    )
+    for user_id, total_count, unread_count in counters:
+        publish(user_channel(user_id), 'counters', {
+            'total_count': total_count,
+            'unread_count': unread_count,
+        })
+
+
+def publish_attendance_day(company_id, day):
+    """Push a company's attendance totals for a day to connected dashboards"""
+    from .models import DailyAttendanceRollup
+
+    if not company_id or not get_broker().wants(company_channel(company_id)):
+        return
+
+    rollup = DailyAttendanceRollup.objects.filter(company_id=company_id, date=day).first()
+    publish(company_channel(company_id), 'attendance', {
+        'date': day.isoformat(),
+        'present': rollup.present_count if rollup else 0,
+        'absent': rollup.absent_count if rollup else 0,
+        'half_day': rollup.half_day_count if rollup else 0,
+        'leave': rollup.leave_count if rollup else 0,
+    })
@@ -0,0 +1,106 @@
+"""
+Real-time Stream Views
+Server-Sent Events endpoint for notification and dashboard updates
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import NotificationCounter, StreamTicket
+from .realtime import get_broker, user_channel, company_channel
+
+
+# Comment line sent when idle so proxies keep the connection open
+HEARTBEAT_SECONDS = 15
+
+# Client reconnect delay suggested to EventSource, in milliseconds
+RECONNECT_MS = 3000
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+class StreamTicketView(APIView):
+    """
+    POST /api/auth/notifications/stream/ticket
+    Single-use ticket, valid for StreamTicket.TTL seconds, for opening the
+    stream as ?ticket=. Clients request a new one before every (re)connect.
+    """
+    
+    def post(self, request):
+        ticket = StreamTicket.issue(request.user)
+        return Response({'ticket': ticket, 'expires_in': StreamTicket.TTL}, status=status.HTTP_201_CREATED)
+
+
+class NotificationStreamView(View):
+    """
+    Push stream of `notification`, `counters` and `attendance` events.
+    EventSource cannot send headers, so browsers authenticate with a ticket
+    from StreamTicketView as ?ticket=; access tokens are only accepted in the
+    Authorization header, keeping them out of URLs and logs. After a reconnect,
+    clients catch up with the feed's `since` cursor.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {'error': 'The notification stream requires an ASGI server (dayflow.asgi)'},
+                status=501
+            )
+
+        user = await self._authenticate(request)
+        if user is None:
+            return JsonResponse({'error': 'Authentication credentials were not provided or are invalid'}, status=401)
+
+        channels = [user_channel(user.pk)]
+        if user.company_id:
+            channels.append(company_channel(user.company_id))
+
+        total_count, unread_count = await sync_to_async(NotificationCounter.counts_for)(user)
+        subscription = await get_broker().subscribe(channels)
+
+        async def stream():
+            try:
+                yield f'retry: {RECONNECT_MS}\n\n'
+                yield format_event('counters', {'total_count': total_count, 'unread_count': unread_count})
+                while True:
+                    message = await subscription.get(timeout=HEARTBEAT_SECONDS)
+                    if message is None:
+                        yield ': keepalive\n\n'
+                    else:
+                        yield format_event(message['event'], message['data'])
+            finally:
+                await subscription.close()
+
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def _authenticate(self, request):
+        authenticator = JWTAuthentication()
+        header = authenticator.get_header(request)
+        if not header:
+            ticket = request.GET.get('ticket')
+            return await sync_to_async(StreamTicket.redeem)(ticket) if ticket else None
+
+        raw_token = authenticator.get_raw_token(header)
+        if not raw_token:
+            return None
+
+        try:
+            validated_token = authenticator.get_validated_token(raw_token)
+            user = await sync_to_async(authenticator.get_user)(validated_token)
+        except AuthenticationFailed:
+            return None
+        return user
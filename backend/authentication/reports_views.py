@@ -3,20 +3,44 @@ Enhanced Reporting APIs for HRMS with real-time analytics
 """
 import csv
 from io import StringIO
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Count, Sum, Avg, Q, F
 from datetime import date, datetime, timedelta
+from decimal import Decimal
 from collections import defaultdict
 from .models import User, EmployeeProfile, Attendance, TimeOff, LeaveAllocation
 from .profile_serializers import AttendanceSerializer
 from .permissions import IsAdmin
+from .rollups import rollup_summary, rollup_trend
+from .payroll import report_run, run_summary, transient_lines, lines_summary
+from .date_ranges import month_bounds, month_from_params, year_bounds
 import calendar
 
 
+# Rows fetched per database round-trip while streaming CSV exports
+CSV_CHUNK_SIZE = 2000
+
+# Payslip columns of the payroll CSV, after the employee columns
+PAYSLIP_CSV_FIELDS = (
+    'department', 'job_title', 'present_days', 'half_days', 'leave_days',
+    'working_days', 'monthly_wage', 'gross_salary', 'basic_salary', 'hra',
+    'allowances', 'professional_tax', 'pf_employee', 'total_deductions', 'net_salary'
+)
+
+
+def report_month(params):
+    """(year, month) from query params, defaulting to the current month; ValueError when invalid or in the future"""
+    today = date.today()
+    year, month = month_from_params(params)
+    if (year, month) > (today.year, today.month):
+        raise ValueError('Payroll reports cover past and current months only')
+    return year, month
+
+
 class AttendanceReportView(APIView):
     """Generate comprehensive attendance reports with real-time analytics"""
     permission_classes = [IsAuthenticated, IsAdmin]
@@ -30,37 +54,41 @@ class AttendanceReportView(APIView):
         last_day = calendar.monthrange(year, month)[1]
         end_date = date(year, month, last_day)
         
+        company = request.user.company
+        
         # Get all employees
-        all_employees = User.objects.filter(is_active=True).select_related('profile')
+        all_employees = User.objects.filter(company=company, is_active=True).select_related('profile')
         total_employees = all_employees.count()
         
         # Get attendance records for the month
         attendance_records = Attendance.objects.filter(
+            company=company,
             date__gte=start_date,
             date__lte=end_date
         ).select_related('user', 'user__profile')
         
-        # Calculate summary statistics
-        present_count = attendance_records.filter(status='PRESENT').count()
-        absent_count = attendance_records.filter(status='ABSENT').count()
-        leave_count = attendance_records.filter(status='LEAVE').count()
-        half_day_count = attendance_records.filter(status='HALF_DAY').count()
-        
-        avg_work_hours = attendance_records.aggregate(
-            avg=Avg('work_hours')
-        )['avg'] or 0
+        # Calculate summary statistics from the daily rollups
+        month_summary = rollup_summary(company, start_date, end_date)
+        present_count = month_summary['present']
+        absent_count = month_summary['absent']
+        leave_count = month_summary['leave']
+        half_day_count = month_summary['half_day']
+        avg_work_hours = month_summary['avg_work_hours'] or 0
         
         # Daily trend data
+        rollups_by_date = {
+            item['date']: item for item in rollup_trend(company, start_date, end_date)
+        }
         daily_trend = []
         current_date = start_date
         while current_date <= min(end_date, date.today()):
-            day_records = attendance_records.filter(date=current_date)
+            day = rollups_by_date.get(current_date, {})
             daily_trend.append({
                 'date': current_date.isoformat(),
-                'present': day_records.filter(status='PRESENT').count(),
-                'absent': day_records.filter(status='ABSENT').count(),
-                'leave': day_records.filter(status='LEAVE').count(),
-                'half_day': day_records.filter(status='HALF_DAY').count()
+                'present': day.get('present', 0),
+                'absent': day.get('absent', 0),
+                'leave': day.get('leave', 0),
+                'half_day': day.get('half_day', 0)
             })
             current_date += timedelta(days=1)
         
@@ -135,8 +163,10 @@ class LeaveReportView(APIView):
         year = int(request.query_params.get('year', date.today().year))
         
         # Get all leave requests for the year
+        year_start, year_end = year_bounds(year)
         leave_requests = TimeOff.objects.filter(
-            start_date__year=year
+            start_date__gte=year_start,
+            start_date__lte=year_end
         ).select_related('user', 'user__profile')
         
         # Summary statistics
@@ -169,88 +199,53 @@ class PayrollReportView(APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
     
     def get(self, request):
-        month = int(request.query_params.get('month', date.today().month))
-        year = int(request.query_params.get('year', date.today().year))
-        
-        # Get all employees with profiles
-        employees = User.objects.filter(
-            profile__isnull=False,
-            is_active=True
-        ).select_related('profile')
-        
-        total_payout = 0
-        total_basic = 0
-        total_hra = 0
-        total_allowances = 0
-        total_deductions = 0
-        department_payroll = defaultdict(lambda: {'total': 0, 'count': 0})
-        
-        for emp in employees:
-            profile = emp.profile
-            
-            # Get attendance for the month
-            attendance_records = Attendance.objects.filter(
-                user=emp,
-                date__month=month,
-                date__year=year
-            )
-            
-            present_days = attendance_records.filter(status='PRESENT').count()
-            half_days = attendance_records.filter(status='HALF_DAY').count()
-            leave_days = attendance_records.filter(status='LEAVE').count()
-            
-            # Calculate working days
-            working_days = present_days + (half_days * 0.5) + leave_days
-            total_working_days = 22  # Standard working days per month
-            
-            # Calculate salary
-            monthly_wage = float(profile.monthly_wage)
-            per_day_salary = monthly_wage / total_working_days
-            gross_salary = per_day_salary * working_days
-            
-            # Deductions
-            professional_tax = float(profile.professional_tax)
-            pf_employee = float(profile.pf_employee_contribution)
-            deductions = professional_tax + pf_employee
-            
-            # Net salary
-            net_salary = gross_salary - deductions
-            
-            # Accumulate totals
-            total_payout += gross_salary
-            total_basic += float(profile.basic_salary) * (working_days / total_working_days)
-            total_hra += float(profile.house_rent_allowance) * (working_days / total_working_days)
-            total_allowances += (
-                float(profile.standard_allowance) + 
-                float(profile.fixed_allowance)
-            ) * (working_days / total_working_days)
-            total_deductions += deductions
-            
-            # Department-wise payroll
-            dept = profile.department or 'Unknown'
-            department_payroll[dept]['total'] += gross_salary
-            department_payroll[dept]['count'] += 1
-        
-        # Calculate averages
-        processed_count = employees.count()
-        avg_salary = total_payout / processed_count if processed_count > 0 else 0
-        
+        try:
+            year, month = report_month(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Months without a payroll run are computed on the fly and not saved
+        run = report_run(request.user.company, year, month)
+        if run is not None:
+            report = run_summary(run)
+        else:
+            report = lines_summary(transient_lines(request.user.company, year, month))
+        
+        # Amounts are exact Decimals; the JSON payload keeps them numeric
         return Response({
             'summary': {
-                'total_payout': round(total_payout, 2),
-                'avg_salary': round(avg_salary, 2),
-                'processed_count': processed_count
-            },
-            'distribution': {
-                'basic_salary': round(total_basic, 2),
-                'hra': round(total_hra, 2),
-                'allowances': round(total_allowances, 2),
-                'deductions': round(total_deductions, 2)
+                key: float(value) if isinstance(value, Decimal) else value
+                for key, value in report['summary'].items()
             },
-            'department_payroll': dict(department_payroll)
+            'distribution': {key: float(value) for key, value in report['distribution'].items()},
+            'department_payroll': {
+                department: {'total': float(totals['total']), 'count': totals['count']}
+                for department, totals in report['department_payroll'].items()
+            }
         })
 
 
+class Echo:
+    """Pseudo-buffer for csv.writer: write() hands each encoded row straight back"""
+    
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, header, rows):
+    """Stream CSV rows from a generator so memory stays flat regardless of report size"""
+    writer = csv.writer(Echo())
+    
+    def generate():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+    
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 class AttendanceReportCSVView(APIView):
     """Export attendance report to CSV"""
     permission_classes = [IsAuthenticated, IsAdmin]
@@ -264,38 +259,45 @@ class AttendanceReportCSVView(APIView):
         end_date = date(year, month, last_day)
         
         attendance_records = Attendance.objects.filter(
+            company=request.user.company,
             date__gte=start_date,
             date__lte=end_date
-        ).select_related('user', 'user__profile').order_by('-date', 'user__employee_id')
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="attendance_report_{month}_{year}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Employee ID', 'Employee Name', 'Email', 'Department', 'Date',
-            'Check In', 'Check In Location', 'Check Out', 'Check Out Location',
-            'Work Hours', 'Extra Hours', 'Status', 'Notes'
-        ])
-        
-        for record in attendance_records:
-            writer.writerow([
-                record.user.employee_id,
-                record.user.get_full_name(),
-                record.user.email,
-                record.user.profile.department if hasattr(record.user, 'profile') else '',
-                record.date,
-                record.check_in or '',
-                record.check_in_location or '',
-                record.check_out or '',
-                record.check_out_location or '',
-                record.work_hours,
-                record.extra_hours,
-                record.get_status_display(),
-                record.notes
-            ])
-        
-        return response
+        ).order_by('-date', 'user__employee_id').values_list(
+            'user__employee_id', 'user__first_name', 'user__last_name', 'user__email',
+            'user__profile__department', 'date', 'check_in', 'check_in_location',
+            'check_out', 'check_out_location', 'work_hours', 'extra_hours', 'status', 'notes'
+        )
+        status_labels = dict(Attendance.STATUS_CHOICES)
+        
+        def rows():
+            for (employee_id, first_name, last_name, email, department, day, check_in,
+                 check_in_location, check_out, check_out_location, work_hours,
+                 extra_hours, record_status, notes) in attendance_records.iterator(chunk_size=CSV_CHUNK_SIZE):
+                yield [
+                    employee_id,
+                    f"{first_name} {last_name}",
+                    email,
+                    department or '',
+                    day,
+                    check_in or '',
+                    check_in_location or '',
+                    check_out or '',
+                    check_out_location or '',
+                    work_hours,
+                    extra_hours,
+                    status_labels.get(record_status, record_status),
+                    notes
+                ]
+        
+        return stream_csv(
+            f'attendance_report_{month}_{year}.csv',
+            [
+                'Employee ID', 'Employee Name', 'Email', 'Department', 'Date',
+                'Check In', 'Check In Location', 'Check Out', 'Check Out Location',
+                'Work Hours', 'Extra Hours', 'Status', 'Notes'
+            ],
+            rows()
+        )
 
 
 class LeaveReportCSVView(APIView):
@@ -306,35 +308,44 @@ class LeaveReportCSVView(APIView):
         year = int(request.query_params.get('year', date.today().year))
         
         leave_requests = TimeOff.objects.filter(
-            start_date__year=year
-        ).select_related('user', 'user__profile').order_by('-created_at')
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="leave_report_{year}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Employee ID', 'Employee Name', 'Email', 'Department',
-            'Leave Type', 'Start Date', 'End Date', 'Total Days',
-            'Status', 'Reason', 'Created At'
-        ])
-        
-        for leave in leave_requests:
-            writer.writerow([
-                leave.user.employee_id,
-                leave.user.get_full_name(),
-                leave.user.email,
-                leave.user.profile.department if hasattr(leave.user, 'profile') else '',
-                leave.get_time_off_type_display(),
-                leave.start_date,
-                leave.end_date,
-                leave.total_days,
-                leave.get_status_display(),
-                leave.reason,
-                leave.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-        
-        return response
+            company=request.user.company,
+            start_date__gte=date(year, 1, 1),
+            start_date__lte=date(year, 12, 31)
+        ).order_by('-created_at').values_list(
+            'user__employee_id', 'user__first_name', 'user__last_name', 'user__email',
+            'user__profile__department', 'time_off_type', 'start_date', 'end_date',
+            'total_days', 'status', 'reason', 'created_at'
+        )
+        type_labels = dict(TimeOff.TYPE_CHOICES)
+        status_labels = dict(TimeOff.STATUS_CHOICES)
+        
+        def rows():
+            for (employee_id, first_name, last_name, email, department, time_off_type,
+                 start_date, end_date, total_days, leave_status, reason,
+                 created_at) in leave_requests.iterator(chunk_size=CSV_CHUNK_SIZE):
+                yield [
+                    employee_id,
+                    f"{first_name} {last_name}",
+                    email,
+                    department or '',
+                    type_labels.get(time_off_type, time_off_type),
+                    start_date,
+                    end_date,
+                    total_days,
+                    status_labels.get(leave_status, leave_status),
+                    reason,
+                    created_at.strftime('%Y-%m-%d %H:%M:%S')
+                ]
+        
+        return stream_csv(
+            f'leave_report_{year}.csv',
+            [
+                'Employee ID', 'Employee Name', 'Email', 'Department',
+                'Leave Type', 'Start Date', 'End Date', 'Total Days',
+                'Status', 'Reason', 'Created At'
+            ],
+            rows()
+        )
 
 
 class PayrollReportCSVView(APIView):
@@ -342,67 +353,32 @@ class PayrollReportCSVView(APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
     
     def get(self, request):
-        month = int(request.query_params.get('month', date.today().month))
-        year = int(request.query_params.get('year', date.today().year))
-        
-        employees = User.objects.filter(
-            profile__isnull=False,
-            is_active=True
-        ).select_related('profile')
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="payroll_report_{month}_{year}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Employee ID', 'Employee Name', 'Email', 'Department', 'Job Title',
-            'Present Days', 'Half Days', 'Leave Days', 'Working Days',
-            'Monthly Wage', 'Gross Salary', 'Basic Salary', 'HRA',
-            'Allowances', 'Professional Tax', 'PF Employee',
-            'Total Deductions', 'Net Salary'
-        ])
-        
-        for emp in employees:
-            profile = emp.profile
-            attendance_records = Attendance.objects.filter(
-                user=emp,
-                date__month=month,
-                date__year=year
+        try:
+            year, month = report_month(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        run = report_run(request.user.company, year, month)
+        
+        def rows():
+            if run is None:
+                for line in transient_lines(request.user.company, year, month):
+                    yield [line['employee_id'], line['name'], line['email'], *(line[field] for field in PAYSLIP_CSV_FIELDS)]
+                return
+            payslips = run.payslips.order_by('user__employee_id', 'user_id').values_list(
+                'user__employee_id', 'user__first_name', 'user__last_name', 'user__email', *PAYSLIP_CSV_FIELDS
             )
-            
-            present_days = attendance_records.filter(status='PRESENT').count()
-            half_days = attendance_records.filter(status='HALF_DAY').count()
-            leave_days = attendance_records.filter(status='LEAVE').count()
-            working_days = present_days + (half_days * 0.5) + leave_days
-            
-            monthly_wage = float(profile.monthly_wage)
-            per_day_salary = monthly_wage / 22
-            gross_salary = per_day_salary * working_days
-            
-            professional_tax = float(profile.professional_tax)
-            pf_employee = float(profile.pf_employee_contribution)
-            total_deductions = professional_tax + pf_employee
-            net_salary = gross_salary - total_deductions
-            
-            writer.writerow([
-                emp.employee_id,
-                emp.get_full_name(),
-                emp.email,
-                profile.department,
-                profile.job_title,
-                present_days,
-                half_days,
-                leave_days,
-                round(working_days, 1),
-                round(monthly_wage, 2),
-                round(gross_salary, 2),
-                float(profile.basic_salary),
-                float(profile.house_rent_allowance),
-                float(profile.standard_allowance) + float(profile.fixed_allowance),
-                professional_tax,
-                pf_employee,
-                total_deductions,
-                round(net_salary, 2)
-            ])
-        
-        return response
+            for employee_id, first_name, last_name, email, *figures in payslips.iterator(chunk_size=CSV_CHUNK_SIZE):
+                yield [employee_id, f"{first_name} {last_name}", email, *figures]
+        
+        return stream_csv(
+            f'payroll_report_{month}_{year}.csv',
+            [
+                'Employee ID', 'Employee Name', 'Email', 'Department', 'Job Title',
+                'Present Days', 'Half Days', 'Leave Days', 'Working Days',
+                'Monthly Wage', 'Gross Salary', 'Basic Salary', 'HRA',
+                'Allowances', 'Professional Tax', 'PF Employee',
+                'Total Deductions', 'Net Salary'
+            ],
+            rows()
+        )
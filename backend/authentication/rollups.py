@@ -0,0 +1,256 @@
+"""
+Attendance Rollups
+Maintains DailyAttendanceRollup rows from raw Attendance records. Single
+record saves shift the day's totals by the record's old -> new contribution;
+rebuilds and bulk ingest recount from Attendance. Days up to a company's
+attendance_archived_through have no raw rows left, so their rollups are never
+deleted or recomputed
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Company, Attendance, DailyAttendanceRollup, EmployeeProfile
+
+
+STATUS_FIELDS = {
+    'PRESENT': 'present_count',
+    'ABSENT': 'absent_count',
+    'HALF_DAY': 'half_day_count',
+    'LEAVE': 'leave_count',
+}
+
+# Rollup rows written per INSERT when rebuilding ranges
+REBUILD_BATCH_SIZE = 1000
+
+
+def _empty_totals():
+    totals = {field: 0 for field in STATUS_FIELDS.values()}
+    totals['total_work_hours'] = Decimal('0')
+    totals['total_extra_hours'] = Decimal('0')
+    totals['department_breakdown'] = {}
+    return totals
+
+
+def _fold(totals, status, department, count, work_hours, extra_hours):
+    """Add one grouped (status, department) bucket into a day's totals"""
+    field = STATUS_FIELDS.get(status)
+    if field:
+        totals[field] += count
+    totals['total_work_hours'] += work_hours or 0
+    totals['total_extra_hours'] += extra_hours or 0
+
+    dept = totals['department_breakdown'].setdefault(
+        department or '',
+        {**{key: 0 for key in STATUS_FIELDS}, 'total': 0}
+    )
+    if status in dept:
+        dept[status] += count
+    dept['total'] += count
+
+
+def _grouped(queryset, *keys):
+    return queryset.values(*keys, 'status', 'user__profile__department').annotate(
+        count=Count('id'),
+        work_hours=Sum('work_hours'),
+        extra_hours=Sum('extra_hours')
+    ).order_by()
+
+
+def _after_archive(queryset):
+    """Rows dated after their company's archived-through day"""
+    return queryset.filter(
+        Q(company__attendance_archived_through__isnull=True)
+        | Q(date__gt=F('company__attendance_archived_through'))
+    )
+
+
+def refresh_day(company_id, day):
+    """Recompute a single company/day rollup from its attendance records"""
+    if not company_id:
+        return None
+
+    archived_through = Company.objects.filter(pk=company_id).values_list(
+        'attendance_archived_through', flat=True
+    ).first()
+    if archived_through and day <= archived_through:
+        return None
+
+    rows = _grouped(Attendance.objects.filter(company_id=company_id, date=day))
+
+    totals = _empty_totals()
+    has_records = False
+    for row in rows:
+        has_records = True
+        _fold(totals, row['status'], row['user__profile__department'],
+              row['count'], row['work_hours'], row['extra_hours'])
+
+    if not has_records:
+        DailyAttendanceRollup.objects.filter(company_id=company_id, date=day).delete()
+        return None
+
+    rollup, _ = DailyAttendanceRollup.objects.update_or_create(
+        company_id=company_id,
+        date=day,
+        defaults=totals
+    )
+    return rollup
+
+
+def _department(user_id):
+    return EmployeeProfile.objects.filter(user_id=user_id).values_list('department', flat=True).first()
+
+
+def apply_change(company_id, day, user_id, old=None, new=None):
+    """
+    Move one record's contribution on a company/day rollup without recounting
+    the day: `old` is taken off and `new` added, each a (status, work_hours,
+    extra_hours) tuple or None. The rollup row is locked and shifted with F()
+    increments; a day without a rollup yet is counted with refresh_day.
+    """
+    if not company_id or old == new:
+        return
+
+    deltas = defaultdict(int)
+    work_hours = extra_hours = Decimal('0')
+    statuses = defaultdict(int)
+    for sign, contribution in ((-1, old), (1, new)):
+        if contribution is None:
+            continue
+        status, record_work_hours, record_extra_hours = contribution
+        field = STATUS_FIELDS.get(status)
+        if field:
+            deltas[field] += sign
+        work_hours += sign * (record_work_hours or 0)
+        extra_hours += sign * (record_extra_hours or 0)
+        statuses[status] += sign
+
+    with transaction.atomic():
+        rollup = DailyAttendanceRollup.objects.select_for_update().filter(
+            company_id=company_id, date=day
+        ).first()
+        if rollup is None:
+            refresh_day(company_id, day)
+            return
+
+        if sum(getattr(rollup, field) for field in STATUS_FIELDS.values()) + sum(deltas.values()) <= 0:
+            rollup.delete()
+            return
+
+        breakdown = rollup.department_breakdown
+        department = _department(user_id) or ''
+        dept = breakdown.setdefault(department, {**{key: 0 for key in STATUS_FIELDS}, 'total': 0})
+        for status, change in statuses.items():
+            if status in dept:
+                dept[status] += change
+            dept['total'] += change
+        if dept['total'] <= 0:
+            del breakdown[department]
+
+        DailyAttendanceRollup.objects.filter(pk=rollup.pk).update(
+            **{field: F(field) + change for field, change in deltas.items() if change},
+            total_work_hours=F('total_work_hours') + work_hours,
+            total_extra_hours=F('total_extra_hours') + extra_hours,
+            department_breakdown=breakdown,
+            updated_at=timezone.now()
+        )
+
+
+def rebuild_range(start_date=None, end_date=None, company_ids=None):
+    """
+    Rebuild rollups for a date range (inclusive, open-ended when None)
+    using one grouped scan of attendance. Archived days are left as they are.
+    Returns the number of rows written.
+    """
+    attendance = _after_archive(Attendance.objects.filter(company__isnull=False))
+    rollups = _after_archive(DailyAttendanceRollup.objects.all())
+
+    if start_date:
+        attendance = attendance.filter(date__gte=start_date)
+        rollups = rollups.filter(date__gte=start_date)
+    if end_date:
+        attendance = attendance.filter(date__lte=end_date)
+        rollups = rollups.filter(date__lte=end_date)
+    if company_ids:
+        attendance = attendance.filter(company_id__in=company_ids)
+        rollups = rollups.filter(company_id__in=company_ids)
+
+    days = defaultdict(_empty_totals)
+    for row in _grouped(attendance, 'company_id', 'date').iterator():
+        _fold(days[(row['company_id'], row['date'])], row['status'],
+              row['user__profile__department'], row['count'],
+              row['work_hours'], row['extra_hours'])
+
+    with transaction.atomic():
+        rollups.delete()
+        DailyAttendanceRollup.objects.bulk_create(
+            [
+                DailyAttendanceRollup(company_id=company_id, date=day, **totals)
+                for (company_id, day), totals in days.items()
+            ],
+            batch_size=REBUILD_BATCH_SIZE
+        )
+
+    return len(days)
+
+
+def rollup_trend(company, start_date, end_date):
+    """Daily status counts and hour totals in the shape of the old grouped query"""
+    return [
+        {
+            'date': rollup.date,
+            'present': rollup.present_count,
+            'absent': rollup.absent_count,
+            'half_day': rollup.half_day_count,
+            'leave': rollup.leave_count,
+            'total_work_hours': rollup.total_work_hours,
+            'total_overtime': rollup.total_extra_hours,
+        }
+        for rollup in DailyAttendanceRollup.objects.filter(
+            company=company,
+            date__gte=start_date,
+            date__lte=end_date
+        ).order_by('date')
+    ]
+
+
+def rollup_summary(company, start_date, end_date):
+    """Status counts, hour totals and department breakdown summed over a range"""
+    totals = DailyAttendanceRollup.objects.filter(
+        company=company,
+        date__gte=start_date,
+        date__lte=end_date
+    ).aggregate(
+        present=Sum('present_count'),
+        absent=Sum('absent_count'),
+        half_day=Sum('half_day_count'),
+        leave=Sum('leave_count'),
+        work_hours=Sum('total_work_hours'),
+        extra_hours=Sum('total_extra_hours')
+    )
+    summary = {key: value or 0 for key, value in totals.items()}
+    summary['total'] = summary['present'] + summary['absent'] + summary['half_day'] + summary['leave']
+    summary['avg_work_hours'] = (
+        round(Decimal(summary['work_hours']) / summary['total'], 2) if summary['total'] else None
+    )
+    return summary
+
+
+def rollup_departments(company, start_date, end_date):
+    """Merge the per-day department breakdowns over a range"""
+    merged = defaultdict(lambda: defaultdict(int))
+    breakdowns = DailyAttendanceRollup.objects.filter(
+        company=company,
+        date__gte=start_date,
+        date__lte=end_date
+    ).values_list('department_breakdown', flat=True)
+
+    for breakdown in breakdowns:
+        for department, counts in breakdown.items():
+            for key, value in counts.items():
+                merged[department][key] += value
+    return merged
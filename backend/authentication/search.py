@@ -0,0 +1,499 @@
+"""
+Employee Search
+Ranked, typo-tolerant search over employee names, emails, IDs and profile
+fields. Each employee has an EmployeeSearchDocument row, refreshed by signals;
+the matching runs on the best index the database offers:
+
+- PostgreSQL: weighted tsvector + GIN, prefix terms ranked by ts_rank_cd
+- SQLite: FTS5 trigram table ranked by weighted bm25
+- anything else: an in-process trigram index per company
+
+When nothing matches exactly, misspelt terms are corrected against the
+company's vocabulary (bounded edit distance) and the search is retried
+"""
+
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.db.models import Q
+
+from .analytics_cache import get_cache
+from .models import User, EmployeeSearchDocument
+
+
+FTS_TABLE = 'employee_search_fts'
+
+# Field weights, matching the tsvector A/B/C/D classes and the bm25 column weights
+FIELD_WEIGHTS = {
+    'name': 1.0,
+    'employee_id': 1.0,
+    'email': 1.0,
+    'department': 0.4,
+    'job_title': 0.4,
+    'skills': 0.2,
+    'certifications': 0.2,
+    'location': 0.1,
+}
+SEARCH_FIELDS = tuple(FIELD_WEIGHTS)
+
+# A misspelt term matches a word within this many edits (a transposition counts as one)
+MAX_EDITS_SHORT = 1
+MAX_EDITS_LONG = 2
+SHORT_TERM_LENGTH = 5
+
+# Shortest term that is spell-corrected, and the trigram similarity that also counts as a match
+MIN_CORRECTED_LENGTH = 3
+MIN_SIMILARITY = 0.3
+
+# Corrected matches rank below what an exact query would have scored
+CORRECTION_PENALTY = 0.5
+
+MAX_RESULTS = 100
+INDEX_BATCH_SIZE = 1000
+
+# In-process structures are rebuilt at least this often (seconds), so processes that
+# do not share the analytics cache still pick up index changes made by other workers
+LOCAL_CACHE_TTL = 300
+
+# Columns that feed the document; saves touching none of them skip re-indexing
+PROFILE_FIELDS = ('department', 'job_title', 'skills', 'certifications', 'location')
+USER_FIELDS = ('first_name', 'last_name', 'email', 'employee_id', 'company_id', 'company', 'is_active')
+
+_WORD = re.compile(r'\w+')
+_TERM = re.compile(r'[\w@.+-]+')
+
+
+# ============================================================================
+# TEXT HELPERS
+# ============================================================================
+
+def query_terms(query):
+    """Lowercased search terms; punctuation other than @ . + - separates terms"""
+    return [term.strip('.-+') for term in _TERM.findall((query or '').lower()) if term.strip('.-+')]
+
+
+def words(text):
+    return _WORD.findall(text.lower())
+
+
+def trigrams(word):
+    """pg_trgm-style trigrams: the word padded with two leading and one trailing space"""
+    padded = f'  {word} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def similarity(left, right):
+    left, right = trigrams(left), trigrams(right)
+    return len(left & right) / len(left | right)
+
+
+def edit_limit(term):
+    return MAX_EDITS_SHORT if len(term) <= SHORT_TERM_LENGTH else MAX_EDITS_LONG
+
+
+def edit_distance(left, right, limit):
+    """Optimal string alignment distance, or limit + 1 once it is certain to exceed limit"""
+    if abs(len(left) - len(right)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(right) + 1))
+    for i in range(1, len(left) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(right)
+        for j in range(1, len(right) + 1):
+            cost = left[i - 1] != right[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and left[i - 1] == right[j - 2] and left[i - 2] == right[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+def typo_distance(term, word):
+    """Edits between the term and the word, or the word's prefix of the term's length"""
+    limit = edit_limit(term)
+    return min(edit_distance(term, word, limit), edit_distance(term, word[:len(term)], limit))
+
+
+def word_score(term, word):
+    """1.0 for a prefix match; less for a near miss; 0 otherwise"""
+    if word.startswith(term):
+        return 1.0
+    edits = typo_distance(term, word)
+    if edits <= edit_limit(term):
+        return 1.0 - edits / (len(term) + 1)
+    score = similarity(term, word)
+    return score if score >= MIN_SIMILARITY else 0.0
+
+
+def term_score(term, document_words):
+    """Best word_score of the term (or any of its parts, e.g. of an email) against the words"""
+    best = 0.0
+    for term_part in words(term) or [term]:
+        for word in document_words:
+            best = max(best, word_score(term_part, word))
+            if best == 1.0:
+                return best
+    return best
+
+
+# ============================================================================
+# DOCUMENTS
+# ============================================================================
+
+def _flatten(items):
+    """Skills/certifications JSON (strings or objects) as one line of text"""
+    if not items:
+        return ''
+    if isinstance(items, (str, int, float)):
+        return str(items)
+    if isinstance(items, dict):
+        return ' '.join(_flatten(value) for value in items.values())
+    return ' '.join(_flatten(item) for item in items)
+
+
+def _document(row):
+    fields = {
+        'name': f"{row['first_name']} {row['last_name']}".strip(),
+        'employee_id': row['employee_id'] or '',
+        'email': row['email'] or '',
+        'department': row['profile__department'] or '',
+        'job_title': row['profile__job_title'] or '',
+        'skills': _flatten(row['profile__skills']),
+        'certifications': _flatten(row['profile__certifications']),
+        'location': row['profile__location'] or '',
+    }
+    return EmployeeSearchDocument(
+        user_id=row['id'],
+        company_id=row['company_id'],
+        is_active=row['is_active'],
+        document=' '.join(value for value in fields.values() if value).lower(),
+        **fields
+    )
+
+
+def index_users(user_ids=None, company_id=None):
+    """
+    (Re)build search documents for the given users, a company, or everyone.
+    One query per batch to read and one upsert to write. Returns the count.
+    """
+    users = User.objects.filter(company__isnull=False).order_by('id')
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        users = users.filter(id__in=user_ids)
+    if company_id is not None:
+        users = users.filter(company_id=company_id)
+    rows = users.values(
+        'id', 'company_id', 'is_active', 'first_name', 'last_name', 'email', 'employee_id',
+        'profile__department', 'profile__job_title', 'profile__skills', 'profile__certifications',
+        'profile__location'
+    )
+
+    indexed, company_ids, batch = 0, set(), []
+    for row in rows.iterator(chunk_size=INDEX_BATCH_SIZE):
+        batch.append(_document(row))
+        company_ids.add(row['company_id'])
+        if len(batch) >= INDEX_BATCH_SIZE:
+            indexed += _save_documents(batch)
+            batch = []
+    indexed += _save_documents(batch)
+
+    # Users that left their company drop out of the index
+    if user_ids is not None:
+        EmployeeSearchDocument.objects.filter(user_id__in=user_ids, user__company__isnull=True).delete()
+
+    for changed_company_id in company_ids:
+        bump_generation(changed_company_id)
+    return indexed
+
+
+def _save_documents(documents):
+    if not documents:
+        return 0
+    EmployeeSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['company', 'is_active', 'document', *SEARCH_FIELDS, 'updated_at']
+    )
+    return len(documents)
+
+
+# ============================================================================
+# IN-PROCESS STRUCTURES
+# ============================================================================
+
+def _generation_key(company_id):
+    return f'search:generation:{company_id}'
+
+
+def index_generation(company_id):
+    """A company's index generation, kept in the analytics cache so every process sharing it sees a bump"""
+    return get_cache().get(_generation_key(company_id), 0)
+
+
+def bump_generation(company_id):
+    """Mark a company's in-process vocabulary and trigram index stale"""
+    cache = get_cache()
+    try:
+        cache.incr(_generation_key(company_id))
+    except ValueError:
+        # Seed from the clock so an evicted counter never reuses an old generation
+        cache.set(_generation_key(company_id), time.time_ns(), timeout=None)
+
+
+class CompanyCache:
+    """
+    Per-company structure built from search documents, rebuilt when the
+    generation moves or after LOCAL_CACHE_TTL seconds
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, company_id):
+        generation = index_generation(company_id)
+        with self._lock:
+            entry = self._entries.get(company_id)
+        if entry is not None and entry[0] == generation and entry[1] > time.monotonic():
+            return entry[2]
+        value = self.build(company_id)
+        with self._lock:
+            self._entries[company_id] = (generation, time.monotonic() + LOCAL_CACHE_TTL, value)
+        return value
+
+
+def _build_vocabulary(company_id):
+    """{length: Counter(word)} of alphabetic words in a company's documents"""
+    by_length = defaultdict(Counter)
+    documents = EmployeeSearchDocument.objects.filter(company_id=company_id).values_list('document', flat=True)
+    for document in documents.iterator(chunk_size=INDEX_BATCH_SIZE):
+        for word in words(document):
+            if word.isalpha() and len(word) >= MIN_CORRECTED_LENGTH:
+                by_length[len(word)][word] += 1
+    return by_length
+
+
+_vocabularies = CompanyCache(_build_vocabulary)
+
+
+def correct_term(company_id, term):
+    """Closest vocabulary word to a misspelt term (fewest edits, then most frequent), or None"""
+    if len(term) < MIN_CORRECTED_LENGTH or not term.isalpha():
+        return None
+    vocabulary = _vocabularies.get(company_id)
+    limit = edit_limit(term)
+    best, best_key = None, None
+    for length in range(len(term) - limit, len(term) + limit + 1):
+        for word, count in vocabulary.get(length, {}).items():
+            if word == term:
+                return None
+            edits = edit_distance(term, word, limit)
+            if edits <= limit and (best_key is None or (edits, -count) < best_key):
+                best, best_key = word, (edits, -count)
+    return best
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class PostgresSearch:
+    """Every term as a tsquery prefix, ranked by ts_rank_cd over the weighted vector"""
+
+    corrects_typos = False
+
+    @staticmethod
+    def _tsquery(terms):
+        return ' & '.join(f"'{term.replace(chr(39), '')}':*" for term in terms)
+
+    def search(self, company_id, terms, limit, include_inactive):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT user_id, ts_rank_cd(search_vector, query) AS score
+                FROM {EmployeeSearchDocument._meta.db_table}, to_tsquery('simple', %s) AS query
+                WHERE company_id = %s AND (is_active OR %s) AND search_vector @@ query
+                ORDER BY score DESC, user_id
+                LIMIT %s
+                """,
+                [self._tsquery(terms), company_id, include_inactive, limit]
+            )
+            return [(user_id, float(score) + 1.0) for user_id, score in cursor.fetchall()]
+
+
+class SqliteFtsSearch:
+    """Every term as an FTS5 trigram substring, ranked by weighted bm25"""
+
+    corrects_typos = False
+
+    BM25 = f"bm25({FTS_TABLE}, {', '.join(str(weight * 10) for weight in FIELD_WEIGHTS.values())})"
+
+    @staticmethod
+    def _phrase(text):
+        return '"' + text.replace('"', '""') + '"'
+
+    def _prefix_scan(self, terms, company_id, include_inactive, limit):
+        """Terms under three characters cannot use the trigram index; word-prefix LIKE instead"""
+        queryset = EmployeeSearchDocument.objects.filter(company_id=company_id)
+        if not include_inactive:
+            queryset = queryset.filter(is_active=True)
+        for term in terms:
+            queryset = queryset.filter(Q(document__startswith=term) | Q(document__contains=f' {term}'))
+        return [(user_id, 1.0) for user_id in queryset.order_by('name').values_list('user_id', flat=True)[:limit]]
+
+    def search(self, company_id, terms, limit, include_inactive):
+        long_terms = [term for term in terms if len(term) >= 3]
+        short_terms = [term for term in terms if len(term) < 3]
+        if not long_terms:
+            return self._prefix_scan(terms, company_id, include_inactive, limit)
+
+        table = EmployeeSearchDocument._meta.db_table
+        conditions = ''.join(" AND (' ' || d.document) LIKE %s" for _ in short_terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT d.user_id, {self.BM25} AS rank
+                FROM {FTS_TABLE} JOIN {table} d ON d.user_id = {FTS_TABLE}.rowid
+                WHERE {FTS_TABLE} MATCH %s AND d.company_id = %s AND (d.is_active OR %s){conditions}
+                ORDER BY rank
+                LIMIT %s
+                """,
+                [
+                    ' AND '.join(self._phrase(term) for term in long_terms),
+                    company_id,
+                    include_inactive,
+                    *[f'% {term}%' for term in short_terms],
+                    limit
+                ]
+            )
+            return [(user_id, 1.0 - rank) for user_id, rank in cursor.fetchall()]
+
+
+def _build_trigram_index(company_id):
+    documents, postings = {}, defaultdict(set)
+    rows = EmployeeSearchDocument.objects.filter(company_id=company_id).values_list(
+        'user_id', 'is_active', *SEARCH_FIELDS
+    )
+    for user_id, is_active, *values in rows.iterator(chunk_size=INDEX_BATCH_SIZE):
+        fields = {field: words(value) for field, value in zip(SEARCH_FIELDS, values)}
+        documents[user_id] = (is_active, fields)
+        for field_words in fields.values():
+            for word in field_words:
+                for gram in trigrams(word):
+                    postings[gram].add(user_id)
+    return documents, postings
+
+
+class TrigramSearch:
+    """
+    In-process trigram index per company, for databases without a native
+    text index. Candidates share a trigram with every term; near misses are
+    scored by edit distance and returned only when nothing matches exactly.
+    """
+
+    corrects_typos = True
+
+    _indexes = CompanyCache(_build_trigram_index)
+
+    def search(self, company_id, terms, limit, include_inactive):
+        documents, postings = self._indexes.get(company_id)
+        candidates = None
+        for term in terms:
+            term_candidates = set()
+            for gram in trigrams(term):
+                term_candidates |= postings.get(gram, set())
+            candidates = term_candidates if candidates is None else candidates & term_candidates
+
+        exact, fuzzy = [], []
+        for user_id in candidates or ():
+            is_active, fields = documents[user_id]
+            if not (is_active or include_inactive):
+                continue
+            score, all_prefix = 0.0, True
+            for term in terms:
+                # Best weighted match of the term in any field
+                term_best, term_prefix = 0.0, False
+                for field, field_words in fields.items():
+                    match = term_score(term, field_words)
+                    if match:
+                        term_best = max(term_best, match * FIELD_WEIGHTS[field])
+                        term_prefix = term_prefix or match == 1.0
+                if not term_best:
+                    score = 0.0
+                    break
+                score += term_best
+                all_prefix = all_prefix and term_prefix
+            if score:
+                (exact if all_prefix else fuzzy).append((user_id, score))
+
+        results = exact or fuzzy
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit]
+
+
+_backend = None
+
+
+def get_backend():
+    """Search backend for the default database, chosen once per process"""
+    global _backend
+    if _backend is None:
+        if connection.vendor == 'postgresql':
+            _backend = PostgresSearch()
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            _backend = SqliteFtsSearch()
+        else:
+            _backend = TrigramSearch()
+    return _backend
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+def search_employees(company_id, query, limit=20, include_inactive=False):
+    """
+    Ranked matches for a free-text query within a company, best first.
+    Returns {'results': [{'id', 'employee_id', 'full_name', 'email', 'department',
+    'job_title', 'location', 'score'}], 'corrected_query': str or None}.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return {'results': [], 'corrected_query': None}
+    limit = max(1, min(limit, MAX_RESULTS))
+
+    backend = get_backend()
+    ranked = backend.search(company_id, terms, limit, include_inactive)
+    corrected_query = None
+    if not ranked and not backend.corrects_typos:
+        corrected = [correct_term(company_id, term) or term for term in terms]
+        if corrected != terms:
+            corrected_query = ' '.join(corrected)
+            ranked = [
+                (user_id, score * CORRECTION_PENALTY)
+                for user_id, score in backend.search(company_id, corrected, limit, include_inactive)
+            ]
+
+    documents = EmployeeSearchDocument.objects.in_bulk([user_id for user_id, _ in ranked])
+    return {
+        'results': [
+            {
+                'id': user_id,
+                'employee_id': documents[user_id].employee_id,
+                'full_name': documents[user_id].name,
+                'email': documents[user_id].email,
+                'department': documents[user_id].department,
+                'job_title': documents[user_id].job_title,
+                'location': documents[user_id].location,
+                'score': round(score, 4),
+            }
+            for user_id, score in ranked
+            if user_id in documents
+        ],
+        'corrected_query': corrected_query,
+    }
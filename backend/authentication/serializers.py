@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.db.models import Q
 from .models import Company
 from .utils import generate_random_password, generate_employee_id
+from .passwords import verify_password
+from .jwt_auth import issue_tokens
 from datetime import datetime
 
 User = get_user_model()
@@ -43,29 +45,27 @@ class CompanySignupSerializer(serializers.Serializer):
             logo=validated_data.get('logo')
         )
         
-        # Create admin user
+        # Create admin user with its employee ID in a single INSERT
+        year_of_joining = datetime.now().year
         user = User.objects.create_user(
             company=company,
+            employee_id=generate_employee_id(
+                company,
+                validated_data['first_name'],
+                validated_data['last_name'],
+                year_of_joining
+            ),
             first_name=validated_data['first_name'],
             last_name=validated_data['last_name'],
             email=validated_data['email'],
             phone=validated_data.get('phone', ''),
             password=validated_data['password'],
             role='ADMIN',
-            year_of_joining=datetime.now().year,
+            year_of_joining=year_of_joining,
             is_first_login=False,
             is_staff=True
         )
         
-        # Generate employee ID
-        user.employee_id = generate_employee_id(
-            company,
-            user.first_name,
-            user.last_name,
-            user.year_of_joining
-        )
-        user.save()
-        
         return {'user': user, 'company': company}
 
 
@@ -91,28 +91,26 @@ class EmployeeCreateSerializer(serializers.Serializer):
         # Generate random password
         temp_password = generate_random_password()
         
-        # Create user
+        # Create user with its employee ID in a single INSERT
+        year_of_joining = validated_data.get('year_of_joining', datetime.now().year)
         user = User.objects.create_user(
             company=company,
+            employee_id=generate_employee_id(
+                company,
+                validated_data['first_name'],
+                validated_data['last_name'],
+                year_of_joining
+            ),
             first_name=validated_data['first_name'],
             last_name=validated_data['last_name'],
             email=validated_data['email'],
             phone=validated_data.get('phone', ''),
             password=temp_password,
             role=validated_data.get('role', 'EMPLOYEE'),
-            year_of_joining=validated_data.get('year_of_joining', datetime.now().year),
+            year_of_joining=year_of_joining,
             is_first_login=True
         )
         
-        # Generate employee ID
-        user.employee_id = generate_employee_id(
-            company,
-            user.first_name,
-            user.last_name,
-            user.year_of_joining
-        )
-        user.save()
-        
         # Create profile with job details
         from .models import EmployeeProfile
         EmployeeProfile.objects.create(
@@ -124,6 +122,13 @@ class EmployeeCreateSerializer(serializers.Serializer):
         return {'user': user, 'temp_password': temp_password}
 
 
+class EmployeeImportRowSerializer(EmployeeCreateSerializer):
+    """One row of a bulk employee import; email uniqueness is checked for the whole file at once"""
+    
+    def validate_email(self, value):
+        return User.objects.normalize_email(value)
+
+
 class LoginSerializer(serializers.Serializer):
     """Serializer for user login using employee_id or email"""
     login_id = serializers.CharField()  # Can be employee_id or email
@@ -136,17 +141,16 @@ class LoginSerializer(serializers.Serializer):
         if not login_id or not password:
             raise serializers.ValidationError('Login ID and password are required')
         
-        # Try to find user by employee_id or email
-        user = None
-        try:
-            user = User.objects.get(employee_id=login_id)
-        except User.DoesNotExist:
-            try:
-                user = User.objects.get(email=login_id)
-            except User.DoesNotExist:
-                raise serializers.ValidationError('Invalid credentials')
+        # Resolve employee_id or email in one query; an employee_id match wins
+        candidates = list(User.objects.filter(Q(employee_id=login_id) | Q(email=login_id))[:2])
+        user = next(
+            (candidate for candidate in candidates if candidate.employee_id == login_id),
+            candidates[0] if candidates else None
+        )
+        if user is None:
+            raise serializers.ValidationError('Invalid credentials')
         
-        if not user.check_password(password):
+        if not verify_password(user, password):
             raise serializers.ValidationError('Invalid credentials')
         
         if not user.is_active:
@@ -157,7 +161,7 @@ class LoginSerializer(serializers.Serializer):
     
     def get_tokens(self, user):
         """Generate JWT tokens for the user"""
-        refresh = RefreshToken.for_user(user)
+        refresh = issue_tokens(user)
         return {
             'token': str(refresh.access_token),
             'refresh': str(refresh),
@@ -0,0 +1,333 @@
+"""
+Model Signal Handlers
+Keeps derived data (company columns, attendance rollups, payslip snapshots, analytics cache,
+real-time dashboards, access token versions, search documents, the presence board) in step
+with source records
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from django.db.backends.utils import format_number
+from django.db.models import DEFERRED, F
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import User, EmployeeProfile, Attendance, TimeOff, LeaveAllocation, Notification
+from .rollups import apply_change, refresh_day, rebuild_range
+from .analytics_cache import invalidate_company
+from .realtime import publish_attendance_day
+from .payroll import mark_dirty
+from .jwt_auth import token_versions
+from . import presence, search
+
+
+def _company_id(user_id, instance=None):
+    """Company of a user, reusing the instance's cached user or prior lookup when possible"""
+    if instance is None:
+        return User.objects.filter(pk=user_id).values_list('company_id', flat=True).first()
+    if type(instance).user.is_cached(instance):
+        return instance.user.company_id
+
+    cached_user_id, company_id = getattr(instance, '_signal_company', (None, None))
+    if cached_user_id != user_id:
+        company_id = _company_id(user_id)
+        instance._signal_company = (user_id, company_id)
+    return company_id
+
+
+# ============================================================================
+# LOADED-VALUE SNAPSHOTS
+# ============================================================================
+
+# Fields each post_save consumer below compares against the values the instance was loaded with
+ORIGIN_FIELDS = {
+    User: ('company_id', 'role', 'is_active'),
+    Attendance: ('company_id', 'user_id', 'date', 'status', 'work_hours', 'extra_hours'),
+    EmployeeProfile: (
+        'department', 'job_title', 'monthly_wage', 'basic_salary', 'house_rent_allowance',
+        'standard_allowance', 'fixed_allowance', 'professional_tax', 'pf_employee_contribution'
+    ),
+}
+
+
+def _snapshot(instance):
+    # Read from __dict__ so deferred loads (.only()) do not trigger a query
+    values = instance.__dict__
+    return {field: values.get(field, DEFERRED) for field in ORIGIN_FIELDS[type(instance)]}
+
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Attendance)
+@receiver(post_init, sender=EmployeeProfile)
+def remember_origin(sender, instance, **kwargs):
+    """The single snapshot per instance that every consumer reads as instance._signal_origin"""
+    instance._signal_origin = _snapshot(instance)
+
+
+def reset_origin(instance, fields):
+    """Take fields reloaded from the database as the origin, so reloading them is not a change"""
+    current = _snapshot(instance)
+    instance._signal_origin.update({field: current[field] for field in fields if field in current})
+
+
+# ============================================================================
+# DENORMALIZED COMPANY COLUMN
+# ============================================================================
+
+@receiver(pre_save, sender=Attendance)
+@receiver(pre_save, sender=TimeOff)
+@receiver(pre_save, sender=LeaveAllocation)
+@receiver(pre_save, sender=Notification)
+def inherit_user_company(sender, instance, **kwargs):
+    """Copy the owning user's company onto the record's denormalized company column"""
+    if instance.company_id is None and instance.user_id:
+        instance.company_id = _company_id(instance.user_id, instance)
+
+
+@receiver(post_save, sender=User)
+def move_user_records(sender, instance, created, **kwargs):
+    """Re-point denormalized company columns when an employee changes company"""
+    origin = instance._signal_origin['company_id']
+    if created or origin is DEFERRED or origin == instance.company_id:
+        return
+
+    for model in (Attendance, TimeOff, LeaveAllocation, Notification):
+        model.objects.filter(user=instance).update(company_id=instance.company_id)
+    rebuild_range(company_ids=[company_id for company_id in (origin, instance.company_id) if company_id])
+    invalidate_company(origin)
+
+
+# ============================================================================
+# ACCESS TOKEN REVOCATION
+# ============================================================================
+
+# Claims whose change must invalidate tokens already issued
+REVOKING_CLAIM_FIELDS = ('role', 'company_id', 'is_active')
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_claim_change(sender, instance, created, **kwargs):
+    """Bump the token version when role, company or active status changes"""
+    origin = instance._signal_origin
+    if created or not any(
+        origin[field] is not DEFERRED and field in instance.__dict__ and origin[field] != instance.__dict__[field]
+        for field in REVOKING_CLAIM_FIELDS
+    ):
+        return
+
+    # Done as an UPDATE so it also applies to save(update_fields=...)
+    User.objects.filter(pk=instance.pk).update(token_version=F('token_version') + 1)
+    instance.__dict__.pop('token_version', None)
+    token_versions.forget(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def forget_token_version(sender, instance, **kwargs):
+    token_versions.forget(instance.pk)
+
+
+# ============================================================================
+# ATTENDANCE ROLLUPS
+# ============================================================================
+
+# What a record contributes to its day's rollup, keyed by (company, date, user)
+ROLLUP_FIELDS = ('company_id', 'date', 'user_id', 'status', 'work_hours', 'extra_hours')
+
+
+def _hours(name, value):
+    """An hours value as the database stores it (calculate_work_hours assigns unrounded floats)"""
+    field = Attendance._meta.get_field(name)
+    return Decimal(format_number(field.to_python(value or 0), field.max_digits, field.decimal_places))
+
+
+def _rollup_state(values):
+    """A record's rollup key and contribution from a field -> value mapping"""
+    if any(values[field] is DEFERRED for field in ROLLUP_FIELDS):
+        return tuple(values[field] for field in ROLLUP_FIELDS)
+    return (
+        values['company_id'], values['date'], values['user_id'], values['status'],
+        _hours('work_hours', values['work_hours']), _hours('extra_hours', values['extra_hours'])
+    )
+
+
+@receiver(post_save, sender=Attendance)
+def refresh_rollup_on_save(sender, instance, created, **kwargs):
+    """Shift the day's rollup by the difference from what the record counted for when loaded"""
+    origin = _rollup_state(instance._signal_origin)
+    current = _rollup_state(_snapshot(instance))
+
+    if created:
+        apply_change(*current[:3], new=current[3:])
+    elif DEFERRED in origin:
+        # Loaded with .only()/.defer(): the old contribution is unknown, so recount
+        refresh_day(instance.company_id, instance.date)
+        if origin[1] is not DEFERRED and origin[:2] != current[:2]:
+            refresh_day(*origin[:2])
+    elif origin[:3] == current[:3]:
+        apply_change(*current[:3], old=origin[3:], new=current[3:])
+    else:
+        apply_change(*origin[:3], old=origin[3:])
+        apply_change(*current[:3], new=current[3:])
+
+
+@receiver(post_delete, sender=Attendance)
+def refresh_rollup_on_delete(sender, instance, **kwargs):
+    if instance.get_deferred_fields() & set(ROLLUP_FIELDS):
+        refresh_day(instance.company_id, instance.date)
+        return
+    state = _rollup_state(_snapshot(instance))
+    apply_change(*state[:3], old=state[3:])
+
+
+# ============================================================================
+# PAYSLIP SNAPSHOTS
+# ============================================================================
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def mark_attendance_payslip_dirty(sender, instance, created=False, **kwargs):
+    """Only the owner's payslip for the record's month goes stale"""
+    mark_dirty(instance.user_id, instance.date)
+
+    origin = instance._signal_origin
+    origin_user_id, origin_date = origin['user_id'], origin['date']
+    if created or DEFERRED in (origin_user_id, origin_date):
+        return
+    if (origin_user_id, origin_date.year, origin_date.month) != (
+        instance.user_id, instance.date.year, instance.date.month
+    ):
+        mark_dirty(origin_user_id, origin_date)
+
+
+@receiver(post_save, sender=EmployeeProfile)
+def mark_profile_payslips_dirty(sender, instance, created, **kwargs):
+    """Salary or department edits (fields copied into or used to compute a payslip) dirty open months"""
+    if created or instance._signal_origin == _snapshot(instance):
+        return
+    mark_dirty(instance.user_id)
+
+
+# ============================================================================
+# ANALYTICS CACHE INVALIDATION
+# ============================================================================
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=TimeOff)
+@receiver(post_delete, sender=TimeOff)
+@receiver(post_save, sender=LeaveAllocation)
+@receiver(post_delete, sender=LeaveAllocation)
+def invalidate_analytics_for_company_record(sender, instance, **kwargs):
+    invalidate_company(instance.company_id)
+
+
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+def invalidate_analytics_for_user_record(sender, instance, **kwargs):
+    invalidate_company(_company_id(instance.user_id, instance))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_analytics_for_user(sender, instance, **kwargs):
+    invalidate_company(instance.company_id)
+
+
+# ============================================================================
+# SEARCH INDEX
+# ============================================================================
+
+def _touches(update_fields, fields):
+    return update_fields is None or not update_fields.isdisjoint(fields)
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, update_fields=None, **kwargs):
+    if _touches(update_fields, search.USER_FIELDS):
+        search.index_users([instance.pk])
+
+
+@receiver(post_save, sender=EmployeeProfile)
+def index_user_profile(sender, instance, update_fields=None, **kwargs):
+    if _touches(update_fields, search.PROFILE_FIELDS):
+        search.index_users([instance.user_id])
+
+
+@receiver(post_delete, sender=EmployeeProfile)
+def unindex_user_profile(sender, instance, origin=None, **kwargs):
+    # Only when the profile itself is deleted; a cascading user delete removes the document too
+    if isinstance(origin, EmployeeProfile) or getattr(origin, 'model', None) is EmployeeProfile:
+        search.index_users([instance.user_id])
+
+
+# ============================================================================
+# REAL-TIME DASHBOARD PUSH
+# ============================================================================
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def push_attendance_day(sender, instance, **kwargs):
+    publish_attendance_day(instance.company_id, instance.date)
+
+
+# ============================================================================
+# PRESENCE BOARD
+# ============================================================================
+
+@receiver(post_save, sender=Attendance)
+def update_presence_on_save(sender, instance, created, **kwargs):
+    """Check-ins set the user's status directly; other changes re-derive the user's status"""
+    origin = tuple(instance._signal_origin[field] for field in ('company_id', 'user_id', 'date'))
+
+    user_known_active = type(instance).user.is_cached(instance) and instance.user.is_active
+    if instance.status in presence.BOARD_STATUSES and user_known_active:
+        presence.record_status(instance.company_id, instance.date, instance.user_id, instance.status)
+    elif not (created and instance.status not in presence.BOARD_STATUSES):
+        # A new record that is not on the board (e.g. the ABSENT row check-in creates) changes nothing
+        presence.refresh_users(instance.company_id, instance.date, [instance.user_id])
+
+    if not created and DEFERRED not in origin and origin != (instance.company_id, instance.user_id, instance.date):
+        presence.refresh_users(origin[0], origin[2], [origin[1]])
+
+
+@receiver(post_delete, sender=Attendance)
+def update_presence_on_delete(sender, instance, **kwargs):
+    presence.refresh_users(instance.company_id, instance.date, [instance.user_id])
+
+
+@receiver(post_save, sender=TimeOff)
+@receiver(post_delete, sender=TimeOff)
+def update_presence_on_leave(sender, instance, **kwargs):
+    """Approving (or withdrawing) leave that covers today moves the employee on or off LEAVE"""
+    today = date.today()
+    if instance.start_date <= today <= instance.end_date:
+        presence.refresh_users(instance.company_id, today, [instance.user_id])
+
+
+@receiver(post_save, sender=User)
+def drop_presence_on_headcount_change(sender, instance, created, **kwargs):
+    """Joining, leaving or (de)activating changes the headcount; the board is rebuilt on next read"""
+    origin = tuple(instance._signal_origin[field] for field in ('company_id', 'is_active'))
+    if not created and (DEFERRED in origin or origin == (instance.company_id, instance.is_active)):
+        return
+    for company_id in {origin[0], instance.company_id} - {DEFERRED}:
+        presence.forget_company(company_id)
+
+
+@receiver(post_delete, sender=User)
+def drop_presence_on_user_delete(sender, instance, **kwargs):
+    presence.forget_company(instance.company_id)
+
+
+# ============================================================================
+# SNAPSHOT ADVANCE
+# ============================================================================
+
+# Connected after every post_save receiver above, so they all compare against the loaded values
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=EmployeeProfile)
+def advance_origin(sender, instance, **kwargs):
+    """The saved values are the origin of the instance's next save"""
+    instance._signal_origin = _snapshot(instance)
@@ -1,3 +1,742 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import presence
+from .analytics_engine import AnomalyScanner, PayrollEngine, PerformanceScoringEngine
+from .date_ranges import month_bounds
+from .employee_import import import_employees, parse_rows, process_import_jobs
+from .models import (
+    Company, User, EmployeeProfile, Attendance, TimeOff, PayrollRun, EmployeeImportJob,
+    Notification, NotificationCounter, DailyAttendanceRollup, StreamTicket
+)
+from .notifications import InAppNotificationService
+from .payroll import generate_run, mark_dirty, refresh_run, run_summary
+from .query_budget import QueryBudgetTestMixin, query_budget, sql_template
+from .rollups import rebuild_range
+
+
+# A per-process analytics cache, so entries left on disk by an earlier run (whose
+# company ids the test database reuses) are never served
+@override_settings(CACHES={
+    **settings.CACHES,
+    'analytics': {**settings.CACHES['analytics'], 'BACKEND': settings.ANALYTICS_CACHE_BACKENDS['locmem'],
+                  'LOCATION': 'dayflow-analytics-tests', 'OPTIONS': {}},
+})
+class CompanyTestCase(TestCase):
+    """
+    A company with an admin, who self.client is authenticated as, and EMPLOYEES
+    plain employees (e<n>@DOMAIN, employee ids PREFIX0001...), each given an
+    EmployeeProfile when PROFILE is set. Subclasses add only what they need.
+    """
+
+    COMPANY = 'Test Co'
+    DOMAIN = 'company.test'
+    PREFIX = 'TC'
+    EMPLOYEES = 0
+    PROFILE = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name=cls.COMPANY)
+        cls.admin = cls.create_user('admin', employee_id=f'{cls.PREFIX}0000', role='ADMIN')
+        cls.employees = [
+            cls.create_user(f'e{index}', employee_id=f'{cls.PREFIX}{index + 1:04d}', profile=cls.PROFILE)
+            for index in range(cls.EMPLOYEES)
+        ]
+
+    @classmethod
+    def create_user(cls, name, profile=None, **fields):
+        user = User.objects.create(company=cls.company, email=f'{name}@{cls.DOMAIN}', **fields)
+        if profile is not None:
+            EmployeeProfile.objects.create(user=user, **profile)
+        return user
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def setUp(self):
+        self.client = self.client_for(self.admin)
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, CompanyTestCase):
+    """Endpoints stay within the query budget declared on their views, with no N+1 loops"""
+
+    COMPANY, DOMAIN, PREFIX = 'Budget Test Co', 'budget.test', 'BT'
+    EMPLOYEES = 12
+    PROFILE = {'department': 'Eng', 'monthly_wage': 40000}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        EmployeeProfile.objects.create(user=cls.admin, department='Ops', monthly_wage=50000)
+        today = date.today()
+        Attendance.objects.bulk_create([
+            Attendance(user=user, company=cls.company, date=today - timedelta(days=offset), status='PRESENT')
+            for user in cls.employees
+            for offset in range(3)
+        ])
+
+    def test_analytics_dashboard(self):
+        response = self.assertWithinQueryBudget('get', '/api/auth/analytics/dashboard')
+        self.assertEqual(response.status_code, 200)
+
+    def test_graph_correlation(self):
+        response = self.assertWithinQueryBudget('get', '/api/auth/analytics/graph-data?type=correlation')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['correlation']['scatter_data']), self.EMPLOYEES + 1)
+
+    def test_employee_directory_pages(self):
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 5, **({'cursor': cursor} if cursor else {})}
+            response = self.assertWithinQueryBudget('get', '/api/auth/employee/all', params)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['employee_id'] for row in response.data['results']]
+            cursor = response.data['next_cursor']
+            if not response.data['has_more']:
+                break
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), self.EMPLOYEES + 1)
+
+    def test_employee_directory_sparse_fields(self):
+        response = self.client.get('/api/auth/employee/all', {'search': 'e1', 'fields': 'email'})
+        self.assertEqual(
+            response.data['results'],
+            [{'email': 'e1@budget.test'}, {'email': 'e10@budget.test'}, {'email': 'e11@budget.test'}]
+        )
+
+    def test_n_plus_one_is_reported(self):
+        with self.assertRaisesMessage(AssertionError, 'N+1'):
+            with query_budget(max_queries=None):
+                for user in User.objects.filter(company=self.company):
+                    user.profile.department
+
+    def test_sql_template_collapses_literals(self):
+        self.assertEqual(
+            sql_template("SELECT * FROM users WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            sql_template("SELECT * FROM users WHERE id IN (%s) AND name = 'yz' LIMIT 1")
+        )
+
+
+class EmployeeSearchTests(QueryBudgetTestMixin, CompanyTestCase):
+    """Search documents follow saves, and misspelt queries are corrected"""
+
+    COMPANY, DOMAIN, PREFIX = 'Search Test Co', 'search.test', 'ST'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index, (first, last) in enumerate([('Jonathan', 'Richardson'), ('Priya', 'Sharma'), ('Arjun', 'Iyer')]):
+            cls.create_user(
+                first.lower(), employee_id=f'ST{index + 1:04d}', first_name=first, last_name=last,
+                profile={'department': 'Eng', 'location': 'Pune', 'monthly_wage': 40000}
+            )
+
+    def search(self, query):
+        response = self.assertWithinQueryBudget('get', '/api/auth/employee/search', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_prefix_and_id(self):
+        self.assertEqual([row['employee_id'] for row in self.search('richard')['results']], ['ST0001'])
+        self.assertEqual([row['full_name'] for row in self.search('ST0002')['results']], ['Priya Sharma'])
+
+    def test_misspelling_is_corrected(self):
+        data = self.search('Shamra')
+        self.assertEqual([row['employee_id'] for row in data['results']], ['ST0002'])
+
+    def test_rename_reindexes(self):
+        user = User.objects.get(employee_id='ST0003')
+        user.last_name = 'Nair'
+        user.save()
+        self.assertEqual([row['full_name'] for row in self.search('nair')['results']], ['Arjun Nair'])
+        self.assertEqual(self.search('iyer')['count'], 0)
+
+    def test_query_required(self):
+        self.assertEqual(self.client.get('/api/auth/employee/search').status_code, 400)
+
+
+class EmployeeCardTests(QueryBudgetTestMixin, CompanyTestCase):
+    """A full office of cards loads in two queries, with today's status per employee"""
+
+    COMPANY, DOMAIN, PREFIX = 'Card Test Co', 'cards.test', 'CT'
+    # Cards include the admin; the rest are bulk created below rather than one by one
+    OFFICE_SIZE = 500
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        users = User.objects.bulk_create([
+            User(company=cls.company, email=f'e{index}@cards.test', employee_id=f'CT{index + 1:04d}')
+            for index in range(cls.OFFICE_SIZE - 1)
+        ])
+        EmployeeProfile.objects.bulk_create([
+            EmployeeProfile(user=user, department='Eng', monthly_wage=40000) for user in users
+        ])
+        # Every third employee is in today, every fifth of the rest on leave
+        statuses = {
+            user.pk: 'PRESENT' if index % 3 == 0 else 'LEAVE'
+            for index, user in enumerate(users)
+            if index % 3 == 0 or index % 5 == 0
+        }
+        Attendance.objects.bulk_create([
+            Attendance(user_id=user_id, company=cls.company, date=date.today(), status=status)
+            for user_id, status in statuses.items()
+        ])
+        cls.statuses = statuses
+
+    def test_full_office_grid(self):
+        response = self.assertWithinQueryBudget('get', '/api/auth/dashboard/cards', {'page_size': 500})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], self.OFFICE_SIZE)
+        self.assertEqual(len(response.data['results']), self.OFFICE_SIZE)
+        by_id = {user.employee_id: user.pk for user in User.objects.filter(company=self.company)}
+        for card in response.data['results']:
+            self.assertEqual(card['status'], self.statuses.get(by_id[card['employee_id']], 'ABSENT'))
+
+    def test_whos_in_today(self):
+        response = self.assertWithinQueryBudget('get', '/api/auth/dashboard/in-today', {'page_size': 20, 'page': 2})
+        present = sum(status == 'PRESENT' for status in self.statuses.values())
+        self.assertEqual(response.data['total'], present)
+        self.assertEqual(response.data['pages'], -(-present // 20))
+        self.assertTrue(all(card['status'] == 'PRESENT' for card in response.data['results']))
+
+    def test_admin_dashboard_cards(self):
+        response = self.client.get('/api/auth/dashboard/admin', {'page_size': 25})
+        self.assertEqual(len(response.data['employee_cards']), 25)
+        self.assertEqual(response.data['employee_cards_page']['pages'], 20)
+        with query_budget(max_queries=10):
+            self.client.get('/api/auth/dashboard/admin', {'page_size': 500})
+
+    def test_invalid_page(self):
+        self.assertEqual(self.client.get('/api/auth/dashboard/cards', {'page_size': 501}).status_code, 400)
+        self.assertEqual(self.client.get('/api/auth/dashboard/cards', {'status': 'AWAY'}).status_code, 400)
+
+
+class PresenceBoardTests(QueryBudgetTestMixin, CompanyTestCase):
+    """The presence board follows check-ins, leave approvals and headcount changes"""
+
+    COMPANY, DOMAIN, PREFIX = 'Presence Test Co', 'presence.test', 'PT'
+    EMPLOYEES = 4
+
+    def setUp(self):
+        presence.get_store().drop(self.company.pk, date.today())
+        super().setUp()
+
+    def board(self):
+        response = self.assertWithinQueryBudget('get', '/api/auth/attendance/presence')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_check_in_and_leave(self):
+        self.assertEqual(self.board()['ABSENT'], 5)
+
+        employee = self.client_for(self.employees[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            employee.post('/api/auth/attendance/check', {'action': 'check_in'}, format='json')
+
+        time_off = TimeOff.objects.create(
+            user=self.employees[1], start_date=date.today(), end_date=date.today(), time_off_type='PAID'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/auth/timeoff/manage/{time_off.pk}', {'action': 'approve'}, format='json')
+
+        with query_budget(max_queries=0):
+            board = self.board()
+        self.assertEqual((board['PRESENT'], board['LEAVE'], board['ABSENT']), (1, 1, 3))
+
+    def test_deactivation_changes_headcount(self):
+        self.assertEqual(self.board()['total'], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employees[3].is_active = False
+            self.employees[3].save()
+        self.assertEqual(self.board()['total'], 4)
+
+    def test_members_are_admin_only(self):
+        employee = self.client_for(self.employees[0])
+        self.assertEqual(employee.get('/api/auth/attendance/presence', {'members': 'PRESENT'}).status_code, 403)
+        self.assertEqual(self.client.get('/api/auth/attendance/presence', {'members': 'AWAY'}).status_code, 400)
+
+
+class BulkAttendanceTests(QueryBudgetTestMixin, CompanyTestCase):
+    """Buffered punches merge into attendance rows once, whatever order or how often they arrive"""
+
+    COMPANY, DOMAIN, PREFIX = 'Punch Test Co', 'punch.test', 'PU'
+    EMPLOYEES = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.day = date.today() - timedelta(days=1)
+
+    def punch(self, key, employee, action, clock):
+        return {
+            'idempotency_key': key, 'employee_id': employee.employee_id,
+            'action': action, 'timestamp': f'{self.day.isoformat()}T{clock}'
+        }
+
+    def ingest(self, punches):
+        response = self.assertWithinQueryBudget('post', '/api/auth/attendance/bulk', {'punches': punches}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_batch_is_merged_once(self):
+        punches = []
+        for index, employee in enumerate(self.employees):
+            punches += [
+                self.punch(f'{index}-out', employee, 'check_out', '19:30:00'),
+                self.punch(f'{index}-in', employee, 'check_in', '09:00:00'),
+                self.punch(f'{index}-in-again', employee, 'check_in', '09:15:00'),
+            ]
+        punches.append(self.punch('ghost', User(employee_id='PU9999'), 'check_in', '09:00:00'))
+
+        data = self.ingest(punches)
+        self.assertEqual(data['summary'], {'applied': 60, 'duplicate': 0, 'rejected': 1})
+        self.assertEqual(data['results'][-1]['status'], 'rejected')
+
+        record = Attendance.objects.get(user=self.employees[0], date=self.day)
+        expected = Attendance(date=self.day, check_in=record.check_in, check_out=record.check_out)
+        expected.calculate_work_hours()
+        self.assertEqual(str(record.check_in), '09:00:00')
+        self.assertEqual((float(record.work_hours), float(record.extra_hours)), (8.0, 2.5))
+        self.assertAlmostEqual(float(record.extra_hours), expected.extra_hours)
+        self.assertEqual((record.status, record.company_id), ('PRESENT', self.company.pk))
+
+        # A resent batch changes nothing
+        self.assertEqual(self.ingest(punches)['summary'], {'applied': 0, 'duplicate': 60, 'rejected': 1})
+        self.assertEqual(Attendance.objects.filter(date=self.day).count(), 20)
+
+    def test_employees_submit_only_their_own(self):
+        employee = self.client_for(self.employees[0])
+        response = employee.post('/api/auth/attendance/bulk', {'punches': [
+            self.punch('mine', self.employees[0], 'check_in', '09:00:00'),
+            self.punch('theirs', self.employees[1], 'check_in', '09:00:00'),
+        ]}, format='json')
+        self.assertEqual([result['status'] for result in response.data['results']], ['applied', 'rejected'])
+
+    def test_invalid_batch(self):
+        self.assertEqual(self.client.post('/api/auth/attendance/bulk', {'punches': []}, format='json').status_code, 400)
+
+
+class AttendanceMonthTests(CompanyTestCase):
+    """Attendance listings reject months that do not exist instead of failing"""
+
+    COMPANY, DOMAIN, PREFIX = 'Month Test Co', 'month.test', 'MT'
+    EMPLOYEES = 1
+
+    def test_invalid_month_is_a_bad_request(self):
+        employee = self.client_for(self.employees[0])
+        for params in ({'month': 13}, {'month': 0}, {'month': 'x'}, {'year': 0}, {'year': 10000}):
+            self.assertEqual(employee.get('/api/auth/attendance/my', params).status_code, 400)
+            self.assertEqual(self.client.get('/api/auth/attendance', params).status_code, 400)
+
+        response = employee.get('/api/auth/attendance/my', {'month': 2, 'year': 2024})
+        self.assertEqual((response.status_code, response.data['month'], response.data['year']), (200, 2, 2024))
+        response = self.client.get('/api/auth/attendance', {'month': 2, 'year': 2024, 'status': 'PRESENT'})
+        self.assertEqual((response.status_code, response.data['summary']['total']), (200, 0))
+
+
+class TokenClaimsUserTests(CompanyTestCase):
+    """A user built from (possibly stale) token claims never writes those claims back"""
+
+    COMPANY, DOMAIN, PREFIX = 'Claims Test Co', 'claims.test', 'CL'
+    EMPLOYEES = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.employees[0]
+
+    def claims_user(self):
+        return User.from_token_claims(self.user.pk, {
+            field: getattr(self.user, field) for field in User.TOKEN_CLAIM_FIELDS
+        })
+
+    def deactivate(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        return User.objects.values_list('is_active', 'token_version').get(pk=self.user.pk)
+
+    def test_deactivate_then_save(self):
+        stale = self.claims_user()
+        deactivated = self.deactivate()
+
+        stale.set_password('new-password-123')
+        stale.save()
+        self.assertEqual(User.objects.values_list('is_active', 'token_version').get(pk=self.user.pk), deactivated)
+        self.assertTrue(User.objects.get(pk=self.user.pk).check_password('new-password-123'))
+
+    def test_deferred_load_reloads_claims(self):
+        stale = self.claims_user()
+        deactivated = self.deactivate()
+
+        self.assertEqual(stale.email, 'e0@claims.test')
+        self.assertEqual((stale.is_active, stale.token_version), deactivated)
+        stale.first_name = 'Renamed'
+        stale.save()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual((user.first_name, user.is_active, user.token_version), ('Renamed', *deactivated))
+
+
+class PayrollReportTests(CompanyTestCase):
+    """Payroll reports read persisted runs"""
+
+    COMPANY, DOMAIN, PREFIX = 'Payroll Test Co', 'payroll.test', 'PR'
+    EMPLOYEES = 3
+    PROFILE = {'department': 'Eng', 'monthly_wage': 40000}
+
+    def test_summary_of_a_zero_payout_run(self):
+        # Nobody worked, so every payslip is zero
+        run = PayrollRun.objects.create(company=self.company, year=2020, month=1)
+        generate_run(run, workers=1)
+        summary = run_summary(run)['summary']
+        self.assertEqual((summary['processed_count'], summary['total_payout'], summary['avg_salary']), (3, 0, 0))
+
+    def test_change_during_recompute_keeps_payslip_dirty(self):
+        run = PayrollRun.objects.create(company=self.company, year=2020, month=1)
+        generate_run(run, workers=1)
+        user_id = run.payslips.values_list('user_id', flat=True).first()
+        mark_dirty(user_id)
+        compute = PayrollEngine.compute
+
+        def compute_while_attendance_changes(engine):
+            mark_dirty(user_id)
+            return compute(engine)
+
+        with mock.patch.object(PayrollEngine, 'compute', compute_while_attendance_changes):
+            self.assertEqual(refresh_run(run), 1)
+        self.assertTrue(run.payslips.get(user_id=user_id).is_dirty)
+        self.assertEqual(refresh_run(run), 1)
+        self.assertFalse(run.payslips.filter(is_dirty=True).exists())
+
+    def test_reports_never_create_runs(self):
+        for params in ({'month': 13}, {'year': date.today().year + 1}, {'month': 'x'}):
+            self.assertEqual(self.client.get('/api/auth/reports/payroll', params).status_code, 400)
+
+        response = self.client.get('/api/auth/reports/payroll', {'year': 2020, 'month': 1})
+        self.assertEqual((response.status_code, response.data['summary']['processed_count']), (200, 3))
+        csv_response = self.client.get('/api/auth/reports/payroll/csv', {'year': 2020, 'month': 1})
+        self.assertEqual(len(b''.join(csv_response.streaming_content).splitlines()), 4)
+        self.assertFalse(PayrollRun.objects.exists())
+
+
+class EmployeeImportTests(CompanyTestCase):
+    """Import uploads are validated in the request and run by the worker"""
+
+    COMPANY, DOMAIN, PREFIX = 'Import Test Co', 'import.test', 'IT'
+
+    def test_import_is_queued_for_the_worker(self):
+        employees = [{'first_name': 'New', 'last_name': f'Hire{index}', 'email': f'n{index}@import.test'} for index in range(3)]
+        response = self.client.post('/api/auth/employee/import', {'employees': employees}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job = EmployeeImportJob.objects.get(pk=response.data['job']['id'])
+        self.addCleanup(job.file.delete, save=False)
+        self.assertFalse(User.objects.filter(email__endswith='@import.test').exclude(pk=self.admin.pk).exists())
+
+        self.assertEqual(process_import_jobs(), 1)
+        data = self.client.get(f'/api/auth/employee/import/{job.pk}').data['job']
+        self.assertEqual((data['status'], len(data['employees'])), ('DONE', 3))
+        self.assertEqual(User.objects.filter(company=self.company).count(), 4)
+        self.assertEqual(process_import_jobs(), 0)
+
+    def test_csv_with_blank_optional_columns(self):
+        content = (
+            'first_name,last_name,email,role,department,year_of_joining\n'
+            'Blank,Cells,blank@import.test,,,\n'
+            'Full,Row,full@import.test,HR,Finance,2021\n'
+        )
+        rows = parse_rows(content, 'csv')
+        self.assertEqual(rows[0], {'first_name': 'Blank', 'last_name': 'Cells', 'email': 'blank@import.test'})
+        result = import_employees(rows, self.company)
+        self.assertEqual((len(result['created']), result['errors']), (2, []))
+        self.assertEqual(User.objects.get(email='blank@import.test').role, 'EMPLOYEE')
+
+    def test_invalid_rows_are_rejected_up_front(self):
+        response = self.client.post('/api/auth/employee/import', {'employees': [{'email': 'bad'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(EmployeeImportJob.objects.exists())
+
+
+class NotificationFanOutTests(CompanyTestCase):
+    """A fan-out commits every batch or none of them"""
+
+    COMPANY, DOMAIN, PREFIX = 'Fan Out Test Co', 'fanout.test', 'FO'
+    EMPLOYEES = 4
+
+    def fan_out(self):
+        recipients = InAppNotificationService.recipients(self.company)
+        return InAppNotificationService.fan_out(recipients, 'Hello', 'Everyone', batch_size=2)
+
+    def test_fan_out_in_batches(self):
+        self.assertEqual(self.fan_out(), 5)
+        self.assertEqual(Notification.objects.filter(company=self.company).count(), 5)
+
+    def test_failed_batch_rolls_back_earlier_batches(self):
+        adjust = NotificationCounter.adjust
+        calls = []
+
+        def fail_second_batch(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('database went away')
+            return adjust(*args, **kwargs)
+
+        with mock.patch.object(NotificationCounter, 'adjust', side_effect=fail_second_batch):
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.assertEqual(self.fan_out(), 0)
+
+        self.assertFalse(Notification.objects.filter(company=self.company).exists())
+        self.assertFalse(NotificationCounter.objects.filter(unread_count__gt=0).exists())
+        self.assertEqual(callbacks, [])
+
+
+class StreamTicketTests(CompanyTestCase):
+    """The notification stream is opened with a short-lived, single-use ticket"""
+
+    COMPANY, DOMAIN, PREFIX = 'Ticket Test Co', 'ticket.test', 'TT'
+    EMPLOYEES = 1
+
+    def test_ticket_is_accepted_once(self):
+        response = self.client_for(self.employees[0]).post('/api/auth/notifications/stream/ticket')
+        self.assertEqual((response.status_code, response.data['expires_in']), (201, StreamTicket.TTL))
+        ticket = response.data['ticket']
+
+        self.assertFalse(StreamTicket.objects.filter(key=ticket).exists())
+        self.assertEqual(StreamTicket.redeem(ticket), self.employees[0])
+        self.assertIsNone(StreamTicket.redeem(ticket))
+
+    def test_expired_or_unauthenticated_tickets_are_refused(self):
+        ticket = StreamTicket.issue(self.employees[0])
+        StreamTicket.objects.update(expires_at=StreamTicket.objects.get().expires_at - timedelta(minutes=1))
+        self.assertIsNone(StreamTicket.redeem(ticket))
+        self.assertIsNone(StreamTicket.redeem('not-a-ticket'))
+
+        self.assertEqual(APIClient().post('/api/auth/notifications/stream/ticket').status_code, 401)
+
+
+class AttendanceRollupTests(CompanyTestCase):
+    """Saves shift the day's rollup by their difference and match a full recount"""
+
+    COMPANY, DOMAIN, PREFIX = 'Rollup Test Co', 'rollup.test', 'RU'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.employees = [
+            cls.create_user(f'e{index}', employee_id=f'RU{index + 1:04d}', profile={'department': department})
+            for index, department in enumerate(['Eng', 'Eng', 'Sales'])
+        ]
+        cls.day = date(2024, 3, 4)
+
+    def rollups(self):
+        return {
+            rollup.date: (
+                rollup.present_count, rollup.absent_count, rollup.half_day_count, rollup.leave_count,
+                rollup.total_work_hours, rollup.total_extra_hours, rollup.department_breakdown
+            )
+            for rollup in DailyAttendanceRollup.objects.filter(company=self.company)
+        }
+
+    def assertMatchesRecount(self):
+        incremental = self.rollups()
+        rebuild_range(company_ids=[self.company.pk])
+        self.assertEqual(incremental, self.rollups())
+
+    def test_saves_and_deletes_match_a_recount(self):
+        records = [Attendance.objects.create(user=user, date=self.day) for user in self.employees]
+        self.assertMatchesRecount()
+
+        record = Attendance.objects.get(pk=records[0].pk)
+        record.check_in, record.check_out = time(9, 0), time(18, 20)
+        record.calculate_work_hours()
+        record.save()
+        self.assertMatchesRecount()
+
+        moved = Attendance.objects.get(pk=records[1].pk)
+        moved.status, moved.date = 'HALF_DAY', self.day + timedelta(days=1)
+        moved.save()
+        self.assertMatchesRecount()
+
+        Attendance.objects.get(pk=records[2].pk).delete()
+        moved.delete()
+        self.assertMatchesRecount()
+        self.assertEqual(list(self.rollups()), [self.day])
+
+
+class AnalyticsEngineTests(CompanyTestCase):
+    """The batched engines reproduce hand-computed results of the per-employee formulas"""
+
+    COMPANY, DOMAIN, PREFIX = 'Engine Test Co', 'engine.test', 'EN'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        def employee(key):
+            return cls.create_user(
+                key, employee_id=f'EN{key.upper()}', first_name=key.title(), last_name='Tester',
+                profile={'department': 'Eng'}
+            )
+
+        cls.steady = employee('steady')
+        cls.late = employee('late')
+        cls.long = employee('long')
+        cls.idle = employee('idle')
+
+        def record(user, day, check_in=None, check_out=None, status='PRESENT'):
+            return Attendance(
+                user=user, company=cls.company, date=date(2024, 3, day), status=status,
+                check_in=check_in and time(*check_in), check_out=check_out and time(*check_out)
+            )
+
+        def leave(user, start, end, status='APPROVED', kind='PAID'):
+            return TimeOff(
+                user=user, company=cls.company, time_off_type=kind, status=status,
+                start_date=date(2024, 3, start), end_date=date(2024, 3, end)
+            )
+
+        Attendance.objects.bulk_create([
+            # steady: 5 worked days (one half day, one without check-out) and an ABSENT row
+            record(cls.steady, 4, (9, 0), (17, 30)),
+            record(cls.steady, 5, (9, 20), (18, 20)),
+            record(cls.steady, 6, (9, 10), (13, 10), status='HALF_DAY'),
+            record(cls.steady, 11, (9, 15), (17, 15)),
+            record(cls.steady, 12, (8, 30)),
+            record(cls.steady, 13, status='ABSENT'),
+            # late: a short day after 9:30 every day of the first week
+            *[record(cls.late, day, (10, 0), (14, 0)) for day in range(4, 9)],
+            # long: 13 hours every weekday but the last, which is a LEAVE row
+            *[record(cls.long, day, (7, 0), (20, 0)) for day in (4, 5, 6, 7, 8, 11, 12, 13, 14)],
+            record(cls.long, 15, status='LEAVE'),
+        ])
+        TimeOff.objects.bulk_create([
+            leave(cls.steady, 14, 15),
+            leave(cls.steady, 18, 18, status='PENDING'),
+            leave(cls.idle, 11, 15),
+            # five pending sick days, three of them starting on a Monday or Friday
+            *[leave(cls.long, day, day, status='PENDING', kind='SICK') for day in (4, 8, 11, 12, 13)],
+        ])
+
+    def test_performance_scores(self):
+        # Window Mon 4 - Mon 18 March: 10 expected weekdays (4-15)
+        scores = {
+            row['employee_id']: row
+            for row in PerformanceScoringEngine(self.company, date(2024, 3, 4), date(2024, 3, 18)).score()
+        }
+
+        steady = scores[self.steady.pk]
+        # attendance 5 / (10 - 2 leave) = 62.5%, punctuality 4 / 5 on time, average 29.5h / 4 complete
+        # days = 7.375h -> 92.1875%, one gap (6th -> 11th) -> 90%:
+        # 62.5 * .35 + 80 * .25 + 92.1875 * .25 + 90 * .15 = 78.42
+        self.assertEqual(steady['overall_score'], 78.4)
+        self.assertEqual(steady['grade'], 'B+ (Good)')
+        self.assertEqual(steady['breakdown'], {'attendance': 62.5, 'punctuality': 80.0, 'work_hours': 92.2, 'consistency': 90.0})
+        self.assertEqual(steady['metrics'], {
+            'days_present': 5, 'expected_days': 8, 'attendance_rate': 62.5,
+            'avg_hours_per_day': 7.4, 'on_time_percentage': 80.0
+        })
+
+        # No attendance at all: only punctuality (nothing late) and consistency (no gaps) score
+        idle = scores[self.idle.pk]
+        self.assertEqual((idle['overall_score'], idle['grade']), (40.0, 'D (Poor)'))
+        self.assertEqual(idle['breakdown'], {'attendance': 0.0, 'punctuality': 100.0, 'work_hours': 0.0, 'consistency': 100.0})
+        self.assertEqual(idle['metrics']['expected_days'], 5)
+
+    def test_anomalies(self):
+        result = AnomalyScanner(self.company, date(2024, 3, 4), date(2024, 3, 18)).scan()
+
+        def found(category, kind='anomaly_type'):
+            return {(entry['email'].split('@')[0], entry[kind], entry['details']) for entry in result[category]}
+
+        self.assertEqual(found('attendance_anomalies'), {('late', 'Chronic Late Check-ins', '5 out of 5 days')})
+        self.assertEqual(found('productivity_anomalies'), {
+            ('late', 'Low Working Hours', 'Average 4.0 hours/day'),
+            ('long', 'Excessive Working Hours', 'Average 13.0 hours/day'),
+        })
+        self.assertEqual(found('leave_anomalies'), {
+            ('long', 'Weekend Extension Pattern', '3 leaves on Mon/Fri in last 30 days'),
+            ('long', 'Excessive Sick Leave', '5 sick leaves in 30 days'),
+        })
+        # steady: 5 check-in days + 2 leave days of 10 -> 3 missing, not above the threshold;
+        # long is covered by its LEAVE row; idle's approved leave covers the second week only
+        self.assertEqual(found('policy_violations', 'violation_type'), {
+            ('late', 'Unapproved Absences', '5 days without attendance or approved leave'),
+            ('idle', 'Unapproved Absences', '5 days without attendance or approved leave'),
+        })
+
+    def test_anomalies_use_the_current_employees(self):
+        # Rows still carrying this company after their user moved away, and sick
+        # leave booked after the window, which counts towards the leave patterns
+        elsewhere = Company.objects.create(name='Elsewhere Co')
+        moved = User.objects.create(company=elsewhere, email='moved@engine.test', employee_id='ENMOVED')
+        EmployeeProfile.objects.create(user=moved)
+        Attendance.objects.bulk_create([
+            Attendance(user=moved, company=self.company, date=date(2024, 3, day), check_in=time(10, 0))
+            for day in range(4, 9)
+        ])
+        TimeOff.objects.bulk_create([
+            TimeOff(
+                user=self.steady, company=self.company, time_off_type='SICK',
+                start_date=date(2024, 3, day), end_date=date(2024, 3, day)
+            )
+            for day in (19, 20, 21, 22, 25)
+        ])
+
+        result = AnomalyScanner(self.company, date(2024, 3, 4), date(2024, 3, 18)).scan()
+        self.assertNotIn('moved@engine.test', {entry['email'] for entry in result['attendance_anomalies']})
+        self.assertIn(
+            ('steady@engine.test', 'Excessive Sick Leave'),
+            {(entry['email'], entry['anomaly_type']) for entry in result['leave_anomalies']}
+        )
+
+    def test_payroll_lines(self):
+        profile = EmployeeProfile.objects.filter(user=self.steady)
+        profile.update(
+            monthly_wage=Decimal('30000.00'), basic_salary=Decimal('15000.00'), house_rent_allowance=Decimal('7500.00'),
+            standard_allowance=Decimal('5000.00'), fixed_allowance=Decimal('3501.02'),
+            professional_tax=Decimal('200.00'), pf_employee_contribution=Decimal('1800.00')
+        )
+        EmployeeProfile.objects.filter(user=self.idle).update(monthly_wage=Decimal('22000.00'))
+
+        lines = {
+            line['user_id']: line
+            for line in PayrollEngine(self.company, *month_bounds(2024, 3)).compute().rows()
+        }
+
+        # 4 PRESENT + 1 HALF_DAY rows, no LEAVE: 4.5 of 22 standard days
+        steady = lines[self.steady.pk]
+        self.assertEqual(
+            (steady['present_days'], steady['half_days'], steady['leave_days'], steady['working_days']),
+            (4, 1, 0, Decimal('4.5'))
+        )
+        self.assertEqual(
+            {field: steady[field] for field in (
+                'gross_salary', 'earned_basic', 'earned_hra', 'earned_allowances',
+                'allowances', 'total_deductions', 'net_salary'
+            )},
+            {
+                'gross_salary': Decimal('6136.36'),       # 30000 * 4.5 / 22 = 6136.3636
+                'earned_basic': Decimal('3068.18'),       # 15000 * 4.5 / 22 = 3068.1818
+                'earned_hra': Decimal('1534.09'),         # 7500 * 4.5 / 22 = 1534.0909
+                'earned_allowances': Decimal('1738.85'),  # 8501.02 * 4.5 / 22 = 1738.845 exactly, half up
+                'allowances': Decimal('8501.02'),
+                'total_deductions': Decimal('2000.00'),
+                'net_salary': Decimal('4136.36'),
+            }
+        )
+
+        # No attendance: nothing earned, deductions still apply
+        idle = lines[self.idle.pk]
+        self.assertEqual(
+            (idle['working_days'], idle['gross_salary'], idle['total_deductions'], idle['net_salary']),
+            (Decimal('0.0'), Decimal('0.00'), Decimal('200.00'), Decimal('-200.00'))
+        )
@@ -2,6 +2,8 @@ from django.urls import path
 from .views import (
     CompanySignupView,
     EmployeeCreateView,
+    EmployeeBulkImportView,
+    EmployeeImportJobView,
     LoginView,
     ChangePasswordView,
     CurrentUserView
@@ -12,12 +14,17 @@ from .dashboard_views import (
     UpdateProfileView,
     EmployeeDashboardView,
     AdminDashboardView,
+    EmployeeCardsView,
+    WhosInTodayView,
     CheckInOutView,
+    BulkAttendanceView,
+    PresenceBoardView,
     MyAttendanceView,
     AllAttendanceView,
     TimeOffRequestView,
     TimeOffManagementView,
-    EmployeeListView
+    EmployeeListView,
+    EmployeeSearchView
 )
 from .reports_views import (
     AttendanceReportView,
@@ -27,12 +34,15 @@ from .reports_views import (
     LeaveReportView,
     LeaveReportCSVView
 )
+from .realtime_views import NotificationStreamView, StreamTicketView
 from .notification_views import (
     MyNotificationsView,
+    UnreadNotificationCountView,
     MarkNotificationReadView,
     MarkAllNotificationsReadView,
     DeleteNotificationView,
-    ClearAllNotificationsView
+    ClearAllNotificationsView,
+    BroadcastNotificationView
 )
 from .analytics_views import (
     AnalyticsDashboardView,
@@ -60,7 +70,10 @@ urlpatterns = [
     
     # Employee management (admin/HR only)
     path('employee/create', EmployeeCreateView.as_view(), name='employee-create'),
+    path('employee/import', EmployeeBulkImportView.as_view(), name='employee-import'),
+    path('employee/import/<int:pk>', EmployeeImportJobView.as_view(), name='employee-import-job'),
     path('employee/all', EmployeeListView.as_view(), name='employee-list'),
+    path('employee/search', EmployeeSearchView.as_view(), name='employee-search'),
     path('employee/<int:pk>/delete', EmployeeDeleteView.as_view(), name='employee-delete'),
     
     # Authentication
@@ -82,12 +95,16 @@ urlpatterns = [
     # Dashboard
     path('dashboard/employee', EmployeeDashboardView.as_view(), name='employee-dashboard'),
     path('dashboard/admin', AdminDashboardView.as_view(), name='admin-dashboard'),
+    path('dashboard/cards', EmployeeCardsView.as_view(), name='employee-cards'),
+    path('dashboard/in-today', WhosInTodayView.as_view(), name='whos-in-today'),
     
     # Attendance Management (Module 5)
     path('attendance/checkin', CheckInOutView.as_view(), name='checkin'),  # Alternative route
     path('attendance/checkout', CheckInOutView.as_view(), name='checkout'),  # Alternative route
     path('attendance/check', CheckInOutView.as_view(), name='check-in-out'),  # Original unified route
+    path('attendance/bulk', BulkAttendanceView.as_view(), name='attendance-bulk'),
     path('attendance/my', MyAttendanceView.as_view(), name='my-attendance'),
+    path('attendance/presence', PresenceBoardView.as_view(), name='presence-board'),
     path('attendance', AllAttendanceView.as_view(), name='all-attendance'),  # Admin view all
     
     # Leave Management (Module 6)
@@ -109,10 +126,14 @@ urlpatterns = [
     
     # In-App Notifications (NEW)
     path('notifications', MyNotificationsView.as_view(), name='my-notifications'),
+    path('notifications/unread-count', UnreadNotificationCountView.as_view(), name='unread-notification-count'),
+    path('notifications/stream', NotificationStreamView.as_view(), name='notification-stream'),
+    path('notifications/stream/ticket', StreamTicketView.as_view(), name='notification-stream-ticket'),
     path('notifications/<int:pk>/read', MarkNotificationReadView.as_view(), name='mark-notification-read'),
     path('notifications/read-all', MarkAllNotificationsReadView.as_view(), name='mark-all-read'),
     path('notifications/<int:pk>/delete', DeleteNotificationView.as_view(), name='delete-notification'),
     path('notifications/clear', ClearAllNotificationsView.as_view(), name='clear-notifications'),
+    path('notifications/broadcast', BroadcastNotificationView.as_view(), name='broadcast-notification'),
     
     # Analytics Dashboards (NEW)
     path('analytics/dashboard', AnalyticsDashboardView.as_view(), name='analytics-dashboard'),
@@ -1,3 +1,5 @@
+import json
+
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -12,7 +14,7 @@ from .serializers import (
     CompanySerializer
 )
 from .permissions import IsAdmin
-from .models import Company
+from .models import Company, EmployeeImportJob
 
 User = get_user_model()
 
@@ -75,13 +77,14 @@ class EmployeeCreateView(APIView):
             user = result['user']
             temp_password = result['temp_password']
             
-            # Send welcome email
-            from .notifications import EmailNotificationService
-            EmailNotificationService.send_welcome_email(user, temp_password)
+            # Welcome email goes out through the notification worker; the password
+            # is only in this response, so the email asks the admin to share it
+            from .notification_queue import enqueue_welcome_emails
+            enqueue_welcome_emails([user], issue_passwords=False)
             
             return Response(
                 {
-                    'message': 'Employee created successfully. Welcome email sent.',
+                    'message': 'Employee created successfully. Welcome email queued.',
                     'employee': {
                         'employee_id': user.employee_id,
                         'email': user.email,
@@ -97,6 +100,86 @@ class EmployeeCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class EmployeeBulkImportView(APIView):
+    """
+    API endpoint for importing many employees at once
+    Accepts a CSV or JSONL upload (`file`) or a JSON body {"employees": [...]}.
+    Rows are validated here; a valid file is stored and imported by the
+    notification worker (202), and its job can be polled for the outcome.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+    
+    def post(self, request):
+        from .employee_import import FORMATS, EmployeeImportError, parse_rows, validate_rows, queue_import
+        
+        upload = request.FILES.get('file')
+        if upload is not None:
+            fmt = request.data.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+            if fmt not in FORMATS:
+                return Response(
+                    {'error': f'Unsupported format "{fmt}", expected one of: {", ".join(FORMATS)}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            content = upload.read()
+            try:
+                rows = parse_rows(content, fmt)
+            except (EmployeeImportError, UnicodeDecodeError) as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = request.data.get('employees')
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                return Response(
+                    {'error': 'Provide a CSV/JSONL file or an "employees" list of objects'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            fmt = 'jsonl'
+            content = '\n'.join(json.dumps(row) for row in rows).encode()
+        
+        if not rows:
+            return Response({'error': 'The import contains no employees'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        _, errors = validate_rows(rows)
+        if errors:
+            return Response(
+                {'error': 'No employees were imported; fix the listed rows and retry', 'rows': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        job = queue_import(request.user.company, request.user, content, fmt, len(rows))
+        return Response(
+            {
+                'message': f'{len(rows)} employee(s) queued for import. Welcome emails follow once it runs.',
+                'job': _import_job_data(job)
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class EmployeeImportJobView(APIView):
+    """API endpoint for polling a queued employee import"""
+    permission_classes = [IsAuthenticated, IsAdmin]
+    
+    def get(self, request, pk):
+        job = EmployeeImportJob.objects.filter(pk=pk, company=request.user.company).first()
+        if job is None:
+            return Response({'error': 'Import not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'job': _import_job_data(job, with_outcome=True)})
+
+
+def _import_job_data(job, with_outcome=False):
+    data = {
+        'id': job.pk,
+        'status': job.status,
+        'row_count': job.row_count,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
+    if with_outcome:
+        data['employees'] = job.created
+        data['rows'] = job.errors
+    return data
+
+
 class LoginView(APIView):
     """
     API endpoint for user login
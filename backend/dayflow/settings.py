@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "authentication.query_budget.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -91,6 +92,56 @@ DATABASES = {
 }
 
 
+# Cache Configuration
+# The "analytics" cache holds company-scoped analytics responses and the employee
+# search index generations; writes invalidate them, so every worker must share it.
+# The default file backend is shared by all workers on one host; use redis when
+# workers run on several hosts. locmem is per process and only correct when a
+# single worker process serves the app.
+ANALYTICS_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+ANALYTICS_CACHE_LOCATIONS = {
+    'locmem': 'dayflow-analytics',
+    'file': str(BASE_DIR / 'cache' / 'analytics'),
+    'redis': 'redis://localhost:6379/1',
+}
+ANALYTICS_CACHE_BACKEND = config('ANALYTICS_CACHE_BACKEND', default='file')
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "analytics": {
+        "BACKEND": ANALYTICS_CACHE_BACKENDS[ANALYTICS_CACHE_BACKEND],
+        "LOCATION": config('ANALYTICS_CACHE_LOCATION', default=ANALYTICS_CACHE_LOCATIONS[ANALYTICS_CACHE_BACKEND]),
+        "TIMEOUT": config('ANALYTICS_CACHE_TTL', default=300, cast=int),
+    },
+}
+
+if ANALYTICS_CACHE_BACKEND != 'redis':
+    # Least-recently-used entries are culled once the cache is full
+    CACHES["analytics"]["OPTIONS"] = {
+        "MAX_ENTRIES": config('ANALYTICS_CACHE_MAX_ENTRIES', default=1000, cast=int),
+    }
+
+# Real-time push broker for the notification stream: "local" (single ASGI
+# process), "redis" (any Redis-compatible server), or a dotted broker class path
+REALTIME_BROKER = config('REALTIME_BROKER', default='local')
+REALTIME_BROKER_URL = config('REALTIME_BROKER_URL', default='redis://localhost:6379/2')
+
+# Today's presence board: "local" (per process, entries re-read from the database
+# every PRESENCE_LOCAL_TTL seconds), "redis" (shared sets), or a dotted store class path
+PRESENCE_STORE = config('PRESENCE_STORE', default='local')
+PRESENCE_STORE_URL = config('PRESENCE_STORE_URL', default='redis://localhost:6379/3')
+PRESENCE_LOCAL_TTL = config('PRESENCE_LOCAL_TTL', default=60, cast=int)
+
+# Where archive_attendance writes closed years of raw attendance
+ATTENDANCE_ARCHIVE_DIR = config('ATTENDANCE_ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -110,6 +161,40 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# The profile picks the hasher (and cost) for new passwords; hashes made with any other
+# listed hasher still verify and are upgraded in the background after a successful login.
+# The default profile is unchanged from Django: PBKDF2-SHA256 at Django's iteration count,
+# so login and password-change throughput stay the same unless a deployment opts in.
+# Only PASSWORD_HASHER_PROFILE=argon2 (requires the argon2-cffi package) or a lower
+# PBKDF2_ITERATIONS changes the cost of hashing.
+
+PASSWORD_HASHER_PROFILES = {
+    "pbkdf2": "authentication.hashers.TunedPBKDF2PasswordHasher",
+    "argon2": "authentication.hashers.TunedArgon2PasswordHasher",
+}
+PASSWORD_HASHER_PROFILE = config('PASSWORD_HASHER_PROFILE', default='pbkdf2')
+
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE],
+    *[path for name, path in PASSWORD_HASHER_PROFILES.items() if name != PASSWORD_HASHER_PROFILE],
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+# PBKDF2 work factor (Django's default for this release)
+PBKDF2_ITERATIONS = config('PBKDF2_ITERATIONS', default=1_000_000, cast=int)
+
+# Argon2id cost; the defaults follow the OWASP minimum (19 MiB, 2 passes, 1 lane)
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=19456, cast=int)  # KiB
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=1, cast=int)
+
+# Threads upgrading outdated password hashes after login
+PASSWORD_REHASH_WORKERS = config('PASSWORD_REHASH_WORKERS', default=1, cast=int)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
@@ -154,13 +239,21 @@ AUTH_USER_MODEL = "authentication.User"
 # REST Framework Configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "authentication.jwt_auth.ClaimsJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
 }
 
+# Query budgets (authentication.query_budget): views declare `query_budget`, others get the
+# default. The middleware adds Server-Timing headers and logs over-budget requests and repeated
+# query templates (N+1 loops); strict mode turns those into errors.
+QUERY_BUDGET_ENABLED = config('QUERY_BUDGET_ENABLED', default=DEBUG, cast=bool)
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+QUERY_BUDGET_DEFAULT = config('QUERY_BUDGET_DEFAULT', default=50, cast=int)
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = config('QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+
 # JWT Configuration
 from datetime import timedelta
 
@@ -175,6 +268,11 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Seconds a worker trusts its cached token version before re-reading it; bounds how late
+# other workers honour a revocation (role, company or active status change)
+JWT_CLAIMS_CACHE_TTL = config('JWT_CLAIMS_CACHE_TTL', default=30, cast=int)
+JWT_CLAIMS_CACHE_SIZE = config('JWT_CLAIMS_CACHE_SIZE', default=10000, cast=int)
+
 # Email Configuration (optional - for sending emails)
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
@@ -0,0 +1,105 @@
+"""
+Concurrency test for employee ID allocation
+Hammers the employee create endpoint from many threads and checks that every
+employee ID (and its per-company-year serial) is unique and gap-free
+"""
+import argparse
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import requests
+
+BASE_URL = "http://127.0.0.1:8000/api/auth"
+
+
+def signup_and_login(base_url):
+    """Create a throwaway company and return admin auth headers"""
+    suffix = uuid.uuid4().hex[:8]
+    company_data = {
+        "company_name": f"Concurrency Test {suffix}",
+        "first_name": "Load",
+        "last_name": "Tester",
+        "email": f"admin-{suffix}@loadtest.local",
+        "password": "admin@12345"
+    }
+    response = requests.post(f"{base_url}/company/signup", json=company_data)
+    if response.status_code != 201:
+        raise SystemExit(f"❌ Company signup failed: {response.status_code} {response.text}")
+
+    response = requests.post(f"{base_url}/login", json={
+        "login_id": company_data["email"],
+        "password": company_data["password"]
+    })
+    if response.status_code != 200:
+        raise SystemExit(f"❌ Login failed: {response.status_code} {response.text}")
+
+    return suffix, {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+def create_employee(base_url, headers, suffix, index):
+    employee_data = {
+        "first_name": f"Worker{index}",
+        "last_name": "Thread",
+        "email": f"worker{index}-{suffix}@loadtest.local",
+        "role": "EMPLOYEE",
+        "year_of_joining": date.today().year
+    }
+    response = requests.post(f"{base_url}/employee/create", json=employee_data, headers=headers)
+    if response.status_code != 201:
+        return None, f"{response.status_code} {response.text[:200]}"
+    return response.json()["employee"]["employee_id"], None
+
+
+def run(base_url, threads, total):
+    print(f"\n🏢 Setting up a fresh company on {base_url}")
+    suffix, headers = signup_and_login(base_url)
+
+    print(f"👥 Creating {total} employees from {threads} threads")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(
+            lambda index: create_employee(base_url, headers, suffix, index),
+            range(total)
+        ))
+    elapsed = time.perf_counter() - started
+
+    employee_ids = [employee_id for employee_id, _ in results if employee_id]
+    errors = [error for _, error in results if error]
+    serials = sorted(int(employee_id[-4:]) for employee_id in employee_ids)
+    duplicate_ids = [employee_id for employee_id, seen in Counter(employee_ids).items() if seen > 1]
+    duplicate_serials = [serial for serial, seen in Counter(serials).items() if seen > 1]
+    gaps = sorted(set(range(serials[0], serials[-1] + 1)) - set(serials)) if serials else []
+
+    print(f"\n{'='*60}")
+    print(f"⏱️  {len(employee_ids)} created in {elapsed:.1f}s ({len(employee_ids) / elapsed:.1f}/s)")
+    print(f"❗ Failed requests: {len(errors)}")
+    for error in errors[:5]:
+        print(f"   {error}")
+    print(f"🔁 Duplicate employee IDs: {duplicate_ids or 'none'}")
+    print(f"🔁 Duplicate serials: {duplicate_serials or 'none'}")
+    print(f"🕳️  Serial gaps: {gaps or 'none'}")
+    print(f"{'='*60}")
+
+    passed = not errors and not duplicate_ids and not duplicate_serials and not gaps
+    print("🎉 Employee ID allocation is race-free!" if passed else "❌ Allocation problems detected")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    print("\n⚠️  Make sure the Django server is running (ideally gunicorn with several workers)")
+    try:
+        ok = run(args.base_url, args.threads, args.requests)
+    except requests.exceptions.ConnectionError:
+        print("\n❌ Error: Could not connect to Django server!")
+        print("Please start the server with: python manage.py runserver")
+        ok = False
+    raise SystemExit(0 if ok else 1)
@@ -14,8 +14,9 @@ export const authAPI = {
   // Create employee (Admin/HR only)
   createEmployee: (data) => api.post('/auth/employee/create', data),
 
-  // Get all employees (Admin/HR only)
-  getEmployees: () => api.get('/auth/employee/all'),
+  // Employee directory page (Admin/HR only)
+  // params: search, department, role, is_active, fields, limit, cursor
+  getEmployees: (params) => api.get('/auth/employee/all', { params }),
 
   // Delete employee (Admin/HR only)
   deleteEmployee: (id) => api.delete(`/auth/employee/${id}/delete`),
@@ -153,15 +153,13 @@ function Navbar({ onToggleSidebar }) {
       if (authUtils.isAdmin()) {
         try {
           const { authAPI } = await import('../api/endpoints')
-          const response = await authAPI.getEmployees()
-          const employees = response.data || []
+          const response = await authAPI.getEmployees({
+            search: query,
+            limit: 5,
+            fields: 'id,employee_id,full_name,email'
+          })
+          const employees = response.data?.results || []
           const matchedEmployees = employees
-            .filter(emp =>
-              emp.full_name?.toLowerCase().includes(lowerQuery) ||
-              emp.email?.toLowerCase().includes(lowerQuery) ||
-              emp.employee_id?.toLowerCase().includes(lowerQuery)
-            )
-            .slice(0, 5)
             .map(emp => ({
               type: 'employee',
               title: emp.full_name,
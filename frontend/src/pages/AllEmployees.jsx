@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { authAPI } from '../api/endpoints'
 import Alert from '../components/Alert'
 
@@ -8,30 +8,33 @@ function AllEmployees() {
     const [message, setMessage] = useState({ type: '', text: '' })
     const [selectedEmployee, setSelectedEmployee] = useState(null)
     const [searchQuery, setSearchQuery] = useState('')
+    const [nextCursor, setNextCursor] = useState(null)
+    const latestRequest = useRef(0)
 
+    // The directory is searched on the server, so matches beyond the loaded pages are found too
     useEffect(() => {
-        fetchEmployees()
-    }, [])
+        const timer = setTimeout(() => fetchEmployees(), 300)
+        return () => clearTimeout(timer)
+    }, [searchQuery])
 
-    const fetchEmployees = async () => {
+    const fetchEmployees = async (cursor = null) => {
+        const request = ++latestRequest.current
         try {
             setLoading(true)
-            const response = await authAPI.getEmployees()
-            setEmployees(response.data)
+            const search = searchQuery.trim()
+            const response = await authAPI.getEmployees({ limit: 200, ...(search && { search }), ...(cursor && { cursor }) })
+            // A newer search has been sent meanwhile
+            if (request !== latestRequest.current) return
+            setEmployees(prev => cursor ? [...prev, ...response.data.results] : response.data.results)
+            setNextCursor(response.data.next_cursor)
         } catch (err) {
             console.error('Failed to fetch employees', err)
             setMessage({ type: 'danger', text: 'Failed to load employee list' })
         } finally {
-            setLoading(false)
+            if (request === latestRequest.current) setLoading(false)
         }
     }
 
-    const filteredEmployees = employees.filter(emp =>
-        emp.full_name.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        emp.employee_id.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        emp.email.toLowerCase().includes(searchQuery.toLowerCase())
-    )
-
     const handleViewDetails = (employee) => {
         setSelectedEmployee(employee)
     }
@@ -87,7 +90,7 @@ function AllEmployees() {
                 <div className="d-flex justify-content-between align-items-center mb-4 flex-wrap gap-3">
                     <h5 className="card-title mb-0">
                         <i className="bi bi-people me-2"></i>
-                        Employee Directory <span className="text-muted-light ms-2">({filteredEmployees.length})</span>
+                        Employee Directory <span className="text-muted-light ms-2">({employees.length}{nextCursor ? '+' : ''})</span>
                     </h5>
                     <div className="search-box">
                         <i className="bi bi-search"></i>
@@ -118,10 +121,10 @@ function AllEmployees() {
                         <tbody>
                             {loading ? (
                                 <tr><td colSpan="8" className="text-center py-5">Loading directory...</td></tr>
-                            ) : filteredEmployees.length === 0 ? (
+                            ) : employees.length === 0 ? (
                                 <tr><td colSpan="8" className="text-center py-5">No employees found matching your search.</td></tr>
                             ) : (
-                                filteredEmployees.map(emp => (
+                                employees.map(emp => (
                                     <tr key={emp.employee_id}>
                                         <td>{emp.employee_id}</td>
                                         <td>
@@ -156,6 +159,13 @@ function AllEmployees() {
                         </tbody>
                     </table>
                 </div>
+                {nextCursor && (
+                    <div className="text-center mt-3">
+                        <button className="btn btn-outline-primary btn-sm" disabled={loading} onClick={() => fetchEmployees(nextCursor)}>
+                            Load more
+                        </button>
+                    </div>
+                )}
             </div>
 
             {/* Employee Details Modal */}
@@ -15,6 +15,7 @@ function CreateEmployee() {
     })
     const [employees, setEmployees] = useState([])
     const [fetching, setFetching] = useState(true)
+    const [nextCursor, setNextCursor] = useState(null)
     const [loading, setLoading] = useState(false)
     const [message, setMessage] = useState({ type: '', text: '' })
     const [createdUser, setCreatedUser] = useState(null)
@@ -24,11 +25,16 @@ function CreateEmployee() {
         fetchEmployees()
     }, [])
 
-    const fetchEmployees = async () => {
+    const fetchEmployees = async (cursor = null) => {
         try {
             setFetching(true)
-            const response = await authAPI.getEmployees()
-            setEmployees(response.data)
+            const response = await authAPI.getEmployees({
+                limit: 500,
+                fields: 'employee_id,full_name,email,role,department,job_title,is_active',
+                ...(cursor && { cursor })
+            })
+            setEmployees(prev => cursor ? [...prev, ...response.data.results] : response.data.results)
+            setNextCursor(response.data.next_cursor)
         } catch (err) {
             console.error('Failed to fetch employees', err)
             setMessage({ type: 'danger', text: 'Failed to load employee directory' })
@@ -174,7 +180,7 @@ function CreateEmployee() {
 
             {/* Employee List Section */}
             <div className="glass-card p-4">
-                <h5 className="card-title mb-4"><i className="bi bi-people me-2"></i>Employee Directory ({employees.length})</h5>
+                <h5 className="card-title mb-4"><i className="bi bi-people me-2"></i>Employee Directory ({employees.length}{nextCursor ? '+' : ''})</h5>
                 <div className="glass-table">
                     <table>
                         <thead>
@@ -218,6 +224,13 @@ function CreateEmployee() {
                         </tbody>
                     </table>
                 </div>
+                {nextCursor && (
+                    <div className="text-center mt-3">
+                        <button className="btn btn-outline-primary btn-sm" disabled={fetching} onClick={() => fetchEmployees(nextCursor)}>
+                            Load more
+                        </button>
+                    </div>
+                )}
             </div>
             <style jsx>{`
         .create-employee-page { animation: fadeIn 0.4s ease-out; }